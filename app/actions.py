@@ -1,15 +1,259 @@
-import random
+import asyncio
+import functools
+import os
 
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from sqlalchemy import bindparam, func, insert, select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, lazyload, selectinload, subqueryload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from . import models, schemas
-from .utils.pokeapi import battle_compare_stats, get_pokemon_name, get_pokemon_stats
+from . import models, schemas, sqlite
+from .utils.battle import StatMatrix, round_robin
+from .utils.cache import TrainerCache
+from .utils.metrics import register_counters, timed
+from .utils.search import (
+    SEARCH_COLUMNS,
+    escape_like,
+    forget_search_index,
+    fuzzy_query,
+    has_search_index,
+    phrase_query,
+)
+from .utils.pokeapi import (
+    battle_compare_stats,
+    get_many_pokemon_stats_async,
+    get_pokemon_name_async,
+)
 
-def get_trainer(database: Session, trainer_id: int):
+# How the inventory and pokemons of trainers are loaded, selectin runs one query per relationship
+TRAINER_LOADERS = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "subquery": subqueryload,
+    "lazy": lazyload,
+}
+
+
+def check_loading_strategy(strategy):
+    """
+        Return strategy if it names one of TRAINER_LOADERS, raise ValueError otherwise,
+        so a misconfigured worker fails at startup rather than on its first request
+    """
+    if strategy not in TRAINER_LOADERS:
+        raise ValueError(f"Unknown TRAINER_LOADING_STRATEGY {strategy!r}, "
+                         f"expected one of {', '.join(TRAINER_LOADERS)}")
+    return strategy
+
+
+TRAINER_LOADING_STRATEGY = check_loading_strategy(
+    os.getenv("TRAINER_LOADING_STRATEGY", "selectin"))
+
+# Rows of a bulk import sent in one INSERT ... RETURNING, each chunk is committed on its own
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+# Serialized payloads of GET /trainers/{trainer_id}, invalidated by every write to a trainer
+trainer_cache = TrainerCache.from_env()
+register_counters("trainer_cache_lookups", "Lookups and invalidations of the trainer cache",
+                  "result", lambda: trainer_cache.counters)
+
+# Tables served by the export endpoint
+EXPORT_TABLES = {"trainers": models.Trainer, "pokemons": models.Pokemon, "items": models.Item}
+
+# Insert new pokemons with a pending name, filled in afterwards by fill_pending_names
+DEFER_POKEMON_NAMES = os.getenv("DEFER_POKEMON_NAMES", "false").lower() in ("1", "true", "yes")
+
+async def run_db(database, func_, *args, **kwargs):
+    """
+        Run a synchronous action on database, which is either a Session or an AsyncSession
+        Lets the coroutine actions below serve the sync and the async routers alike
+    """
+    if isinstance(database, AsyncSession):
+        return await database.run_sync(func_, *args, **kwargs)
+    return func_(database, *args, **kwargs)
+
+
+def save(database: Session, row):
+    """
+        Insert a row and return it refreshed
+    """
+    database.add(row)
+    database.commit()
+    database.refresh(row)
+    return row
+
+
+def save_all(database: Session, rows):
+    """
+        Insert several rows in a single flush and commit, return them
+    """
+    database.add_all(rows)
+    database.commit()
+    return rows
+
+
+def get_species(database: Session, api_ids):
+    """
+        Find the species seeded in db, indexed by api_id
+    """
+    species = database.query(models.Species).filter(models.Species.api_id.in_(set(api_ids)))
+    return {row.api_id: row for row in species}
+
+
+async def get_species_stats(database: Session, api_ids):
+    """
+        Return the stats of each api_id, in order
+        Seeded species are read from db, the others are fetched concurrently from the pokeapi
+    """
+    species = await run_db(database, get_species, api_ids)
+    missing = [api_id for api_id in dict.fromkeys(api_ids) if api_id not in species]
+    fetched = dict(zip(missing, await get_many_pokemon_stats_async(missing)))
+    return [
+        species[api_id].stats if api_id in species else fetched[api_id]
+        for api_id in api_ids
+    ]
+
+
+async def get_pokemon_names(database: Session, api_ids):
+    """
+        Return the names of the distinct api_ids indexed by api_id
+        Seeded species are read from db, the others are fetched concurrently from the pokeapi
+        An api_id whose name could not be fetched is left out
+    """
+    species = await run_db(database, get_species, api_ids)
+    names = {api_id: row.name for api_id, row in species.items()}
+    missing = [api_id for api_id in dict.fromkeys(api_ids) if api_id not in names]
+    fetched = await asyncio.gather(
+        *(get_pokemon_name_async(api_id) for api_id in missing), return_exceptions=True)
+    names.update(
+        (api_id, name) for api_id, name in zip(missing, fetched)
+        if not isinstance(name, Exception))
+    return names
+
+
+async def get_stat_matrix(database: Session, api_ids):
+    """
+        Return the stat matrix of the distinct api_ids
+        Seeded species are read from their columns, the others are fetched from the pokeapi
+    """
+    species = await run_db(database, get_species, api_ids)
+    missing = [api_id for api_id in dict.fromkeys(api_ids) if api_id not in species]
+    fetched = dict(zip(missing, await get_many_pokemon_stats_async(missing)))
+    return StatMatrix.stack(
+        StatMatrix.from_species(list(species.values())), StatMatrix.from_stats(fetched))
+
+
+def paginate(query, model, skip: int = 0, limit: int = 100, after_id: int = None):
+    """
+        Return a page of query ordered by primary key
+        With after_id the page starts right after that id through the primary key index,
+        otherwise skip rows are scanned and dropped first
+    """
+    query = query.order_by(model.id)
+    if after_id is not None:
+        return query.filter(model.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+
+# Columns of the fast path of the list endpoints, in the field order of the schemas
+ITEM_COLUMNS = (models.Item.name, models.Item.description, models.Item.id, models.Item.trainer_id)
+POKEMON_COLUMNS = (
+    models.Pokemon.api_id, models.Pokemon.custom_name, models.Pokemon.id,
+    models.Pokemon.name, models.Pokemon.trainer_id,
+)
+TRAINER_COLUMNS = (models.Trainer.name, models.Trainer.birthdate, models.Trainer.id)
+
+
+def page_rows(query, model, skip: int = 0, limit: int = 100, after_id: int = None):
+    """
+        Return a page of a column query as dicts, see paginate
+    """
+    return [row._asdict() for row in paginate(query, model, skip, limit, after_id)]
+
+
+def get_rows_by_trainer(database: Session, model, columns, trainer_ids):
+    """
+        Return the columns of the rows owned by trainer_ids as dicts, grouped by trainer_id
+    """
+    rows = {trainer_id: [] for trainer_id in trainer_ids}
+    query = database.query(*columns).filter(model.trainer_id.in_(trainer_ids)).order_by(model.id)
+    for row in query:
+        rows[row.trainer_id].append(row._asdict())
+    return rows
+
+
+def get_item_rows(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):
+    """
+        Fast path of get_items, items are plain dicts
+    """
+    return page_rows(database.query(*ITEM_COLUMNS), models.Item, skip, limit, after_id)
+
+
+def get_pokemon_rows(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):
+    """
+        Fast path of get_pokemons, pokemons are plain dicts
+    """
+    return page_rows(database.query(*POKEMON_COLUMNS), models.Pokemon, skip, limit, after_id)
+
+
+def get_trainer_rows(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):
+    """
+        Fast path of get_trainers, trainers are plain dicts
+        The inventories and pokemons of the page are loaded with one query each
+    """
+    trainers = page_rows(
+        database.query(*TRAINER_COLUMNS), models.Trainer, skip, limit, after_id)
+    trainer_ids = [trainer["id"] for trainer in trainers]
+    inventories = get_rows_by_trainer(database, models.Item, ITEM_COLUMNS, trainer_ids)
+    pokemons = get_rows_by_trainer(database, models.Pokemon, POKEMON_COLUMNS, trainer_ids)
+    for trainer in trainers:
+        trainer["inventory"] = inventories[trainer["id"]]
+        trainer["pokemons"] = pokemons[trainer["id"]]
+    return trainers
+
+
+def trainer_query(database: Session, strategy: str = None):
+    """
+        Query trainers with their inventory and pokemons loaded using strategy,
+        TRAINER_LOADING_STRATEGY by default
+    """
+    loader = TRAINER_LOADERS[strategy or TRAINER_LOADING_STRATEGY]
+    return database.query(models.Trainer).options(
+        loader(models.Trainer.inventory), loader(models.Trainer.pokemons))
+
+
+def get_trainer(database: Session, trainer_id: int, strategy: str = None):
     """
         Find a user by his id
     """
-    return database.query(models.Trainer).filter(models.Trainer.id == trainer_id).first()
+    return trainer_query(database, strategy).filter(models.Trainer.id == trainer_id).first()
+
+
+def serialize_trainer(database: Session, trainer_id: int):
+    """
+        Return the JSON of a trainer, None if he does not exist
+    """
+    db_trainer = get_trainer(database, trainer_id)
+    if db_trainer is None:
+        return None
+    with timed("serialize"):
+        return schemas.Trainer.model_validate(db_trainer).model_dump_json().encode()
+
+
+async def get_trainer_payload(database: Session, trainer_id: int):
+    """
+        Return the ETag and the JSON of a trainer, None if he does not exist
+        Read through trainer_cache, db is only queried on a miss
+    """
+    entry = await trainer_cache.get_async(trainer_id)
+    if entry is not None:
+        return entry
+    version = await trainer_cache.version_async(trainer_id)
+    payload = await run_db(database, serialize_trainer, trainer_id)
+    if payload is None:
+        return None
+    return await trainer_cache.store_async(trainer_id, payload, version)
 
 
 def get_trainer_by_name(database: Session, name: str):
@@ -19,12 +263,14 @@ def get_trainer_by_name(database: Session, name: str):
     return database.query(models.Trainer).filter(models.Trainer.name == name).all()
 
 
-def get_trainers(database: Session, skip: int = 0, limit: int = 100):
+def get_trainers(database: Session, skip: int = 0, limit: int = 100,
+                 after_id: int = None, strategy: str = None):
     """
         Find all users
         Default limit is 100
+        after_id switches to keyset pagination, see paginate
     """
-    return database.query(models.Trainer).offset(skip).limit(limit).all()
+    return paginate(trainer_query(database, strategy), models.Trainer, skip, limit, after_id)
 
 
 def create_trainer(database: Session, trainer: schemas.TrainerCreate):
@@ -32,41 +278,58 @@ def create_trainer(database: Session, trainer: schemas.TrainerCreate):
         Create a new trainer
     """
     db_trainer = models.Trainer(name=trainer.name, birthdate=trainer.birthdate)
-    database.add(db_trainer)
-    database.commit()
-    database.refresh(db_trainer)
+    save(database, db_trainer)
+    # A new trainer owns nothing, no need to lazy load the relationships
+    set_committed_value(db_trainer, "inventory", [])
+    set_committed_value(db_trainer, "pokemons", [])
     return db_trainer
 
 
-def add_trainer_pokemon(database: Session, pokemon: schemas.PokemonCreate, trainer_id: int):
+async def add_trainer_pokemons(database: Session, pokemons, trainer_id: int,
+                               deferred: bool = False):
+    """
+        Create several pokemons and link them to a trainer
+        Names are resolved once per distinct api_id, see get_pokemon_names
+        A name which could not be resolved, or every name when deferred, is left pending
+    """
+    names = {} if deferred else await get_pokemon_names(
+        database, [pokemon.api_id for pokemon in pokemons])
+    rows = [
+        models.Pokemon(
+            **pokemon.model_dump(), name=names.get(pokemon.api_id), trainer_id=trainer_id)
+        for pokemon in pokemons
+    ]
+    rows = await run_db(database, save_all, rows)
+    await trainer_cache.invalidate_async(trainer_id)
+    return rows
+
+
+async def add_trainer_pokemon(database: Session, pokemon: schemas.PokemonCreate,
+                              trainer_id: int, deferred: bool = False):
     """
         Create a pokemon and link it to a trainer
     """
-    db_item = models.Pokemon(
-        **pokemon.dict(), name=get_pokemon_name(pokemon.api_id), trainer_id=trainer_id)
-    database.add(db_item)
-    database.commit()
-    database.refresh(db_item)
-    return db_item
+    return (await add_trainer_pokemons(database, [pokemon], trainer_id, deferred))[0]
 
 
-def add_trainer_item(database: Session, item: schemas.ItemCreate, trainer_id: int):
+async def add_trainer_item(database: Session, item: schemas.ItemCreate, trainer_id: int):
     """
         Create an item and link it to a trainer
     """
-    db_item = models.Item(**item.dict(), trainer_id=trainer_id)
-    database.add(db_item)
-    database.commit()
-    database.refresh(db_item)
+    db_item = await run_db(
+        database, save, models.Item(**item.model_dump(), trainer_id=trainer_id))
+    await trainer_cache.invalidate_async(trainer_id)
     return db_item
 
 
-def get_items(database: Session, skip: int = 0, limit: int = 100):
+def get_items(database: Session, skip: int = 0, limit: int = 100,
+              after_id: int = None):
     """
         Find all items
         Default limit is 100
+        after_id switches to keyset pagination, see paginate
     """
-    return database.query(models.Item).offset(skip).limit(limit).all()
+    return paginate(database.query(models.Item), models.Item, skip, limit, after_id)
 
 
 def get_pokemon(database: Session, pokemon_id: int):
@@ -76,42 +339,64 @@ def get_pokemon(database: Session, pokemon_id: int):
     return database.query(models.Pokemon).filter(models.Pokemon.id == pokemon_id).first()
 
 
-def get_pokemons(database: Session, skip: int = 0, limit: int = 100):
+def get_pokemons_by_ids(database: Session, pokemon_ids):
+    """
+        Find several pokemons with a single query, indexed by id
+    """
+    pokemons = database.query(models.Pokemon).filter(models.Pokemon.id.in_(set(pokemon_ids)))
+    return {pokemon.id: pokemon for pokemon in pokemons}
+
+
+def get_pokemons(database: Session, skip: int = 0, limit: int = 100,
+                 after_id: int = None):
     """
         Find all pokemons
         Default limit is 100
+        after_id switches to keyset pagination, see paginate
+    """
+    return paginate(database.query(models.Pokemon), models.Pokemon, skip, limit, after_id)
+
+def sample_pokemons(database: Session, limit: int = 100, sample_size: int = 3):
+    """
+        Select sample_size random pokemons among the first limit ones
+        The draw runs in db on the ids only, then the chosen rows are loaded
     """
-    return database.query(models.Pokemon).offset(skip).limit(limit).all()
+    candidates = (
+        database.query(models.Pokemon.id).order_by(models.Pokemon.id).limit(limit).subquery())
+    sampled_ids = [
+        pokemon_id for (pokemon_id,)
+        in database.query(candidates.c.id).order_by(func.random()).limit(sample_size)
+    ]
+    pokemons = get_pokemons_by_ids(database, sampled_ids)
+    return [pokemons[pokemon_id] for pokemon_id in sampled_ids]
 
-def get_random_pokemons(database : Session, limit: int = 100):
+async def get_random_pokemons(database : Session, limit: int = 100, sample_size: int = 3):
     """
-        Select 3 random pokemons in db and return informations
-        Default limit is 3
+        Select sample_size random pokemons among the first limit ones and return informations
+        Default sample_size is 3, fewer pokemons are returned if the db holds less
     """
-    count = len(database.query(models.Pokemon).limit(limit).all())
-    pokemons = database.query(models.Pokemon).limit(limit).all()
-    random_pokemon = []
-    while len(random_pokemon) < 3:
-        number = random.randint(1, count) -1
-        if pokemons[number] in random_pokemon:
-            continue
-        random_pokemon.append(pokemons[number])
+    random_pokemon = await run_db(database, sample_pokemons, limit, sample_size)
 
-    for pokemon in random_pokemon:
-        pokemon.stats = get_pokemon_stats(pokemon.id)
+    all_stats = await get_species_stats(
+        database, [pokemon.api_id for pokemon in random_pokemon])
+    for pokemon, stats in zip(random_pokemon, all_stats):
+        pokemon.stats = stats
     return random_pokemon
 
-def fight_pokemons(database: Session, first_pokemon_id: int, second_pokemon_id: int):
+async def fight_pokemons(database: Session, first_pokemon_id: int, second_pokemon_id: int):
     """
         Fait s'affronter 2 pokémons
+        Return None if one of them does not exist
     """
-    first_pokemon = get_pokemon(database, first_pokemon_id)
-    second_pokemon = get_pokemon(database, second_pokemon_id)
+    pokemons = await run_db(database, get_pokemons_by_ids, [first_pokemon_id, second_pokemon_id])
+    first_pokemon = pokemons.get(first_pokemon_id)
+    second_pokemon = pokemons.get(second_pokemon_id)
+    if first_pokemon is None or second_pokemon is None:
+        return None
 
-    battle_result = battle_compare_stats(
-        get_pokemon_stats(first_pokemon.api_id),
-        get_pokemon_stats(second_pokemon.api_id),
-    )
+    first_stats, second_stats = await get_species_stats(
+        database, [first_pokemon.api_id, second_pokemon.api_id])
+    battle_result = battle_compare_stats(first_stats, second_stats)
 
     winner = None
     if battle_result > 0:
@@ -119,4 +404,304 @@ def fight_pokemons(database: Session, first_pokemon_id: int, second_pokemon_id:
     elif battle_result < 0:
         winner = second_pokemon
 
-    return schemas.PokemonFightResult(winner=winner.custom_name, draw=winner is None)
+    return schemas.PokemonFightResult(
+        winner=winner.custom_name if winner else None, draw=winner is None)
+
+async def fight_many_pokemons(database: Session, fights, pokemons):
+    """
+        Resolve a batch of fights in a single vectorized comparison
+        pokemons holds every fighter indexed by id, see get_pokemons_by_ids
+        Return one PokemonFightResult dict per fight, in input order
+    """
+    firsts = [pokemons[fight.first_pokemon_id] for fight in fights]
+    seconds = [pokemons[fight.second_pokemon_id] for fight in fights]
+    matrix = await get_stat_matrix(database, [pokemon.api_id for pokemon in pokemons.values()])
+    outcomes = matrix.compare(
+        [pokemon.api_id for pokemon in firsts], [pokemon.api_id for pokemon in seconds])
+
+    results = []
+    for first, second, outcome in zip(firsts, seconds, outcomes.tolist()):
+        winner = first if outcome > 0 else second if outcome < 0 else None
+        results.append({
+            "winner": winner.custom_name if winner else None, "draw": winner is None})
+    return results
+
+def get_tournament_pokemons(database: Session, trainer_id: int = None, pokemon_ids=None):
+    """
+        Find the columns of the pokemons a tournament needs
+        The scope is pokemon_ids if given, else the team of trainer_id, else every pokemon
+    """
+    query = database.query(
+        models.Pokemon.id, models.Pokemon.api_id, models.Pokemon.name, models.Pokemon.custom_name)
+    if pokemon_ids:
+        query = query.filter(models.Pokemon.id.in_(set(pokemon_ids)))
+    elif trainer_id is not None:
+        query = query.filter(models.Pokemon.trainer_id == trainer_id)
+    return query.order_by(models.Pokemon.id).all()
+
+async def run_tournament(database: Session, trainer_id: int = None, pokemon_ids=None):
+    """
+        Fight every pokemon of the scope against every other one and rank them
+        The scope is pokemon_ids if given, else the team of trainer_id, else every pokemon
+        A win is worth 3 points and a draw 1 point
+    """
+    pokemons = await run_db(database, get_tournament_pokemons, trainer_id, pokemon_ids)
+    if not pokemons:
+        return schemas.TournamentResult(fights=0)
+
+    matrix = await get_stat_matrix(database, [pokemon.api_id for pokemon in pokemons])
+    # Comparing every pair of species is CPU bound, about 90 ms for 1350 species,
+    # so it runs in a worker thread instead of blocking the event loop
+    wins, draws, losses = await asyncio.to_thread(
+        round_robin, matrix, [pokemon.api_id for pokemon in pokemons])
+
+    standings = sorted(
+        zip(pokemons, wins.tolist(), draws.tolist(), losses.tolist()),
+        key=lambda standing: (-3 * standing[1] - standing[2], -standing[1], standing[0].id),
+    )
+    return schemas.TournamentResult(
+        fights=len(pokemons) * (len(pokemons) - 1) // 2,
+        standings=[
+            schemas.TournamentStanding(
+                rank=rank, pokemon_id=pokemon.id, name=pokemon.name,
+                custom_name=pokemon.custom_name, wins=win, draws=draw, losses=loss)
+            for rank, (pokemon, win, draw, loss) in enumerate(standings, start=1)
+        ],
+    )
+
+def insert_rows(database: Session, model, rows):
+    """
+        Insert rows, given as dicts, with a single executemany INSERT ... RETURNING and commit
+        Return the new ids in the order of rows
+    """
+    if not rows:
+        return []
+    # sort_by_parameter_order would fall back to one INSERT per row on SQLite,
+    # ids of a single statement are increasing in the order of its VALUES anyway
+    ids = sorted(database.scalars(insert(model).returning(model.id), rows))
+    database.commit()
+    return ids
+
+
+def get_trainer_ids(database: Session, trainer_ids):
+    """
+        Return the ids among trainer_ids which belong to a trainer
+    """
+    trainers = database.query(models.Trainer.id).filter(models.Trainer.id.in_(set(trainer_ids)))
+    return {trainer_id for (trainer_id,) in trainers}
+
+
+def import_error(index, error):
+    """
+        Describe why the row at index was rejected
+    """
+    detail = str(error)
+    if isinstance(error, ValidationError):
+        detail = "; ".join(
+            f"{'.'.join(str(part) for part in field['loc'])}: {field['msg']}"
+            for field in error.errors())
+    return schemas.ImportRowError(index=index, detail=detail)
+
+
+async def keep_owned_rows(database: Session, chunk, result):
+    """
+        Keep the rows of chunk whose trainer exists, the others are reported in result
+    """
+    trainer_ids = await run_db(database, get_trainer_ids, [row.trainer_id for _, row in chunk])
+    kept = []
+    for index, row in chunk:
+        if row.trainer_id in trainer_ids:
+            kept.append((index, row.model_dump()))
+        else:
+            result.errors.append(schemas.ImportRowError(index=index, detail="Trainer not found"))
+    return kept
+
+
+async def name_pokemon_rows(database: Session, chunk, result, deferred: bool = False):
+    """
+        Keep the pokemons of chunk whose trainer exists and name them,
+        the others are reported in result
+        A name which could not be resolved, or every name when deferred, is left pending
+        and counted in result.pending
+    """
+    kept = await keep_owned_rows(database, chunk, result)
+    names = {} if deferred else await get_pokemon_names(
+        database, [row["api_id"] for _, row in kept])
+    named = [(index, {**row, "name": names.get(row["api_id"])}) for index, row in kept]
+    result.pending += sum(row["name"] is None for _, row in named)
+    return named
+
+
+async def bulk_import(database: Session, rows, schema, model, prepare=None):
+    """
+        Validate rows one at a time and insert the valid ones IMPORT_CHUNK_SIZE at a time
+        rows yields (index, object) pairs, see app.utils.bulk.read_import_rows
+        prepare(database, chunk, result) turns a chunk of validated rows into dicts
+        to insert and reports the rows it drops
+        A rejected row is reported in the result and does not stop the import
+    """
+    result = schemas.ImportResult()
+    chunk = []
+
+    async def flush():
+        if prepare is None:
+            kept = [(index, row.model_dump()) for index, row in chunk]
+        else:
+            kept = await prepare(database, chunk, result)
+        ids = await run_db(database, insert_rows, model, [row for _, row in kept])
+        await trainer_cache.invalidate_async(
+            *{row["trainer_id"] for _, row in kept if "trainer_id" in row})
+        result.ids.extend(ids)
+        result.inserted += len(ids)
+        chunk.clear()
+
+    async for index, payload in rows:
+        try:
+            if isinstance(payload, ValueError):
+                raise payload
+            chunk.append((index, schema.model_validate(payload)))
+        except ValueError as error:
+            result.errors.append(import_error(index, error))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await flush()
+    if chunk:
+        await flush()
+    result.errors.sort(key=lambda error: error.index)
+    return result
+
+
+async def import_trainers(database: Session, rows):
+    """
+        Bulk insert trainers, see bulk_import
+    """
+    return await bulk_import(database, rows, schemas.TrainerCreate, models.Trainer)
+
+
+async def import_items(database: Session, rows):
+    """
+        Bulk insert items, a row naming an unknown trainer is rejected
+    """
+    return await bulk_import(database, rows, schemas.ItemImport, models.Item, keep_owned_rows)
+
+
+async def import_pokemons(database: Session, rows, deferred: bool = False):
+    """
+        Bulk insert pokemons, a row naming an unknown trainer is rejected
+        Names are resolved once per distinct api_id of each chunk, see name_pokemon_rows
+    """
+    prepare = functools.partial(name_pokemon_rows, deferred=deferred)
+    return await bulk_import(database, rows, schemas.PokemonImport, models.Pokemon, prepare)
+
+
+def get_pending_api_ids(database: Session):
+    """
+        Return the api_ids of the pokemons whose name is pending
+    """
+    pending = database.query(models.Pokemon.api_id).filter(models.Pokemon.name.is_(None))
+    return [api_id for (api_id,) in pending.distinct()]
+
+
+def set_pokemon_names(database: Session, names):
+    """
+        Name the pending pokemons of each api_id with a single executemany UPDATE
+        Return the number of pokemons named and the ids of their trainers
+    """
+    if not names:
+        return 0, []
+    trainer_ids = [
+        trainer_id for (trainer_id,) in database.query(models.Pokemon.trainer_id)
+        .filter(models.Pokemon.api_id.in_(names), models.Pokemon.name.is_(None)).distinct()
+    ]
+    statement = (
+        update(models.Pokemon.__table__)
+        .where(models.Pokemon.api_id == bindparam("pending_api_id"))
+        .where(models.Pokemon.name.is_(None))
+        .values(name=bindparam("resolved_name"))
+    )
+    result = database.execute(statement, [
+        {"pending_api_id": api_id, "resolved_name": name} for api_id, name in names.items()
+    ])
+    database.commit()
+    return result.rowcount, trainer_ids
+
+
+async def fill_pending_names(api_ids=None):
+    """
+        Background worker naming the pokemons inserted with a pending name
+        Only the pokemons of api_ids are named if given, else every pending one
+        Runs in its own session, the one of the request is closed by then
+        Return the number of pokemons named
+    """
+    async with sqlite.ASYNC_SESSION_LOCAL() as database:
+        if api_ids is None:
+            api_ids = await run_db(database, get_pending_api_ids)
+        names = await get_pokemon_names(database, api_ids)
+        named, trainer_ids = await run_db(database, set_pokemon_names, names)
+    await trainer_cache.invalidate_async(*trainer_ids)
+    return named
+
+
+def export_rows(database: Session, model, batch_size: int = 1000):
+    """
+        Yield every row of the table of model, ordered by id, in batches of batch_size
+        Rows are read through a server-side cursor and never loaded all at once
+    """
+    table = model.__table__
+    result = database.execute(
+        select(table).order_by(table.c.id).execution_options(yield_per=batch_size))
+    yield from result.partitions()
+
+
+def search_table(database: Session, table: str, query: str, mode: str = "substring",
+                 limit: int = 20):
+    """
+        Find the rows of table whose searchable columns contain query, see app.utils.search
+        mode is substring, prefix, fuzzy (ranked by the trigrams shared with query)
+        or exact (plain equality)
+        Queries of less than 3 characters, or on a database without the index, scan with LIKE
+    """
+    columns = SEARCH_COLUMNS[table]
+    owner = "NULL" if table == "trainers" else "t.trainer_id"
+    sql = f"SELECT t.id, t.{columns[0]} AS text, {owner} AS trainer_id FROM {table} t"
+    params = {"limit": limit}
+    pattern = escape_like(query) + "%" if mode == "prefix" else f"%{escape_like(query)}%"
+    like = " OR ".join(f"t.{column} LIKE :pattern ESCAPE '\\'" for column in columns)
+    if mode == "exact":
+        sql += " WHERE " + " OR ".join(f"t.{column} = :query" for column in columns)
+        sql += " ORDER BY t.id"
+        params["query"] = query
+        return search_hits(database, table, sql, params)
+    if len(query) >= 3 and has_search_index(database.connection(), table):
+        fts_sql = sql + f" JOIN {table}_fts f ON f.rowid = t.id WHERE {table}_fts MATCH :match"
+        fts_params = {
+            **params, "match": fuzzy_query(query) if mode == "fuzzy" else phrase_query(query)}
+        if mode == "prefix":
+            fts_sql += f" AND ({like})"
+            fts_params["pattern"] = pattern
+        try:
+            return search_hits(database, table, fts_sql + " ORDER BY f.rank", fts_params)
+        except OperationalError:
+            # The index was dropped since it was looked up
+            forget_search_index(database.connection(), table)
+    sql += f" WHERE {like} ORDER BY t.id"
+    params["pattern"] = pattern
+    return search_hits(database, table, sql, params)
+
+
+def search_hits(database: Session, table: str, sql: str, params):
+    """
+        Run a search query on table and return its rows as SearchHit
+    """
+    rows = database.execute(text(sql + " LIMIT :limit"), params)
+    kind = table[:-1]
+    return [schemas.SearchHit(kind=kind, **row._asdict()) for row in rows]
+
+
+def search(database: Session, query: str, scope: str = "all", mode: str = "substring",
+           limit: int = 20):
+    """
+        Search trainer names, pokemon custom names and item names and descriptions
+        scope is a table name or all, each table returns at most limit hits
+    """
+    tables = list(SEARCH_COLUMNS) if scope == "all" else [scope]
+    return [hit for table in tables for hit in search_table(database, table, query, mode, limit)]
@@ -0,0 +1,128 @@
+"""
+    Async equivalents of app.actions working on an AsyncSession
+
+    Each function runs the synchronous action through AsyncSession.run_sync, so the
+    queries are the same and the I/O goes through the async driver.
+    The actions that already are coroutines accept an AsyncSession as is.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import actions, schemas
+from .actions import (  # pylint: disable=unused-import
+    DEFER_POKEMON_NAMES,
+    add_trainer_item,
+    add_trainer_pokemon,
+    add_trainer_pokemons,
+    fight_many_pokemons,
+    fight_pokemons,
+    fill_pending_names,
+    get_random_pokemons,
+    get_species_stats,
+    get_stat_matrix,
+    get_trainer_payload,
+    import_items,
+    import_pokemons,
+    import_trainers,
+    run_tournament,
+)
+
+
+async def get_species(database: AsyncSession, api_ids):
+    """
+        Find the species seeded in db, indexed by api_id
+    """
+    return await database.run_sync(actions.get_species, api_ids)
+
+
+async def get_trainer(database: AsyncSession, trainer_id: int, strategy: str = None):
+    """
+        Find a user by his id
+    """
+    return await database.run_sync(actions.get_trainer, trainer_id, strategy)
+
+
+async def get_trainer_by_name(database: AsyncSession, name: str):
+    """
+        Find a user by his name
+    """
+    return await database.run_sync(actions.get_trainer_by_name, name)
+
+
+async def get_trainers(database: AsyncSession, skip: int = 0, limit: int = 100,
+                       after_id: int = None, strategy: str = None):
+    """
+        Find all users
+        Default limit is 100
+    """
+    return await database.run_sync(actions.get_trainers, skip, limit, after_id, strategy)
+
+
+async def create_trainer(database: AsyncSession, trainer: schemas.TrainerCreate):
+    """
+        Create a new trainer
+    """
+    return await database.run_sync(actions.create_trainer, trainer)
+
+
+async def get_items(database: AsyncSession, skip: int = 0, limit: int = 100,
+                    after_id: int = None):
+    """
+        Find all items
+        Default limit is 100
+    """
+    return await database.run_sync(actions.get_items, skip, limit, after_id)
+
+
+async def get_pokemon(database: AsyncSession, pokemon_id: int):
+    """
+        Find a pokemon by his id
+    """
+    return await database.run_sync(actions.get_pokemon, pokemon_id)
+
+
+async def get_pokemons_by_ids(database: AsyncSession, pokemon_ids):
+    """
+        Find several pokemons with a single query, indexed by id
+    """
+    return await database.run_sync(actions.get_pokemons_by_ids, pokemon_ids)
+
+
+async def get_pokemons(database: AsyncSession, skip: int = 0, limit: int = 100,
+                       after_id: int = None):
+    """
+        Find all pokemons
+        Default limit is 100
+    """
+    return await database.run_sync(actions.get_pokemons, skip, limit, after_id)
+
+
+async def get_item_rows(database: AsyncSession, skip: int = 0, limit: int = 100,
+                        after_id: int = None):
+    """
+        Fast path of get_items, items are plain dicts
+    """
+    return await database.run_sync(actions.get_item_rows, skip, limit, after_id)
+
+
+async def get_pokemon_rows(database: AsyncSession, skip: int = 0, limit: int = 100,
+                           after_id: int = None):
+    """
+        Fast path of get_pokemons, pokemons are plain dicts
+    """
+    return await database.run_sync(actions.get_pokemon_rows, skip, limit, after_id)
+
+
+async def get_trainer_rows(database: AsyncSession, skip: int = 0, limit: int = 100,
+                           after_id: int = None):
+    """
+        Fast path of get_trainers, trainers are plain dicts
+    """
+    return await database.run_sync(actions.get_trainer_rows, skip, limit, after_id)
+
+
+async def search(database: AsyncSession, query: str, scope: str = "all",
+                 mode: str = "substring", limit: int = 20):
+    """
+        Search trainer names, pokemon custom names and item names and descriptions
+    """
+    return await database.run_sync(actions.search, query, scope, mode, limit)
@@ -0,0 +1,65 @@
+"""
+    Schema migrations
+
+    Each vNNNN_<name>.py module of this package is one migration: an upgrade(connection)
+    function run once, in its own transaction, in version order. Applied versions are
+    recorded in the schema_migrations table, so running the migrations again only
+    applies the new ones.
+
+    Usage: python -m app.migrations [--list] [--target VERSION]
+"""
+import importlib
+import pkgutil
+import time
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, insert, select
+
+SCHEMA_MIGRATIONS = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", Float, nullable=False),
+)
+
+
+def discover():
+    """
+        Return the (version, name, module) of every migration, in version order
+    """
+    migrations = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith("v") and info.name[1:5].isdigit():
+            module = importlib.import_module(f"{__name__}.{info.name}")
+            migrations.append((int(info.name[1:5]), info.name, module))
+    return sorted(migrations)
+
+
+def applied_versions(connection):
+    """
+        Return the versions already applied, creating the version table if needed
+    """
+    SCHEMA_MIGRATIONS.create(connection, checkfirst=True)
+    return set(connection.scalars(select(SCHEMA_MIGRATIONS.c.version)))
+
+
+def migrate(engine, target=None):
+    """
+        Apply the pending migrations up to target, every one by default
+        Return the names of the migrations applied
+    """
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+    applied = []
+    for version, name, module in discover():
+        if version in done or (target is not None and version > target):
+            continue
+        with engine.begin() as connection:
+            module.upgrade(connection)
+            # Another process may have applied it meanwhile, the DDL is idempotent
+            recorded = connection.scalar(select(SCHEMA_MIGRATIONS.c.version).where(
+                SCHEMA_MIGRATIONS.c.version == version))
+            if recorded is None:
+                connection.execute(insert(SCHEMA_MIGRATIONS).values(
+                    version=version, name=name, applied_at=time.time()))
+        applied.append(name)
+    return applied
@@ -0,0 +1,18 @@
+import argparse
+
+from app.migrations import applied_versions, discover, migrate
+from app.sqlite import engine
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade the database schema")
+    parser.add_argument("--list", action="store_true", help="show the migrations and exit")
+    parser.add_argument("--target", type=int, help="last version to apply")
+    args = parser.parse_args()
+    if args.list:
+        with engine.begin() as connection:
+            done = applied_versions(connection)
+        for version, name, _ in discover():
+            print(f"{'x' if version in done else ' '} {name}")
+    else:
+        names = migrate(engine, args.target)
+        print("\n".join(names) if names else "Schema up to date")
@@ -0,0 +1,28 @@
+"""
+    Tables of the models, as created by Base.metadata.create_all before migrations existed
+
+    The DDL is generated for the dialect of the connection, so the primary keys
+    auto-increment everywhere (SERIAL on PostgreSQL). checkfirst adopts a database
+    created by create_all as is.
+    The tables are the ones of the models: a later migration changing one of them must
+    check whether the change is already there.
+"""
+from app import models
+from app.utils.search import create_search_index
+
+TABLES = [
+    models.Trainer.__table__,
+    models.Pokemon.__table__,
+    models.Item.__table__,
+    models.PokeapiCacheEntry.__table__,
+    models.Species.__table__,
+]
+
+
+def upgrade(connection):
+    """
+        Create the tables, their indexes and the search index
+    """
+    for table in TABLES:
+        table.create(connection, checkfirst=True)
+    create_search_index(None, connection)
@@ -0,0 +1,43 @@
+"""
+    Index the foreign keys and drop the indexes no query uses
+
+    - ix_*_id duplicate the primary keys
+    - pokemons.name, pokemons.custom_name, items.name and items.description are only
+      searched through the FTS5 index, a B-tree on them only slows the inserts down
+    - pokemons.api_id is only filtered along with a pending name, which the partial
+      index ix_pokemons_pending_name covers
+    - relationship loads, tournaments and imports filter on trainer_id, which had no index
+"""
+from sqlalchemy import MetaData, Table
+
+from app import models
+
+DROPPED_INDEXES = {
+    "trainers": ["ix_trainers_id"],
+    "pokemons": ["ix_pokemons_id", "ix_pokemons_api_id", "ix_pokemons_name",
+                 "ix_pokemons_custom_name"],
+    "items": ["ix_items_id", "ix_items_name", "ix_items_description"],
+}
+
+CREATED_INDEXES = [
+    index
+    for table in (models.Pokemon.__table__, models.Item.__table__)
+    for index in table.indexes
+    if index.name in ("ix_pokemons_trainer_id_api_id", "ix_pokemons_pending_name",
+                      "ix_items_trainer_id")
+]
+
+
+def upgrade(connection):
+    """
+        Swap the unused indexes for the foreign key ones
+        The dropped indexes are found by reflection, only a database created by
+        create_all before migrations existed has them
+    """
+    for table_name, names in DROPPED_INDEXES.items():
+        table = Table(table_name, MetaData(), autoload_with=connection)
+        for index in table.indexes:
+            if index.name in names:
+                index.drop(connection)
+    for index in CREATED_INDEXES:
+        index.create(connection, checkfirst=True)
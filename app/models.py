@@ -1,8 +1,21 @@
 # pylint: disable=too-few-public-methods
 
-from sqlalchemy import Column, ForeignKey, Integer, String, Date
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Date, Float, event, text
 from sqlalchemy.orm import relationship
 from .sqlite import Base
+from .utils.search import create_search_index, drop_search_index
+
+# The tables are created and altered by app.migrations, a schema change here needs a migration
+
+# pokeapi stat name -> Species column
+STAT_COLUMNS = {
+    "hp": "hp",
+    "attack": "attack",
+    "defense": "defense",
+    "special-attack": "special_attack",
+    "special-defense": "special_defense",
+    "speed": "speed",
+}
 
 class Trainer(Base):
     """
@@ -10,7 +23,7 @@ class Trainer(Base):
     """
     __tablename__ = "trainers"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
     birthdate = Column(Date)
 
@@ -22,14 +35,19 @@ class Pokemon(Base):
         Class representing a pokemon
         Parameters:
             api_id (int): id from the pokeapi
-            name (str): Populate with the pokeapi data 
+            name (str): Populate with the pokeapi data, None while pending
     """
     __tablename__ = "pokemons"
+    __table_args__ = (
+        Index("ix_pokemons_trainer_id_api_id", "trainer_id", "api_id"),
+        Index("ix_pokemons_pending_name", "api_id",
+              sqlite_where=text("name IS NULL"), postgresql_where=text("name IS NULL")),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    api_id = Column(Integer, index=True)
-    name = Column(String, index=True)
-    custom_name = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    api_id = Column(Integer)
+    name = Column(String)
+    custom_name = Column(String)
     trainer_id = Column(Integer, ForeignKey("trainers.id"))
 
     trainer = relationship("Trainer", back_populates="pokemons")
@@ -40,9 +58,64 @@ class Item(Base):
     """
     __tablename__ = "items"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    description = Column(String, index=True)
-    trainer_id = Column(Integer, ForeignKey("trainers.id"))
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    description = Column(String)
+    trainer_id = Column(Integer, ForeignKey("trainers.id"), index=True)
 
     trainer = relationship("Trainer", back_populates="inventory")
+
+class PokeapiCacheEntry(Base):
+    """
+        Class representing a cached PokeAPI response
+        Parameters:
+            payload (str): JSON of the pokemon data
+            fetched_at (float): timestamp of the upstream call
+    """
+    __tablename__ = "pokeapi_cache"
+
+    api_id = Column(Integer, primary_key=True)
+    payload = Column(String)
+    fetched_at = Column(Float)
+
+class Species(Base):
+    """
+        Class representing a pokemon species seeded from the pokeapi
+        One row per species, one column per base stat
+    """
+    __tablename__ = "species"
+
+    api_id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    hp = Column(Integer)
+    attack = Column(Integer)
+    defense = Column(Integer)
+    special_attack = Column(Integer)
+    special_defense = Column(Integer)
+    speed = Column(Integer)
+
+    @classmethod
+    def from_pokeapi(cls, data):
+        """
+            Build a species from the pokeapi data of a pokemon
+        """
+        stats = {stat['stat']['name']: stat['base_stat'] for stat in data['stats']}
+        return cls(api_id=data['id'], name=data['name'], **{
+            column: stats.get(stat_name) for stat_name, column in STAT_COLUMNS.items()
+        })
+
+    @property
+    def stats(self):
+        """
+            Return the base stats in the pokeapi format
+        """
+        return [
+            {'stat': {'name': stat_name}, 'base_stat': getattr(self, column)}
+            for stat_name, column in STAT_COLUMNS.items()
+            if getattr(self, column) is not None
+        ]
+
+
+# Full text search tables, see app.utils.search
+event.listen(Base.metadata, "after_create", create_search_index)
+event.listen(Base.metadata, "before_drop", drop_search_index)
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.utils.metrics import TimedRoute
+from app.utils.profiler import profiler
+from app.utils.utils import require_admin
+from app import schemas
+
+router = APIRouter(route_class=TimedRoute, dependencies=[Depends(require_admin)])
+
+
+@router.post("/profiler", response_model=schemas.ProfilerStatus)
+async def start_profiler(requests: int = Query(0, ge=0), every: int = Query(0, ge=0)):
+    """
+        Profile the next requests requests, or one request in every every
+        Samples of the previous run are dropped
+    """
+    if not profiler.installed:
+        raise HTTPException(status_code=503, detail="Profiler unavailable on this server")
+    if (requests > 0) == (every > 0):
+        raise HTTPException(status_code=400, detail="Set either requests or every")
+    profiler.start(requests=requests, every=every)
+    return profiler.status()
+
+
+@router.delete("/profiler", response_model=schemas.ProfilerStatus)
+async def stop_profiler():
+    """
+        Stop profiling, the samples stay available
+    """
+    profiler.stop()
+    return profiler.status()
+
+
+@router.get("/profiler", response_model=schemas.ProfilerStatus)
+async def get_profiler_status():
+    """
+        Return the state of the profiler and the samples taken for each route
+    """
+    return profiler.status()
+
+
+@router.get("/profiler/stacks", response_class=PlainTextResponse)
+async def get_profiler_stacks(route: Optional[str] = None):
+    """
+        Return the collapsed stacks of route, e.g. "GET /pokemons/fight", or of every route
+        The output feeds flamegraph.pl or speedscope as is
+    """
+    return profiler.collapsed(route)
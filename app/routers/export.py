@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app import actions
+from app.sqlite import SESSION_LOCAL
+from app.utils.export import EXPORT_MEDIA_TYPES, EXPORT_SERIALIZERS, gzip_chunks
+from app.utils.metrics import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+
+def export_chunks(model, export_format, batch_size):
+    """
+        Stream the serialized table in its own session,
+        the response body is still being sent after the endpoint has returned
+    """
+    database = SESSION_LOCAL()
+    try:
+        columns = [column.name for column in model.__table__.columns]
+        batches = actions.export_rows(database, model, batch_size)
+        yield from EXPORT_SERIALIZERS[export_format](columns, batches)
+    finally:
+        database.close()
+
+
+@router.get("/{table}", response_class=StreamingResponse)
+def export_table(table: str,
+                 export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+                 gzip: bool = False, batch_size: int = Query(1000, gt=0)):
+    """
+        Stream a whole table as NDJSON or CSV, in constant memory
+        gzip compresses the stream, batch_size is the number of rows read at a time
+    """
+    model = actions.EXPORT_TABLES.get(table)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Table not found")
+    chunks = export_chunks(model, export_format, batch_size)
+    headers = {"Content-Disposition": f'attachment; filename="{table}.{export_format}"'}
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        chunks, media_type=EXPORT_MEDIA_TYPES[export_format], headers=headers)
@@ -1,16 +1,40 @@
-from typing import List
-from sqlalchemy.orm import Session
-from fastapi import APIRouter,  Depends
-from app.utils.utils import get_db
-from app import actions, schemas
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter,  Depends, Request
+from app.utils.bulk import read_import_rows
+from app.utils import serialization
+from app.utils.metrics import TimedRoute
+from app.utils.utils import get_after_id, get_async_db, set_next_cursor
+from app import async_actions, schemas
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/", response_model=List[schemas.Item])
-def get_items(skip: int = 0, limit: int = 100, database: Session = Depends(get_db)):
+async def get_items(skip: int = 0, limit: int = 100,
+                    after_id: Optional[int] = Depends(get_after_id),
+                    database: AsyncSession = Depends(get_async_db)):
     """
         Return all items
         Default limit is 100
+        Pass the X-Next-Cursor header of a page as cursor to get the next one
+        FAST_LIST_RESPONSES skips the ORM and the response_model validation
     """
-    items = actions.get_items(database, skip=skip, limit=limit)
-    return items
+    if serialization.FAST_LIST_RESPONSES:
+        items = await async_actions.get_item_rows(
+            database, skip=skip, limit=limit, after_id=after_id)
+        fast_response = serialization.FastJSONResponse(items)
+        set_next_cursor(fast_response, items, limit)
+        return fast_response
+    items = await async_actions.get_items(database, skip=skip, limit=limit, after_id=after_id)
+    page_response = serialization.list_response(schemas.ITEM_LIST, items)
+    set_next_cursor(page_response, items, limit)
+    return page_response
+
+
+@router.post("/import", response_model=schemas.ImportResult)
+async def import_items(request: Request, database: AsyncSession = Depends(get_async_db)):
+    """
+        Create items from a JSON array or an NDJSON stream, each row gives its trainer_id
+        Invalid rows are reported with their index, the valid ones are still inserted
+    """
+    return await async_actions.import_items(database, read_import_rows(request))
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+
+from app.utils.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("", include_in_schema=False)
+def get_metrics():
+    """
+        Return the request histograms in the Prometheus text format
+    """
+    content, media_type = render_metrics()
+    return Response(content, media_type=media_type)
@@ -1,33 +1,109 @@
-from typing import List
-from sqlalchemy.orm import Session
-from fastapi import APIRouter,  Depends
-from app import actions, schemas
-from app.utils.utils import get_db
+import json
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app import async_actions, schemas
+from app.utils.bulk import read_import_rows
+from app.utils import serialization
+from app.utils.metrics import TimedRoute
+from app.utils.utils import get_after_id, get_async_db, set_next_cursor
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/", response_model=List[schemas.Pokemon])
-def get_pokemons(skip: int = 0, limit: int = 100, database: Session = Depends(get_db)):
+async def get_pokemons(skip: int = 0, limit: int = 100,
+                       after_id: Optional[int] = Depends(get_after_id),
+                       database: AsyncSession = Depends(get_async_db)):
     """
         Return all pokemons
         Default limit is 100
+        Pass the X-Next-Cursor header of a page as cursor to get the next one
+        FAST_LIST_RESPONSES skips the ORM and the response_model validation
     """
-    pokemons = actions.get_pokemons(database, skip=skip, limit=limit)
-    return pokemons
+    if serialization.FAST_LIST_RESPONSES:
+        pokemons = await async_actions.get_pokemon_rows(
+            database, skip=skip, limit=limit, after_id=after_id)
+        fast_response = serialization.FastJSONResponse(pokemons)
+        set_next_cursor(fast_response, pokemons, limit)
+        return fast_response
+    pokemons = await async_actions.get_pokemons(
+        database, skip=skip, limit=limit, after_id=after_id)
+    page_response = serialization.list_response(schemas.POKEMON_LIST, pokemons)
+    set_next_cursor(page_response, pokemons, limit)
+    return page_response
 
 @router.get("/random/", response_model=List[schemas.PokemonWithStats])
-def get_random_pokemons(limit: int = 100, database: Session = Depends(get_db)):
+async def get_random_pokemons(limit: int = 100, sample_size: int = Query(3, ge=0),
+                              database: AsyncSession = Depends(get_async_db)):
     """
-        Return 3 random pokemons
-        Default limit is 3
+        Return sample_size random pokemons among the first limit ones
+        Default sample_size is 3
     """
-    pokemons = actions.get_random_pokemons(database, limit=limit)
+    pokemons = await async_actions.get_random_pokemons(
+        database, limit=limit, sample_size=sample_size)
     return pokemons
 
 @router.get("/fight", response_model=schemas.PokemonFightResult)
-def fight_pokemons(first_pokemon_id: int, second_pokemon_id: int,
-                   database: Session = Depends(get_db)):
+async def fight_pokemons(first_pokemon_id: int, second_pokemon_id: int,
+                         database: AsyncSession = Depends(get_async_db)):
     """
         Return result of the fight
     """
-    return actions.fight_pokemons(database, first_pokemon_id, second_pokemon_id)
+    result = await async_actions.fight_pokemons(database, first_pokemon_id, second_pokemon_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Pokemon not found")
+    return result
+
+@router.get("/tournament", response_model=schemas.TournamentResult)
+async def run_tournament(trainer_id: Optional[int] = None,
+                         pokemon_ids: Optional[List[int]] = Query(None),
+                         database: AsyncSession = Depends(get_async_db)):
+    """
+        Return the ranking of a round-robin tournament
+        The scope is pokemon_ids, else the team of trainer_id, else every pokemon
+    """
+    return await async_actions.run_tournament(
+        database, trainer_id=trainer_id, pokemon_ids=pokemon_ids)
+
+@router.post("/fights", response_class=StreamingResponse,
+             responses={200: {"content": {"application/x-ndjson": {}}}})
+async def fight_many_pokemons(fights: List[schemas.PokemonFight],
+                              database: AsyncSession = Depends(get_async_db)):
+    """
+        Return the results of a batch of fights, one PokemonFightResult per line
+        Results are streamed in the order of the fights
+    """
+    pokemon_ids = {fight.first_pokemon_id for fight in fights}
+    pokemon_ids |= {fight.second_pokemon_id for fight in fights}
+    pokemons = await async_actions.get_pokemons_by_ids(database, pokemon_ids)
+    missing = sorted(pokemon_ids - pokemons.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Pokemons not found: {missing}")
+    results = await async_actions.fight_many_pokemons(database, fights, pokemons)
+    return StreamingResponse(ndjson_lines(results), media_type="application/x-ndjson")
+
+
+def ndjson_lines(rows, chunk_size=1000):
+    """
+        Serialize rows as newline delimited JSON, chunk_size rows at a time
+    """
+    for start in range(0, len(rows), chunk_size):
+        yield "".join(json.dumps(row) + "\n" for row in rows[start:start + chunk_size])
+
+
+@router.post("/import", response_model=schemas.ImportResult)
+async def import_pokemons(request: Request, background_tasks: BackgroundTasks,
+                          deferred: bool = async_actions.DEFER_POKEMON_NAMES,
+                          database: AsyncSession = Depends(get_async_db)):
+    """
+        Create pokemons from a JSON array or an NDJSON stream, each row gives its trainer_id
+        Invalid rows are reported with their index, the valid ones are still inserted
+        With deferred the names are left pending, as are the ones PokeAPI could not give,
+        and filled in after the response
+    """
+    result = await async_actions.import_pokemons(
+        database, read_import_rows(request), deferred=deferred)
+    if result.pending:
+        background_tasks.add_task(async_actions.fill_pending_names)
+    return result
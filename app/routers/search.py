@@ -0,0 +1,24 @@
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi import APIRouter, Depends, Query
+
+from app.utils.metrics import TimedRoute
+from app.utils.utils import get_async_db
+from app import async_actions, schemas
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/", response_model=List[schemas.SearchHit])
+async def search(q: str = Query(..., min_length=1),
+                 scope: str = Query("all", pattern="^(all|trainers|pokemons|items)$"),
+                 mode: str = Query("substring", pattern="^(substring|prefix|fuzzy|exact)$"),
+                 limit: int = Query(20, gt=0, le=1000),
+                 database: AsyncSession = Depends(get_async_db)):
+    """
+        Search trainer names, pokemon custom names and item names and descriptions
+        mode is substring (default), prefix, fuzzy or exact
+        Each scope returns at most limit hits, best matches first
+    """
+    return await async_actions.search(database, q, scope=scope, mode=mode, limit=limit)
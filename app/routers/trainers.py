@@ -1,57 +1,123 @@
-from typing import List
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi import APIRouter,  Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, Response
 
-from app.utils.utils import get_db
-from app import actions, schemas
+from app.utils.bulk import read_import_rows
+from app.utils import serialization
+from app.utils.metrics import TimedRoute
+from app.utils.utils import etag_matches, get_after_id, get_async_db, set_next_cursor
+from app import async_actions, schemas
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/", response_model=schemas.Trainer)
-def create_trainer(trainer: schemas.TrainerCreate, database: Session = Depends(get_db)):
+async def create_trainer(trainer: schemas.TrainerCreate,
+                         database: AsyncSession = Depends(get_async_db)):
     """
         Create a trainer
     """
-    return actions.create_trainer(database=database, trainer=trainer)
+    return await async_actions.create_trainer(database=database, trainer=trainer)
+
+
+@router.post("/import", response_model=schemas.ImportResult)
+async def import_trainers(request: Request, database: AsyncSession = Depends(get_async_db)):
+    """
+        Create trainers from a JSON array or an NDJSON stream
+        Invalid rows are reported with their index, the valid ones are still inserted
+    """
+    return await async_actions.import_trainers(database, read_import_rows(request))
 
 
 @router.get("", response_model=List[schemas.Trainer])
-def get_trainers(skip: int = 0, limit: int = 100, database: Session = Depends(get_db)):
+async def get_trainers(skip: int = 0, limit: int = 100,
+                       after_id: Optional[int] = Depends(get_after_id),
+                       database: AsyncSession = Depends(get_async_db)):
     """
         Return all trainers
         Default limit is 100
+        Pass the X-Next-Cursor header of a page as cursor to get the next one
+        FAST_LIST_RESPONSES skips the ORM and the response_model validation
     """
-    trainers = actions.get_trainers(database, skip=skip, limit=limit)
-    return trainers
+    if serialization.FAST_LIST_RESPONSES:
+        trainers = await async_actions.get_trainer_rows(
+            database, skip=skip, limit=limit, after_id=after_id)
+        fast_response = serialization.FastJSONResponse(trainers)
+        set_next_cursor(fast_response, trainers, limit)
+        return fast_response
+    trainers = await async_actions.get_trainers(
+        database, skip=skip, limit=limit, after_id=after_id)
+    page_response = serialization.list_response(schemas.TRAINER_LIST, trainers)
+    set_next_cursor(page_response, trainers, limit)
+    return page_response
 
 
 @router.get("/{trainer_id}", response_model=schemas.Trainer)
-def get_trainer(trainer_id: int, database: Session = Depends(get_db)):
+async def get_trainer(trainer_id: int, if_none_match: Optional[str] = Header(None),
+                      database: AsyncSession = Depends(get_async_db)):
     """
         Return trainer from his id
+        Payloads are cached until the trainer gets an item or a pokemon,
+        a request whose If-None-Match holds the current ETag gets a 304 from the cache
     """
-    db_trainer = actions.get_trainer(database, trainer_id=trainer_id)
-    if db_trainer is None:
+    entry = await async_actions.get_trainer_payload(database, trainer_id=trainer_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Trainer not found")
-    return db_trainer
+    etag, payload = entry
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(payload, media_type="application/json", headers={"ETag": etag})
 
 
 @router.post("/{trainer_id}/item/", response_model=schemas.Item)
-def create_item_for_trainer(
-    trainer_id: int, item: schemas.ItemCreate, database: Session = Depends(get_db)
+async def create_item_for_trainer(
+    trainer_id: int, item: schemas.ItemCreate,
+    database: AsyncSession = Depends(get_async_db)
 ):
     """
         Add an item in trainer inventory
     """
-    return actions.add_trainer_item(database=database, item=item, trainer_id=trainer_id)
+    return await async_actions.add_trainer_item(
+        database=database, item=item, trainer_id=trainer_id)
 
 
 @router.post("/{trainer_id}/pokemon/", response_model=schemas.Pokemon)
-def create_pokemon_for_trainer(
-    trainer_id: int, pokemon: schemas.PokemonCreate, database: Session = Depends(get_db)
+async def create_pokemon_for_trainer(
+    trainer_id: int, pokemon: schemas.PokemonCreate, background_tasks: BackgroundTasks,
+    deferred: bool = async_actions.DEFER_POKEMON_NAMES,
+    database: AsyncSession = Depends(get_async_db)
 ):
     """
         Add a Pokemon to a trainer
+        With deferred the name is pending in the response and filled in afterwards
+    """
+    db_pokemon = await async_actions.add_trainer_pokemon(
+        database=database, pokemon=pokemon, trainer_id=trainer_id, deferred=deferred)
+    schedule_pending_names(background_tasks, [db_pokemon])
+    return db_pokemon
+
+
+@router.post("/{trainer_id}/pokemons/", response_model=List[schemas.Pokemon])
+async def create_pokemons_for_trainer(
+    trainer_id: int, pokemons: List[schemas.PokemonCreate], background_tasks: BackgroundTasks,
+    deferred: bool = async_actions.DEFER_POKEMON_NAMES,
+    database: AsyncSession = Depends(get_async_db)
+):
+    """
+        Add several Pokemons to a trainer, e.g. a full team
+        Names are resolved in parallel, once per species
+        With deferred the names are pending in the response and filled in afterwards
+    """
+    db_pokemons = await async_actions.add_trainer_pokemons(
+        database=database, pokemons=pokemons, trainer_id=trainer_id, deferred=deferred)
+    schedule_pending_names(background_tasks, db_pokemons)
+    return db_pokemons
+
+
+def schedule_pending_names(background_tasks, pokemons):
+    """
+        Fill in the pending names of pokemons once the response is sent
     """
-    return actions.add_trainer_pokemon(database=database, pokemon=pokemon, trainer_id=trainer_id)
+    pending = sorted({pokemon.api_id for pokemon in pokemons if pokemon.name is None})
+    if pending:
+        background_tasks.add_task(async_actions.fill_pending_names, pending)
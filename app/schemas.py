@@ -1,8 +1,8 @@
 # pylint: disable=too-few-public-methods
 
 from datetime import date
-from typing import  List, Optional, Union
-from pydantic import BaseModel
+from typing import  Dict, List, Optional, Union
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 
 #
 #  ITEM
@@ -14,12 +14,14 @@ class ItemBase(BaseModel):
 class ItemCreate(ItemBase):
     pass
 
+class ItemImport(ItemCreate):
+    trainer_id: int
+
 class Item(ItemBase):
     id: int
     trainer_id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 #
 #  POKEMON
@@ -31,13 +33,16 @@ class PokemonBase(BaseModel):
 class PokemonCreate(PokemonBase):
     pass
 
+class PokemonImport(PokemonCreate):
+    trainer_id: int
+
 class Pokemon(PokemonBase):
     id: int
-    name: str
+    # None while the name is pending, see actions.fill_pending_names
+    name: Optional[str] = None
     trainer_id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PokemonWithStats(Pokemon):
     stats : list
@@ -50,6 +55,19 @@ class PokemonFightResult(BaseModel):
     winner: Optional[str] = None
     draw: bool = False
 
+class TournamentStanding(BaseModel):
+    rank: int
+    pokemon_id: int
+    name: Optional[str] = None
+    custom_name: Optional[str] = None
+    wins: int
+    draws: int
+    losses: int
+
+class TournamentResult(BaseModel):
+    fights: int
+    standings: List[TournamentStanding] = []
+
 #
 #  TRAINER
 #
@@ -65,5 +83,45 @@ class Trainer(TrainerBase):
     inventory: List[Item] = []
     pokemons: List[Pokemon] = []
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+#
+#  IMPORT
+#
+class ImportRowError(BaseModel):
+    index: int
+    detail: str
+
+class ImportResult(BaseModel):
+    inserted: int = 0
+    # Rows inserted with a pending name, see actions.fill_pending_names
+    pending: int = 0
+    ids: List[int] = []
+    errors: List[ImportRowError] = []
+
+#
+#  SEARCH
+#
+class SearchHit(BaseModel):
+    kind: str
+    id: int
+    text: Optional[str] = None
+    trainer_id: Optional[int] = None
+
+#
+#  PROFILER
+#
+class ProfilerStatus(BaseModel):
+    running: bool
+    remaining_requests: int
+    every: int
+    profiled_requests: int
+    samples: Dict[str, int] = {}
+
+#
+#  LIST RESPONSES
+#
+# Validate a page of ORM objects and encode it to JSON in the pydantic core
+TRAINER_LIST = TypeAdapter(List[Trainer])
+POKEMON_LIST = TypeAdapter(List[Pokemon])
+ITEM_LIST = TypeAdapter(List[Item])
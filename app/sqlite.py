@@ -1,9 +1,129 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.utils.metrics import instrument_engine
+from app.utils.slow_queries import log_slow_queries
+
 SQLITE_URL = "sqlite:///./sqlite.db"
-engine = create_engine(SQLITE_URL, connect_args={"check_same_thread": False})
+DATABASE_URL = os.getenv("DATABASE_URL", SQLITE_URL)
+# Databases the queries and the migrations run on, MySQL has no INSERT ... RETURNING
+SUPPORTED_BACKENDS = ("sqlite", "postgresql")
+# Async driver used for each sync driver when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+# Performance profile applied on every new connection
+# Each pragma can be overridden with the SQLITE_<NAME> environment variable, e.g. SQLITE_MMAP_SIZE
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": "5000",
+    "cache_size": "-65536",
+    "mmap_size": "268435456",
+    "temp_store": "MEMORY",
+}
+SQLITE_POOL_SIZE = 20
+SQLITE_MAX_OVERFLOW = 20
+
+
+def sqlite_pragmas():
+    """
+        Return the pragmas of the performance profile, with the environment overrides
+    """
+    return {
+        name: os.getenv(f"SQLITE_{name.upper()}", default)
+        for name, default in SQLITE_PRAGMAS.items()
+    }
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """
+        Run the pragmas on a raw sqlite connection
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_sqlite_engine(url=SQLITE_URL, pragmas=None, factory=create_engine, **kwargs):
+    """
+        Create an engine applying the performance profile to every new connection
+        File databases get a pool sized by SQLITE_POOL_SIZE and SQLITE_MAX_OVERFLOW
+        factory is create_engine or create_async_engine
+    """
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+    kwargs.setdefault("connect_args", {"check_same_thread": False})
+    if make_url(url).database not in (None, "", ":memory:") and "poolclass" not in kwargs:
+        kwargs.setdefault("pool_size", int(os.getenv("SQLITE_POOL_SIZE", str(SQLITE_POOL_SIZE))))
+        kwargs.setdefault(
+            "max_overflow", int(os.getenv("SQLITE_MAX_OVERFLOW", str(SQLITE_MAX_OVERFLOW))))
+    new_engine = factory(url, **kwargs)
+
+    @event.listens_for(getattr(new_engine, "sync_engine", new_engine), "connect")
+    def on_connect(dbapi_connection, _connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+    return new_engine
+
+
+def check_backend(url):
+    """
+        Return the backend name of a database URL, raise ValueError if it is not supported
+    """
+    backend = make_url(url).get_backend_name()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported database {backend!r}, "
+                         f"expected one of {', '.join(SUPPORTED_BACKENDS)}")
+    return backend
+
+
+def async_url(url):
+    """
+        Return the URL of the async driver matching a database URL
+    """
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def create_database_engine(url=DATABASE_URL, **kwargs):
+    """
+        Create the engine of the configured database, SQLite gets the performance profile
+    """
+    if check_backend(url) == "sqlite":
+        return create_sqlite_engine(url, **kwargs)
+    return create_engine(url, pool_pre_ping=True, **kwargs)
+
+
+def create_async_database_engine(url=None, **kwargs):
+    """
+        Create the async engine of the configured database
+        Default URL is ASYNC_DATABASE_URL, else DATABASE_URL with its async driver
+    """
+    url = url or os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+    if check_backend(url) == "sqlite":
+        return create_sqlite_engine(url, factory=create_async_engine, **kwargs)
+    return create_async_engine(url, pool_pre_ping=True, **kwargs)
+
+
+engine = create_database_engine()
+instrument_engine(engine)
+log_slow_queries(engine)
 SESSION_LOCAL = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_database_engine()
+instrument_engine(async_engine)
+log_slow_queries(async_engine)
+ASYNC_SESSION_LOCAL = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
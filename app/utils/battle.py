@@ -0,0 +1,112 @@
+import numpy as np
+
+from app.models import STAT_COLUMNS
+
+# Column order of the stat matrices
+STAT_NAMES = tuple(STAT_COLUMNS)
+
+
+def stats_row(pokemon_stats):
+    """
+        Convert pokeapi stats to a matrix row, missing stats are NaN
+    """
+    row = np.full(len(STAT_NAMES), np.nan, dtype=np.float32)
+    for stat in pokemon_stats:
+        name = stat['stat']['name']
+        if name in STAT_COLUMNS:
+            row[STAT_NAMES.index(name)] = stat['base_stat']
+    return row
+
+
+def compare_rows(first_rows, second_rows):
+    """
+        Compare stat rows pairwise, 1 if the first row wins more stats,
+        -1 if the second one does, 0 for a draw
+        A stat missing on either side is not counted
+    """
+    wins = np.nan_to_num(np.sign(first_rows - second_rows))
+    return np.sign(wins.sum(axis=-1)).astype(np.int8)
+
+
+class StatMatrix:
+    """
+        Base stats of several species, one row per api_id and one column per stat
+    """
+    def __init__(self, api_ids, matrix):
+        self.index = {api_id: row for row, api_id in enumerate(api_ids)}
+        self.matrix = matrix
+
+    @classmethod
+    def from_stats(cls, stats_by_api_id):
+        """
+            Build the matrix from pokeapi stats indexed by api_id
+        """
+        matrix = np.empty((len(stats_by_api_id), len(STAT_NAMES)), dtype=np.float32)
+        for row, pokemon_stats in enumerate(stats_by_api_id.values()):
+            matrix[row] = stats_row(pokemon_stats)
+        return cls(list(stats_by_api_id), matrix)
+
+    @classmethod
+    def from_species(cls, species):
+        """
+            Build the matrix from rows of the species table
+        """
+        matrix = np.array(
+            [[getattr(row, column) for column in STAT_COLUMNS.values()] for row in species],
+            dtype=np.float32,
+        ).reshape(-1, len(STAT_NAMES))
+        return cls([row.api_id for row in species], matrix)
+
+    @classmethod
+    def stack(cls, *stat_matrices):
+        """
+            Join matrices covering distinct api_ids into one
+        """
+        api_ids = [api_id for stat_matrix in stat_matrices for api_id in stat_matrix.index]
+        matrix = np.concatenate([stat_matrix.matrix for stat_matrix in stat_matrices])
+        return cls(api_ids, matrix)
+
+    def rows(self, api_ids):
+        """
+            Return the matrix row numbers of api_ids
+        """
+        return np.fromiter((self.index[api_id] for api_id in api_ids), dtype=np.intp)
+
+    def compare(self, first_api_ids, second_api_ids):
+        """
+            Resolve a batch of fights, first_api_ids[i] against second_api_ids[i]
+            Return an array of 1 (first wins), -1 (second wins) and 0 (draw)
+        """
+        return compare_rows(
+            self.matrix[self.rows(first_api_ids)], self.matrix[self.rows(second_api_ids)])
+
+
+def outcome_matrix(matrix, block_size=256):
+    """
+        Return the outcome of every row against every other row,
+        outcomes[i, j] is the result of row i fighting row j
+        Rows are compared block_size at a time to bound the size of the intermediate arrays
+    """
+    parts = [
+        compare_rows(matrix[start:start + block_size, None, :], matrix[None, :, :])
+        for start in range(0, len(matrix), block_size)
+    ]
+    if not parts:
+        return np.zeros((0, 0), dtype=np.int8)
+    return np.concatenate(parts)
+
+
+def round_robin(stat_matrix, api_ids):
+    """
+        Fight every pokemon against every other one, pokemons being given by their api_id
+        Results only depend on the species, so each pair of species is compared once
+        Return the wins, draws and losses of each pokemon
+    """
+    rows = stat_matrix.rows(api_ids)
+    outcomes = outcome_matrix(stat_matrix.matrix)
+    counts = np.bincount(rows, minlength=len(stat_matrix.matrix))
+    wins = (outcomes == 1).astype(np.int64) @ counts
+    draws = (outcomes == 0).astype(np.int64) @ counts
+    losses = (outcomes == -1).astype(np.int64) @ counts
+    # A pokemon does not fight itself, which would count as a draw
+    return wins[rows], draws[rows] - 1, losses[rows]
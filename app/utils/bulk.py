@@ -0,0 +1,60 @@
+"""
+    Read the body of the bulk import endpoints
+
+    A body is either a JSON array or an NDJSON stream (one object per line,
+    Content-Type application/x-ndjson). NDJSON lines are parsed as they arrive,
+    so a large import is validated and inserted while it is still uploading.
+"""
+import json
+
+from fastapi import HTTPException
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+
+def is_ndjson(request):
+    """
+        Tell if the request body is an NDJSON stream
+    """
+    content_type = request.headers.get("content-type", "")
+    return content_type.split(";")[0].strip().lower() in NDJSON_CONTENT_TYPES
+
+
+def parse_line(line):
+    """
+        Decode an NDJSON line, return the ValueError instead of raising it
+        so that a bad line is reported without stopping the import
+    """
+    try:
+        return json.loads(line)
+    except ValueError as error:
+        return ValueError(f"Invalid JSON: {error}")
+
+
+async def read_import_rows(request):
+    """
+        Yield the index and the decoded object of each row of the body,
+        a row which is not valid JSON is yielded as a ValueError
+        Raise a 400 HTTPException if a JSON body is not an array
+    """
+    if not is_ndjson(request):
+        try:
+            rows = await request.json()
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail="Invalid JSON body") from error
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array")
+        for index, row in enumerate(rows):
+            yield index, row
+        return
+
+    index, buffer = 0, b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, parse_line(line)
+                index += 1
+    if buffer.strip():
+        yield index, parse_line(buffer)
@@ -0,0 +1,486 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app import models, sqlite
+from app.utils.singleflight import SingleFlight
+
+# Only the fields the app reads are kept, a full PokeAPI payload weighs hundreds of KB
+CACHED_FIELDS = ("id", "name", "stats", "types")
+
+
+class LRUCache:
+    """
+        Thread safe in-process cache with a size cap
+        The least recently used entry is evicted once maxsize is reached
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+            Return the entry stored for key and mark it as recently used
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        """
+            Store an entry, evicting the oldest one if the cache is full
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+            Remove an entry and return it
+        """
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def clear(self):
+        """
+            Remove every entry
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+class PokeapiCache:
+    """
+        Two tier cache for the PokeAPI responses
+        Parameters:
+            maxsize (int): number of entries kept in memory
+            ttl (float): seconds during which an entry is fresh
+            stale_ttl (float): seconds after ttl during which an entry is
+                served while being refreshed in background
+        Concurrent misses on the same api_id share one upstream call through flights
+    """
+    def __init__(self, maxsize=1024, ttl=7 * 24 * 3600, stale_ttl=30 * 24 * 3600):
+        self.memory = LRUCache(maxsize)
+        self.flights = SingleFlight()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.counters = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.reset_counters()
+
+    @classmethod
+    def from_env(cls):
+        """
+            Build a cache configured with the POKEAPI_CACHE_* environment variables
+        """
+        return cls(
+            maxsize=int(os.getenv("POKEAPI_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("POKEAPI_CACHE_TTL", str(7 * 24 * 3600))),
+            stale_ttl=float(os.getenv("POKEAPI_CACHE_STALE_TTL", str(30 * 24 * 3600))),
+        )
+
+    def reset_counters(self):
+        """
+            Set every hit/miss counter back to 0
+        """
+        self.counters = {
+            "memory_hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0,
+        }
+
+    def clear(self):
+        """
+            Empty the memory tier and the counters, the disk tier is left untouched
+        """
+        self.memory.clear()
+        self.reset_counters()
+        self.flights.deduplicated = 0
+
+    def get(self, api_id, fetch):
+        """
+            Return the data of a pokemon, calling fetch(api_id) only when
+            no usable entry exists in memory or on disk
+        """
+        api_id = int(api_id)
+        entry, usable = self._check(api_id, *self._lookup(api_id), fetch)
+        if usable:
+            return entry[0]
+        try:
+            return self.flights.do(api_id, self._fetch_and_store, api_id, fetch)
+        except Exception:  # pylint: disable=broad-except
+            # An expired entry is still better than an upstream outage
+            if entry is None:
+                raise
+            return entry[0]
+
+    async def get_async(self, api_id, fetch, refresh):
+        """
+            Same as get for coroutine fetchers
+            refresh(api_id) is the synchronous fetcher used by background refreshes
+            The disk tier is read and written in a worker thread, off the event loop
+        """
+        api_id = int(api_id)
+        entry = self.memory.get(api_id)
+        if entry is not None:
+            entry, usable = self._check(api_id, entry, "memory_hits", refresh)
+        else:
+            entry, usable = self._check(
+                api_id, *await asyncio.to_thread(self._load_to_memory, api_id), refresh)
+        if usable:
+            return entry[0]
+        try:
+            return await self.flights.do_async(
+                api_id, self._fetch_and_store_async, api_id, fetch)
+        except Exception:  # pylint: disable=broad-except
+            if entry is None:
+                raise
+            return entry[0]
+
+    def _lookup(self, api_id):
+        """
+            Return the cached entry of a pokemon and the tier it comes from
+        """
+        entry = self.memory.get(api_id)
+        if entry is None:
+            return self._load_to_memory(api_id)
+        return entry, "memory_hits"
+
+    def _load_to_memory(self, api_id):
+        """
+            Read the entry of a pokemon from the disk tier and keep it in memory
+        """
+        entry = self._load(api_id)
+        if entry is not None:
+            self.memory.set(api_id, entry)
+        return entry, "disk_hits"
+
+    def _check(self, api_id, entry, tier, refresh):
+        """
+            Return the cached entry of a pokemon and whether it can be served as is
+        """
+        if entry is not None:
+            age = time.time() - entry[1]
+            if age <= self.ttl:
+                self._count(tier)
+                return entry, True
+            if age <= self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._refresh_in_background(api_id, refresh)
+                return entry, True
+
+        self._count("misses")
+        return entry, False
+
+    def _fetch_and_store(self, api_id, fetch):
+        return self.store(api_id, fetch(api_id))
+
+    async def _fetch_and_store_async(self, api_id, fetch):
+        data = await fetch(api_id)
+        return await asyncio.to_thread(self.store, api_id, data)
+
+    def store(self, api_id, data):
+        """
+            Save the data of a pokemon in both tiers and return the trimmed data
+        """
+        api_id = int(api_id)
+        data = {key: value for key, value in data.items() if key in CACHED_FIELDS}
+        fetched_at = time.time()
+        self.memory.set(api_id, (data, fetched_at))
+        self._save(api_id, data, fetched_at)
+        return data
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _refresh_in_background(self, api_id, fetch):
+        with self._lock:
+            if api_id in self._refreshing:
+                return
+            self._refreshing.add(api_id)
+        threading.Thread(target=self._refresh, args=(api_id, fetch), daemon=True).start()
+
+    def _refresh(self, api_id, fetch):
+        try:
+            self.store(api_id, fetch(api_id))
+            self._count("refreshes")
+        except Exception:  # pylint: disable=broad-except
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(api_id)
+
+    @staticmethod
+    def _load(api_id):
+        database = sqlite.SESSION_LOCAL()
+        try:
+            row = database.get(models.PokeapiCacheEntry, api_id)
+            if row is None:
+                return None
+            return json.loads(row.payload), row.fetched_at
+        finally:
+            database.close()
+
+    @staticmethod
+    def _save(api_id, data, fetched_at):
+        database = sqlite.SESSION_LOCAL()
+        try:
+            database.merge(models.PokeapiCacheEntry(
+                api_id=api_id, payload=json.dumps(data), fetched_at=fetched_at))
+            database.commit()
+        finally:
+            database.close()
+
+
+class RedisBackend:
+    """
+        Shared backend of TrainerCache on a Redis server, needs the redis package
+        Each trainer has a version key, incremented by every invalidation, and an entry
+        written only if the version is still the one read before the db query
+        Parameters:
+            ttl (int): seconds an entry or a version is kept, bounds the memory used
+    """
+    # KEYS: entry, version; ARGV: value, expected version, ttl
+    STORE_SCRIPT = """
+        if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then
+            return 0
+        end
+        redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+        return 1
+    """
+
+    def __init__(self, url, ttl=3600, prefix="trainer:"):
+        import redis  # pylint: disable=import-outside-toplevel,import-error
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self._store = self.client.register_script(self.STORE_SCRIPT)
+
+    def get(self, key):
+        """
+            Return the bytes stored for key, None if missing
+        """
+        return self.client.get(f"{self.prefix}{key}")
+
+    def version(self, key):
+        """
+            Return the number of invalidations of key, 0 once its version expired
+        """
+        return int(self.client.get(f"{self.prefix}ver:{key}") or 0)
+
+    def set_if_version(self, key, value, version):
+        """
+            Store bytes for key unless key was invalidated since version was read
+            Return whether the bytes are stored
+        """
+        return bool(self._store(
+            keys=[f"{self.prefix}{key}", f"{self.prefix}ver:{key}"],
+            args=[value, version, self.ttl]))
+
+    def invalidate(self, key):
+        """
+            Increment the version of key and remove its entry, in one transaction
+        """
+        with self.client.pipeline(transaction=True) as pipeline:
+            pipeline.incr(f"{self.prefix}ver:{key}")
+            pipeline.expire(f"{self.prefix}ver:{key}", self.ttl)
+            pipeline.delete(f"{self.prefix}{key}")
+            pipeline.execute()
+
+
+def make_etag(payload):
+    """
+        Return the strong ETag of a payload
+    """
+    return f'"{hashlib.blake2b(payload, digest_size=8).hexdigest()}"'
+
+
+class TrainerCache:
+    """
+        Cache of serialized trainer payloads with their ETag, indexed by trainer id
+        Entries live in an in-process LRU, or in backend when one is given,
+        so that every worker sees the same entries and the same invalidations
+        invalidate gives a trainer a new version: a payload read from db before
+        a write is not stored once the write invalidated it
+        The versions are kept in backend when there is one, so an invalidation made by
+        a worker also stops the stores of the others
+        Coroutines use the *_async methods, which call backend in a worker thread
+        Parameters:
+            generation (int): version given to the last trainer invalidated in memory
+    """
+    def __init__(self, maxsize=1024, backend=None):
+        self.memory = LRUCache(maxsize)
+        self.backend = backend
+        self.counters = {"hits": 0, "misses": 0, "invalidations": 0}
+        self.generation = 0
+        # A trainer whose version was evicted is not stored until it is read again
+        self._versions = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+            Build a cache configured with the TRAINER_CACHE_* environment variables
+            TRAINER_CACHE_REDIS_URL switches to the shared Redis backend
+        """
+        backend = None
+        if os.getenv("TRAINER_CACHE_REDIS_URL"):
+            backend = RedisBackend(
+                os.environ["TRAINER_CACHE_REDIS_URL"],
+                ttl=int(os.getenv("TRAINER_CACHE_TTL", "3600")))
+        return cls(maxsize=int(os.getenv("TRAINER_CACHE_SIZE", "1024")), backend=backend)
+
+    def get(self, trainer_id):
+        """
+            Return the (etag, payload) cached for a trainer, None on a miss
+        """
+        if self.backend is None:
+            return self._count(self.memory.get(trainer_id))
+        return self._count(self._decode(self.backend.get(trainer_id)))
+
+    async def get_async(self, trainer_id):
+        """
+            Coroutine version of get
+        """
+        if self.backend is None:
+            return self._count(self.memory.get(trainer_id))
+        return self._count(self._decode(await asyncio.to_thread(self.backend.get, trainer_id)))
+
+    def version(self, trainer_id):
+        """
+            Return the version of a trainer, to read before the db query and pass to store
+        """
+        if self.backend is None:
+            return self._memory_version(trainer_id)
+        return self.backend.version(trainer_id)
+
+    async def version_async(self, trainer_id):
+        """
+            Coroutine version of version
+        """
+        if self.backend is None:
+            return self._memory_version(trainer_id)
+        return await asyncio.to_thread(self.backend.version, trainer_id)
+
+    def store(self, trainer_id, payload, version=None):
+        """
+            Cache the JSON payload of a trainer and return its (etag, payload)
+            Nothing is cached if the trainer was invalidated since version was read,
+            without version the payload is taken as up to date
+        """
+        entry = (make_etag(payload), payload)
+        if self.backend is None:
+            self._store_in_memory(trainer_id, entry, version)
+        else:
+            if version is None:
+                version = self.backend.version(trainer_id)
+            self.backend.set_if_version(trainer_id, self._encode(entry), version)
+        return entry
+
+    async def store_async(self, trainer_id, payload, version=None):
+        """
+            Coroutine version of store
+        """
+        if self.backend is None:
+            return self.store(trainer_id, payload, version)
+        return await asyncio.to_thread(self.store, trainer_id, payload, version)
+
+    def invalidate(self, *trainer_ids):
+        """
+            Drop the cached payloads of trainers after a write
+        """
+        self._bump(trainer_ids)
+        if self.backend is not None:
+            self.invalidate_backend(trainer_ids)
+
+    async def invalidate_async(self, *trainer_ids):
+        """
+            Coroutine version of invalidate
+        """
+        self._bump(trainer_ids)
+        if self.backend is not None and trainer_ids:
+            await asyncio.to_thread(self.invalidate_backend, trainer_ids)
+
+    def invalidate_backend(self, trainer_ids):
+        """
+            Bump the versions of trainers in backend and delete their entries
+        """
+        for trainer_id in trainer_ids:
+            self.backend.invalidate(trainer_id)
+
+    def clear(self):
+        """
+            Empty the memory entries and the counters
+        """
+        self.memory.clear()
+        self.counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _count(self, entry):
+        """
+            Count a lookup as a hit or a miss and return its entry
+        """
+        with self._lock:
+            self.counters["hits" if entry is not None else "misses"] += 1
+        return entry
+
+    def _memory_version(self, trainer_id):
+        """
+            Return the version of a trainer in memory, the current generation if unknown
+        """
+        with self._lock:
+            version = self._versions.get(trainer_id)
+            if version is None:
+                version = self.generation
+                self._versions.set(trainer_id, version)
+            return version
+
+    def _store_in_memory(self, trainer_id, entry, version):
+        """
+            Store entry in memory unless the trainer was invalidated since version was read
+        """
+        with self._lock:
+            if version is None or self._versions.get(trainer_id) == version:
+                self.memory.set(trainer_id, entry)
+
+    def _bump(self, trainer_ids):
+        """
+            Give each trainer a new version in memory and drop its memory entry
+        """
+        with self._lock:
+            for trainer_id in trainer_ids:
+                self.generation += 1
+                self._versions.set(trainer_id, self.generation)
+                self.memory.pop(trainer_id)
+                self.counters["invalidations"] += 1
+
+    @staticmethod
+    def _encode(entry):
+        """
+            Return the bytes stored in backend for an (etag, payload) entry
+        """
+        return entry[0].encode() + b"\n" + entry[1]
+
+    @staticmethod
+    def _decode(stored):
+        """
+            Return the (etag, payload) entry of bytes read from backend, None if missing
+        """
+        if stored is None:
+            return None
+        etag, payload = stored.split(b"\n", 1)
+        return etag.decode(), payload
@@ -0,0 +1,64 @@
+"""
+    Serialize table exports chunk by chunk
+
+    Each function takes the column names and an iterable of row batches, as yielded by
+    actions.export_rows, and yields one chunk of text per batch, so only a batch is
+    held in memory whatever the size of the table.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def json_default(value):
+    """
+        Serialize the values json does not know, i.e. dates
+    """
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def ndjson_chunks(columns, batches):
+    """
+        Yield each batch as newline delimited JSON objects
+    """
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=json_default) + "\n" for row in rows)
+
+
+def csv_chunks(columns, batches):
+    """
+        Yield the CSV header, then each batch as CSV lines
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty table
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks, level=6):
+    """
+        Compress a stream of text chunks into a single gzip stream
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORT_SERIALIZERS = {"ndjson": ndjson_chunks, "csv": csv_chunks}
@@ -0,0 +1,303 @@
+"""
+    Time spent by each request in SQL, in PokeAPI calls and in serialization
+
+    TimingMiddleware gives every request a RequestTimings, reachable from the code it runs
+    through a context variable, so the SQL events, the PokeAPI calls and the routes add
+    their durations to it without being passed anything.
+    The phases are sent back in a Server-Timing header and observed in the Prometheus
+    histograms served by /metrics.
+    Durations of concurrent calls (asyncio.gather) are summed, so a phase can last longer
+    than the request.
+"""
+import asyncio
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import prometheus_client
+from prometheus_client.core import CounterMetricFamily
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+# Phases of a request, with the unit of their count in the Server-Timing description
+PHASES = {"db": "queries", "pokeapi": "calls", "serialize": None}
+UNMATCHED_ROUTE = "unmatched"
+
+_timings = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+        Durations, in seconds, and counts of the phases of a request
+        Parameters:
+            route (str): path of the matched route, e.g. /trainers/{trainer_id}
+            endpoint_end (float): perf_counter when the endpoint returned
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.route = UNMATCHED_ROUTE
+        self.endpoint_end = None
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+
+    def add(self, phase, duration):
+        """
+            Add a call of duration seconds to a phase
+        """
+        self.durations[phase] += duration
+        self.counts[phase] += 1
+
+    def elapsed(self):
+        """
+            Return the seconds elapsed since the start of the request
+        """
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """
+            Return the value of the Server-Timing header, durations in milliseconds
+        """
+        metrics = []
+        for phase, unit in PHASES.items():
+            metric = f"{phase};dur={self.durations[phase] * 1000:.2f}"
+            if unit is not None:
+                metric += f';desc="{self.counts[phase]} {unit}"'
+            metrics.append(metric)
+        metrics.append(f"app;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+def current_timings():
+    """
+        Return the RequestTimings of the running request, None outside of a request
+    """
+    return _timings.get()
+
+
+@contextmanager
+def request_timings():
+    """
+        Make a new RequestTimings the one of the running request for the block
+    """
+    timings = RequestTimings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def timed(phase):
+    """
+        Add the duration of the block to a phase of the running request, if any
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+
+
+def instrument_engine(engine):
+    """
+        Count the queries run by engine and their duration in the db phase
+        Async engines are instrumented through their sync_engine
+    """
+    bind = getattr(engine, "sync_engine", engine)
+    if event.contains(bind, "before_cursor_execute", before_cursor_execute):
+        return
+
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    event.listen(bind, "after_cursor_execute", after_cursor_execute)
+
+
+def before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+    """
+        Remember when the query started, on a stack as a connection can nest queries
+    """
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+    """
+        Add the duration of the query to the db phase of the running request
+    """
+    start = conn.info["query_start"].pop()
+    timings = _timings.get()
+    if timings is not None:
+        timings.add("db", time.perf_counter() - start)
+
+
+def create_histograms():
+    """
+        Create the Prometheus histograms of the requests
+    """
+    histogram = prometheus_client.Histogram
+    return {
+        "duration": histogram(
+            "http_request_duration_seconds", "Duration of the requests",
+            ["method", "route", "status"]),
+        "phase": histogram(
+            "http_request_phase_seconds", "Time spent by the requests in each phase",
+            ["route", "phase"]),
+        "db": histogram(
+            "http_request_db_queries", "SQL queries run by the requests",
+            ["route"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, float("inf"))),
+        "pokeapi": histogram(
+            "http_request_pokeapi_calls", "PokeAPI calls made by the requests",
+            ["route"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, float("inf"))),
+    }
+
+
+HISTOGRAMS = create_histograms()
+
+
+def observe(method, status, timings):
+    """
+        Record a finished request in the Prometheus histograms
+    """
+    route = timings.route
+    HISTOGRAMS["duration"].labels(method, route, status).observe(timings.elapsed())
+    for phase, duration in timings.durations.items():
+        HISTOGRAMS["phase"].labels(route, phase).observe(duration)
+    HISTOGRAMS["db"].labels(route).observe(timings.counts["db"])
+    HISTOGRAMS["pokeapi"].labels(route).observe(timings.counts["pokeapi"])
+
+
+class CountersCollector:  # pylint: disable=too-few-public-methods
+    """
+        Prometheus collector exposing a dict of counters read at scrape time,
+        one sample per key of the dict, the key as value of label
+    """
+    def __init__(self, name, documentation, label, counters):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.counters = counters
+
+    def collect(self):
+        """
+            Yield the counter family holding the current values
+        """
+        family = CounterMetricFamily(self.name, self.documentation, labels=[self.label])
+        for key, value in dict(self.counters()).items():
+            family.add_metric([key], value)
+        yield family
+
+
+def register_counters(name, documentation, label, counters):
+    """
+        Expose the dict returned by counters() in /metrics as the counter name_total
+    """
+    prometheus_client.REGISTRY.register(CountersCollector(name, documentation, label, counters))
+
+
+def render_metrics():
+    """
+        Return the Prometheus exposition of the metrics and its content type
+    """
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+
+
+class TimingMiddleware:  # pylint: disable=too-few-public-methods
+    """
+        ASGI middleware timing every HTTP request
+        The Server-Timing header is added when the response starts, the histograms are
+        observed once the body is sent, so streamed responses count in full
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        with request_timings() as timings:
+            async def send_with_timing(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing().encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                observe(scope["method"], status, timings)
+
+
+def timed_endpoint(endpoint):
+    """
+        Wrap an endpoint to record when it returns, what follows is serialization
+    """
+    if getattr(endpoint, "timed", False):
+        return endpoint
+
+    def mark_end():
+        timings = _timings.get()
+        if timings is not None:
+            timings.endpoint_end = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                mark_end()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                mark_end()
+    wrapper.timed = True
+    return wrapper
+
+
+def route_template(path, path_format):
+    """
+        Return the template of the route matching path, with the prefix of its router
+        path_format only holds the path of the route inside its router, e.g. /{trainer_id},
+        so the prefix is taken from the segments of path it does not cover
+    """
+    depth = path_format.count("/")
+    prefix = path.rsplit("/", depth)[0] if depth else path
+    return prefix + path_format
+
+
+class TimedRoute(APIRoute):
+    """
+        Route recording its path and the time FastAPI spends validating and encoding
+        the value returned by the endpoint, in the serialize phase
+    """
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path_format = self.path_format
+
+        async def timed_handler(request):
+            timings = _timings.get()
+            if timings is None:
+                return await handler(request)
+            timings.route = route_template(request.scope["path"], path_format)
+            response = await handler(request)
+            if timings.endpoint_end is not None:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_end)
+            return response
+
+        return timed_handler
@@ -1,6 +1,52 @@
+import asyncio
+import importlib.util
+import os
+import weakref
+
+import httpx
 import requests
 
-BASE_URL = "https://pokeapi.co/api/v2"
+from app.utils.battle import compare_rows, stats_row
+from app.utils.cache import PokeapiCache
+from app.utils.metrics import register_counters, timed
+
+# Point POKEAPI_BASE_URL to benchmarks/pokeapi_stub.py for load tests
+BASE_URL = os.getenv("POKEAPI_BASE_URL", "https://pokeapi.co/api/v2")
+TIMEOUT = 10
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+pokemon_cache = PokeapiCache.from_env()
+register_counters(
+    "pokeapi_cache_lookups", "Lookups of the PokeAPI cache by result", "result",
+    lambda: {**pokemon_cache.counters, "deduplicated": pokemon_cache.flights.deduplicated})
+# Keep-alive connection pool shared by the synchronous calls
+http_session = requests.Session()
+# One async client per event loop, httpx connections cannot move between loops
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client():
+    """
+        Return the pooled async HTTP client of the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=HTTP2,
+            timeout=TIMEOUT,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        _async_clients[loop] = client
+    return client
+
+async def close_async_client():
+    """
+        Close the async HTTP client of the running event loop
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
 
 def get_pokemon_name(api_id):
     """
@@ -17,8 +63,61 @@ def get_pokemon_stats(api_id):
 def get_pokemon_data(api_id):
     """
         Get data of pokemon name from the API pokeapi
+        Responses are served from pokemon_cache when possible
+    """
+    return pokemon_cache.get(api_id, fetch_pokemon_data)
+
+def fetch_pokemon_data(api_id):
+    """
+        Get data of pokemon name from the API pokeapi, bypassing the cache
+    """
+    with timed("pokeapi"):
+        return http_session.get(f"{BASE_URL}/pokemon/{api_id}", timeout=TIMEOUT).json()
+
+async def get_pokemon_name_async(api_id):
+    """
+        Get a pokemon name from the API pokeapi without blocking the event loop
+    """
+    return (await get_pokemon_data_async(api_id))['name']
+
+async def get_pokemon_stats_async(api_id):
+    """
+        Get pokemon stats from the API pokeapi without blocking the event loop
+    """
+    return (await get_pokemon_data_async(api_id))['stats']
+
+async def get_many_pokemon_stats_async(api_ids):
+    """
+        Get the stats of several pokemons concurrently, in the order of api_ids
+    """
+    return await asyncio.gather(*(get_pokemon_stats_async(api_id) for api_id in api_ids))
+
+async def get_pokemon_data_async(api_id):
+    """
+        Get data of pokemon name from the API pokeapi without blocking the event loop
+        Responses are served from pokemon_cache when possible
+    """
+    return await pokemon_cache.get_async(api_id, fetch_pokemon_data_async, fetch_pokemon_data)
+
+async def fetch_species_list_async():
+    """
+        Get the (api_id, name) of every pokemon listed by the API pokeapi
+    """
+    with timed("pokeapi"):
+        response = await get_async_client().get(
+            f"{BASE_URL}/pokemon", params={"limit": 100000})
+    return [
+        (int(result['url'].rstrip('/').rsplit('/', 1)[-1]), result['name'])
+        for result in response.json()['results']
+    ]
+
+async def fetch_pokemon_data_async(api_id):
+    """
+        Get data of pokemon name from the API pokeapi, bypassing the cache
     """
-    return requests.get(f"{BASE_URL}/pokemon/{api_id}", timeout=10).json()
+    with timed("pokeapi"):
+        response = await get_async_client().get(f"{BASE_URL}/pokemon/{api_id}")
+        return response.json()
 
 def battle_pokemon(first_api_id, second_api_id):
     """
@@ -36,22 +135,6 @@ def battle_pokemon(first_api_id, second_api_id):
 def battle_compare_stats(first_pokemon_stats, second_pokemon_stats):
     """
         Compare stats of two pokemon to choose the winner
+        The pokemon winning the most stats wins: 1 for the first, -1 for the second, 0 for a draw
     """
-    first_stats = {stat['stat']['name']: stat['base_stat'] for stat in first_pokemon_stats}
-    second_stats = {stat['stat']['name']: stat['base_stat'] for stat in second_pokemon_stats}
-
-    score = 0
-    for stat_name, first_value in first_stats.items():
-        second_value = second_stats.get(stat_name)
-        if second_value is None:
-            continue
-        if first_value > second_value:
-            score += 1
-        elif first_value < second_value:
-            score -= 1
-
-    if score > 0:
-        return 1
-    if score < 0:
-        return -1
-    return 0
+    return int(compare_rows(stats_row(first_pokemon_stats), stats_row(second_pokemon_stats)))
@@ -0,0 +1,84 @@
+"""
+    Seed the species table with every pokemon of the pokeapi
+
+    Usage: python -m app.utils.prefetch [--concurrency 10] [--batch-size 100]
+
+    Species already stored are skipped, so an interrupted run resumes where it stopped.
+"""
+import argparse
+import asyncio
+import logging
+
+from app import models, sqlite
+from app.utils.pokeapi import close_async_client, fetch_pokemon_data_async, fetch_species_list_async
+
+logger = logging.getLogger(__name__)
+
+
+async def prefetch_species(concurrency=10, batch_size=100):
+    """
+        Download the species missing from the species table and store them
+        At most concurrency requests run at once, rows are committed batch_size at a time
+        Return the number of species stored and the number of failures
+    """
+    database = sqlite.SESSION_LOCAL()
+    try:
+        models.Species.__table__.create(database.get_bind(), checkfirst=True)
+        known = {api_id for (api_id,) in database.query(models.Species.api_id)}
+        missing = [api_id for api_id, _ in await fetch_species_list_async() if api_id not in known]
+        logger.info("%d species known, %d to fetch", len(known), len(missing))
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(api_id):
+            async with semaphore:
+                return api_id, await fetch_pokemon_data_async(api_id)
+
+        stored, failures, batch = 0, 0, []
+        for next_result in asyncio.as_completed([fetch(api_id) for api_id in missing]):
+            try:
+                _, data = await next_result
+            except Exception as error:  # pylint: disable=broad-except
+                failures += 1
+                logger.warning("species fetch failed: %s", error)
+                continue
+            batch.append(models.Species.from_pokeapi(data))
+            if len(batch) >= batch_size:
+                stored += flush(database, batch)
+        stored += flush(database, batch)
+        return stored, failures
+    finally:
+        database.close()
+
+
+def flush(database, batch):
+    """
+        Insert a batch of species in a single transaction and empty it
+    """
+    count = len(batch)
+    if count:
+        database.add_all(batch)
+        database.commit()
+        batch.clear()
+        logger.info("%d species stored", count)
+    return count
+
+
+async def main(concurrency, batch_size):
+    """
+        Run the prefetch then release the HTTP connections
+    """
+    try:
+        return await prefetch_species(concurrency, batch_size)
+    finally:
+        await close_async_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the species table from the pokeapi")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    stored_count, failure_count = asyncio.run(main(args.concurrency, args.batch_size))
+    print(f"{stored_count} species stored, {failure_count} failures")
@@ -0,0 +1,206 @@
+"""
+    Sampling profiler of live requests, switched on through the /admin/profiler endpoints
+
+    Once started, it profiles either the next N requests or one request in every K.
+    While a profiled request runs, a SIGPROF timer interrupts the main thread every
+    PROFILE_INTERVAL_MS of CPU time and the signal handler records the current stack.
+    The handler runs in the context of the code it interrupted, so a context variable
+    tells which request, if any, the sample belongs to, even when requests interleave
+    on the event loop.
+    Stacks are aggregated per route in the collapsed format of flamegraph.pl and speedscope:
+
+        GET /pokemons/fight;main:...;app.actions:fight_pokemons 42
+
+    When the profiler is off, or between profiled requests, no timer runs and a request
+    only costs one attribute check.
+    Only the main thread is sampled: the code uvicorn runs on the event loop, async
+    sessions included, but not the sync endpoints sent to the thread pool.
+"""
+import os
+import signal
+import threading
+from collections import Counter
+from contextvars import ContextVar
+
+from app.utils.metrics import current_timings
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+# Deepest stack recorded, the frames closest to the root are dropped beyond it
+MAX_DEPTH = 128
+
+_samples = ContextVar("profiler_samples", default=None)
+
+
+def frame_name(frame):
+    """
+        Return the label of a frame in a collapsed stack, module:qualified_name
+    """
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+def collapse(frame):
+    """
+        Return the stack ending at frame as root;...;leaf
+    """
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:  # pylint: disable=too-many-instance-attributes
+    """
+        Sample the stacks of the selected requests and aggregate them per route
+        Parameters:
+            remaining (int): requests left to profile in the next N mode
+            every (int): K of the one in every K mode, 0 when off
+            profiled (int): requests profiled since the last start
+            stacks (dict): Counter of collapsed stacks for each route
+            installed (bool): whether the SIGPROF handler is registered, see install
+    """
+    def __init__(self, interval_ms=PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.installed = False
+        self.remaining = 0
+        self.every = 0
+        self.profiled = 0
+        self.stacks = {}
+        self._seen = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        """
+            Tell whether requests are still to be profiled
+        """
+        return self.remaining > 0 or self.every > 0
+
+    def install(self):
+        """
+            Register the SIGPROF handler, which Python only allows from the main thread
+            Platforms without interval timers, i.e. Windows, cannot be profiled
+            Return whether the handler is registered
+        """
+        if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGPROF, self.on_signal)
+            self.installed = True
+        return self.installed
+
+    def start(self, requests=0, every=0):
+        """
+            Profile the next requests requests, or one request in every every,
+            dropping the samples of the previous run
+        """
+        with self._lock:
+            self.remaining = requests
+            self.every = every
+            self.profiled = 0
+            self.stacks = {}
+            self._seen = 0
+
+    def stop(self):
+        """
+            Profile no more request, the samples are kept
+        """
+        with self._lock:
+            self.remaining = 0
+            self.every = 0
+
+    def select(self):
+        """
+            Tell whether the request being received is to be profiled
+        """
+        with self._lock:
+            if self.remaining > 0:
+                self.remaining -= 1
+                return True
+            if self.every > 0:
+                self._seen += 1
+                return (self._seen - 1) % self.every == 0
+            return False
+
+    def on_signal(self, _signum, frame):
+        """
+            Record the interrupted stack if it belongs to a profiled request
+        """
+        samples = _samples.get()
+        if samples is not None:
+            samples[collapse(frame)] += 1
+
+    def begin(self):
+        """
+            Start sampling the running request, return the Counter of its samples
+        """
+        samples = Counter()
+        token = _samples.set(samples)
+        with self._lock:
+            self._active += 1
+            if self._active == 1 and self.installed:
+                signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return samples, token
+
+    def end(self, samples, token, route):
+        """
+            Stop sampling the running request and add its samples to route
+        """
+        _samples.reset(token)
+        with self._lock:
+            self._active -= 1
+            if self._active == 0 and self.installed:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+            self.profiled += 1
+            self.stacks.setdefault(route, Counter()).update(samples)
+
+    def collapsed(self, route=None):
+        """
+            Return the collapsed stacks of route, or of every route, with the route
+            as root frame, one "stack count" per line
+        """
+        with self._lock:
+            lines = [
+                f"{stack_route};{stack} {count}"
+                for stack_route, stacks in sorted(self.stacks.items())
+                if route is None or stack_route == route
+                for stack, count in stacks.most_common()
+            ]
+        return "".join(f"{line}\n" for line in lines)
+
+    def status(self):
+        """
+            Return the state of the profiler and the number of samples of each route
+        """
+        with self._lock:
+            return {
+                "running": self.running,
+                "remaining_requests": self.remaining,
+                "every": self.every,
+                "profiled_requests": self.profiled,
+                "samples": {route: sum(stacks.values()) for route, stacks in self.stacks.items()},
+            }
+
+
+profiler = SamplingProfiler()
+
+
+class ProfilerMiddleware:  # pylint: disable=too-few-public-methods
+    """
+        ASGI middleware sampling the requests selected by profiler
+        Must run inside TimingMiddleware, which holds the route of the request
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiler.running or not profiler.select():
+            await self.app(scope, receive, send)
+            return
+
+        samples, token = profiler.begin()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            timings = current_timings()
+            route = timings.route if timings is not None else scope["path"]
+            profiler.end(samples, token, f"{scope['method']} {route}")
@@ -0,0 +1,130 @@
+"""
+    Full text search index of trainer, pokemon and item names
+
+    Each searchable table gets an external content FTS5 table using the trigram
+    tokenizer, kept in sync by triggers on insert, update and delete. Trigrams index
+    every substring of 3 characters or more, so substring and prefix lookups go through
+    the index instead of scanning the table with LIKE '%x%'.
+    The index only exists on SQLite, other databases fall back to LIKE.
+"""
+import logging
+import weakref
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# Searchable table -> indexed columns, the first one is the text returned by a search
+SEARCH_COLUMNS = {
+    "trainers": ("name",),
+    "pokemons": ("custom_name",),
+    "items": ("name", "description"),
+}
+
+# Tables known to have their FTS index, per engine, see has_search_index
+_indexed_tables = weakref.WeakKeyDictionary()
+
+
+def search_table_ddl(table, columns):
+    """
+        Return the statements creating the FTS5 table of table and its sync triggers
+    """
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {names} ON {table} "
+        f"BEGIN INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+        f" INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def create_search_index(_metadata, connection, **_kwargs):
+    """
+        Create the FTS5 tables and triggers after create_all
+        A table created on an existing database is filled from its content table
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for table, columns in SEARCH_COLUMNS.items():
+        fts = f"{table}_fts"
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": fts}).first()
+        try:
+            for statement in search_table_ddl(table, columns):
+                connection.execute(text(statement))
+        except OperationalError as error:
+            logger.warning("search index unavailable, falling back to LIKE: %s", error)
+            return
+        if exists is None:
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def drop_search_index(_metadata, connection, **_kwargs):
+    """
+        Drop the FTS5 tables before drop_all, the triggers go with their tables
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for table in SEARCH_COLUMNS:
+        connection.execute(text(f"DROP TABLE IF EXISTS {table}_fts"))
+
+
+def has_search_index(connection, table):
+    """
+        Tell whether table has its FTS5 index on the database of connection
+        The index is missing on other databases than SQLite, and on SQLite < 3.34 which
+        has no trigram tokenizer, see create_search_index
+        Only found indexes are remembered, a table without one is looked up on each call
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    tables = _indexed_tables.setdefault(connection.engine, set())
+    if table not in tables:
+        found = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": f"{table}_fts"}).first()
+        if found is None:
+            return False
+        tables.add(table)
+    return True
+
+
+def forget_search_index(connection, table):
+    """
+        Look the FTS5 index of table up again on the next search, e.g. once it was dropped
+    """
+    _indexed_tables.get(connection.engine, set()).discard(table)
+
+
+def escape_like(value):
+    """
+        Escape the LIKE wildcards of value, the escape character is a backslash
+    """
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def phrase_query(value):
+    """
+        Return an FTS5 query matching value as a substring
+    """
+    return '"' + value.replace('"', '""') + '"'
+
+
+def fuzzy_query(value):
+    """
+        Return an FTS5 query matching any trigram of value,
+        rows sharing more trigrams with value rank first
+    """
+    value = value.lower()
+    trigrams = dict.fromkeys(value[start:start + 3] for start in range(len(value) - 2))
+    return " OR ".join(phrase_query(trigram) for trigram in trigrams)
@@ -0,0 +1,52 @@
+"""
+    Responses of the list endpoints
+
+    The regular path validates the ORM objects of a page and encodes them to JSON with a
+    TypeAdapter, both steps running in the pydantic core.
+    When FAST_LIST_RESPONSES is on, the list endpoints select plain columns instead of
+    ORM objects and encode them straight to JSON, skipping the validation of every row.
+    The JSON is the same on both paths.
+"""
+import json
+import os
+
+from fastapi.responses import Response
+
+from app.utils.export import json_default
+from app.utils.metrics import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # pylint: disable=invalid-name
+
+FAST_LIST_RESPONSES = os.getenv("FAST_LIST_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+def dumps(content):
+    """
+        Encode content to JSON bytes, with orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.dumps(content)  # pylint: disable=no-member
+    return json.dumps(content, default=json_default, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    """
+        JSON response of already serializable content, encoded without any validation
+    """
+    media_type = "application/json"
+
+    def render(self, content):
+        with timed("serialize"):
+            return dumps(content)
+
+
+def list_response(adapter, rows):
+    """
+        Validate ORM rows with a TypeAdapter of their list schema and return them as JSON
+    """
+    with timed("serialize"):
+        content = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    return Response(content, media_type="application/json")
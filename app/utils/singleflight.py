@@ -0,0 +1,108 @@
+import asyncio
+import threading
+
+# Result of the shared call when its leader was cancelled, a follower makes the call again
+_LEADER_CANCELLED = object()
+
+
+class _Call:  # pylint: disable=too-few-public-methods
+    """
+        In-flight synchronous call shared by every thread asking for the same key
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+        Coalesce concurrent calls made with the same key into a single one
+        Threads use do, tasks use do_async, each path has its own in-flight calls
+        Parameters:
+            deduplicated (int): number of calls answered by another caller's call
+    """
+    def __init__(self):
+        self.deduplicated = 0
+        self._calls = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args):
+        """
+            Return func(*args), waiting for the call already in flight for key if any
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args)
+            return call.result
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key, func, *args):
+        """
+            Return await func(*args), waiting for the task already in flight for key if any
+            When the task making the call is cancelled, one of the waiting tasks makes it again
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                future = self._futures.get((loop, key))
+                leader = future is None
+                if leader:
+                    future = self._futures[(loop, key)] = loop.create_future()
+
+            if leader:
+                return await self._lead(loop, key, future, func, *args)
+
+            # shield keeps a cancelled follower from cancelling the shared call
+            result = await asyncio.shield(future)
+            if result is not _LEADER_CANCELLED:
+                with self._lock:
+                    self.deduplicated += 1
+                return result
+
+    async def _lead(self, loop, key, future, func, *args):
+        """
+            Make the call shared through future
+        """
+        try:
+            result = await func(*args)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.set_result(_LEADER_CANCELLED)
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # Mark the exception as retrieved when no follower was waiting
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del self._futures[(loop, key)]
+
+    def in_flight(self):
+        """
+            Return the number of calls currently in flight
+        """
+        with self._lock:
+            return len(self._calls) + len(self._futures)
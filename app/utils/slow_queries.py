@@ -0,0 +1,166 @@
+"""
+    Log of the SQL statements slower than a threshold, opt-in with SLOW_QUERY_LOG
+
+    Each slow statement is written as one JSON object per line with its bound parameters,
+    the app/actions.py function that ran it and, under SQLite, its EXPLAIN QUERY PLAN,
+    so full table scans (SCAN) stand out from index lookups (SEARCH ... USING INDEX).
+
+        SLOW_QUERY_LOG=slow_queries.jsonl SLOW_QUERY_MS=50 uvicorn main:app
+
+    The file rotates at SLOW_QUERY_LOG_MAX_BYTES, keeping SLOW_QUERY_LOG_BACKUPS old files.
+"""
+import inspect
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+
+# Module whose functions are reported as the caller of a statement
+CALLER_MODULE = "app.actions"
+# Parameter sets of an executemany kept in the log
+EXECUTEMANY_PARAMETERS = 10
+# Statements EXPLAIN QUERY PLAN can describe
+EXPLAINED_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def find_callers():
+    """
+        Return the functions of CALLER_MODULE in the call stack as function:line,
+        innermost first, e.g. ["paginate:132", "get_pokemons:318"]
+        Async sessions run the actions in a greenlet whose stack still holds their frames
+    """
+    callers = []
+    frame = inspect.currentframe()
+    try:
+        while frame is not None:
+            name = frame.f_code.co_name
+            # Comprehensions and lambdas are reported through their enclosing function
+            if frame.f_globals.get("__name__") == CALLER_MODULE and not name.startswith("<"):
+                callers.append(f"{name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return callers
+    finally:
+        del frame
+
+
+def is_parameter_sets(parameters):
+    """
+        Tell whether parameters hold several parameter sets rather than a single one
+    """
+    return bool(parameters) and isinstance(parameters[0], (list, tuple, dict))
+
+
+def explain_query_plan(conn, statement, parameters):
+    """
+        Return the SQLite query plan of a statement, one line per step
+        The plan is read through a raw cursor, so it triggers no cursor event
+    """
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    """
+        Write the statements slower than threshold_ms to a rotating JSONL file
+    """
+    def __init__(self, path, threshold_ms=100.0, max_bytes=10 * 1024 * 1024, backups=5):
+        self.threshold = threshold_ms / 1000
+        self.handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+        # Own logger, so the records neither reach nor depend on the root logger
+        self.logger = logging.Logger(__name__)
+        self.logger.addHandler(self.handler)
+
+    @classmethod
+    def from_env(cls):
+        """
+            Build the log configured with the SLOW_QUERY_* environment variables,
+            None when SLOW_QUERY_LOG is not set
+        """
+        path = os.getenv("SLOW_QUERY_LOG")
+        if not path:
+            return None
+        return cls(
+            path,
+            threshold_ms=float(os.getenv("SLOW_QUERY_MS", "100")),
+            max_bytes=int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backups=int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5")),
+        )
+
+    def install(self, engine):
+        """
+            Time the statements run by engine, async engines through their sync_engine
+        """
+        bind = getattr(engine, "sync_engine", engine)
+        event.listen(bind, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(bind, "after_cursor_execute", self.after_cursor_execute)
+
+    def close(self):
+        """
+            Close the log file
+        """
+        self.handler.close()
+
+    @staticmethod
+    def before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+        """
+            Remember when the statement started, on a stack as a connection can nest them
+        """
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, _cursor, statement, parameters, _context, executemany):
+        """
+            Log the statement if it ran for threshold or longer
+        """
+        duration = time.perf_counter() - conn.info["slow_query_start"].pop()
+        if duration < self.threshold:
+            return
+        # Batches of INSERT ... RETURNING are flagged executemany but run a single statement
+        executemany = executemany and is_parameter_sets(parameters)
+        if executemany:
+            parameters = list(parameters[:EXECUTEMANY_PARAMETERS])
+        self.logger.warning(json.dumps({
+            "time": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "statement": statement,
+            "parameters": parameters,
+            "executemany": executemany,
+            "callers": find_callers(),
+            "plan": self.query_plan(conn, statement, parameters, executemany),
+        }, default=str))
+
+    @staticmethod
+    def query_plan(conn, statement, parameters, executemany):
+        """
+            Return the query plan of a statement, None when SQLite cannot explain it
+        """
+        if conn.dialect.name != "sqlite":
+            return None
+        if not statement.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            return None
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        try:
+            return explain_query_plan(conn, statement, parameters)
+        except Exception as error:  # pylint: disable=broad-except
+            return [f"EXPLAIN failed: {error}"]
+
+
+slow_query_log = SlowQueryLog.from_env()
+
+
+def log_slow_queries(engine):
+    """
+        Log the slow statements of engine when SLOW_QUERY_LOG is set
+    """
+    if slow_query_log is not None:
+        slow_query_log.install(engine)
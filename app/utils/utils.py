@@ -1,7 +1,14 @@
+import base64
+import binascii
+import hmac
+import json
+import os
 from datetime import date
-from app import models
-from app.sqlite import SESSION_LOCAL, engine
-models.Base.metadata.create_all(bind=engine)
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.sqlite import ASYNC_SESSION_LOCAL, SESSION_LOCAL
 
 def get_db():
     """
@@ -14,6 +21,14 @@ def get_db():
         database.close()
 
 
+async def get_async_db():
+    """
+        Get an async session on the DB
+    """
+    async with ASYNC_SESSION_LOCAL() as database:
+        yield database
+
+
 
 def age_from_birthdate(birthdate):
     """
@@ -22,3 +37,70 @@ def age_from_birthdate(birthdate):
     today = date.today()
     return today.year - birthdate.year - ((today.month, today.day)
         < (birthdate.month, birthdate.day))
+
+
+def encode_cursor(last_id):
+    """
+        Return the opaque pagination cursor pointing after last_id
+    """
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+        Return the id encoded in a pagination cursor
+        Raise ValueError if the cursor was not built by encode_cursor
+    """
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"]
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as error:
+        raise ValueError(f"Invalid cursor: {cursor}") from error
+    # JSON true and false load as bool, a subclass of int
+    if type(last_id) is not int:  # pylint: disable=unidiomatic-typecheck
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return last_id
+
+
+def get_after_id(cursor: Optional[str] = None):
+    """
+        Decode the cursor query parameter of the list endpoints
+    """
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from error
+
+
+def set_next_cursor(response, rows, limit):
+    """
+        Add the X-Next-Cursor header when a full page was returned
+        rows are ORM objects or the dicts of the fast path
+    """
+    if rows and len(rows) >= limit:
+        last = rows[-1]
+        last_id = last["id"] if isinstance(last, dict) else last.id
+        response.headers["X-Next-Cursor"] = encode_cursor(last_id)
+
+
+def etag_matches(if_none_match, etag):
+    """
+        Tell if an If-None-Match header holds etag, weak validators included
+    """
+    if if_none_match is None:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+        Reject the requests whose X-Admin-Token header is not the ADMIN_TOKEN setting
+        Admin endpoints are disabled while ADMIN_TOKEN is not set
+    """
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
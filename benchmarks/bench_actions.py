@@ -0,0 +1,183 @@
+"""
+    Time the functions of app/actions.py on seeded databases, see conftest.py
+"""
+import random
+from contextlib import nullcontext
+from datetime import date
+
+from app import actions, models, schemas
+
+
+def trainer_count(database):
+    return max(database.info["rows"] // 6, 1)
+
+
+def test_get_trainer(benchmark, database):
+    trainer_id = trainer_count(database) // 2
+    benchmark(actions.get_trainer, database, trainer_id)
+
+
+def test_get_trainer_payload_miss(benchmark, database, run):
+    trainer_id = trainer_count(database) // 2
+
+    def get_payload():
+        actions.trainer_cache.invalidate(trainer_id)
+        return run(actions.get_trainer_payload(database, trainer_id))
+
+    benchmark(get_payload)
+
+
+def test_get_trainer_by_name(benchmark, database):
+    benchmark(actions.get_trainer_by_name, database, f"Trainer {trainer_count(database) // 2}")
+
+
+def test_create_trainer(benchmark, database):
+    trainer = schemas.TrainerCreate(name="Bench trainer", birthdate=date(2000, 1, 1))
+    benchmark(actions.create_trainer, database, trainer)
+
+
+def test_get_trainers_page(benchmark, database):
+    benchmark(actions.get_trainers, database, limit=100)
+
+
+def test_get_trainer_rows_page(benchmark, database):
+    benchmark(actions.get_trainer_rows, database, limit=100)
+
+
+def test_get_pokemon_rows_page(benchmark, database):
+    benchmark(actions.get_pokemon_rows, database, limit=100)
+
+
+def test_get_item_rows_page(benchmark, database):
+    benchmark(actions.get_item_rows, database, limit=100)
+
+
+def test_get_pokemon(benchmark, database):
+    benchmark(actions.get_pokemon, database, database.info["rows"] // 2)
+
+
+def test_get_pokemons_last_page_offset(benchmark, database):
+    benchmark(actions.get_pokemons, database, skip=database.info["rows"] - 100, limit=100)
+
+
+def test_get_pokemons_last_page_cursor(benchmark, database):
+    benchmark(actions.get_pokemons, database, limit=100, after_id=database.info["rows"] - 100)
+
+
+def test_get_items_page(benchmark, database):
+    benchmark(actions.get_items, database, limit=100)
+
+
+def test_get_pokemons_by_ids(benchmark, database):
+    pokemon_ids = random.Random(0).sample(range(1, database.info["rows"] + 1), 100)
+    benchmark(actions.get_pokemons_by_ids, database, pokemon_ids)
+
+
+def test_sample_pokemons(benchmark, database):
+    benchmark(actions.sample_pokemons, database, limit=database.info["rows"], sample_size=3)
+
+
+def test_get_random_pokemons(benchmark, database, run):
+    benchmark(lambda: run(actions.get_random_pokemons(database)))
+
+
+def test_fight_pokemons(benchmark, database, run):
+    benchmark(lambda: run(actions.fight_pokemons(database, 1, 2)))
+
+
+def test_fight_many_pokemons(benchmark, database, run):
+    pokemon_ids = range(1, min(database.info["rows"], 1000) + 1)
+    pokemons = actions.get_pokemons_by_ids(database, pokemon_ids)
+    fights = [
+        schemas.PokemonFight(first_pokemon_id=first, second_pokemon_id=second)
+        for first, second in zip(pokemon_ids, reversed(pokemon_ids))
+    ]
+    benchmark(lambda: run(actions.fight_many_pokemons(database, fights, pokemons)))
+
+
+def test_run_tournament_of_a_trainer(benchmark, database, run):
+    benchmark(lambda: run(actions.run_tournament(database, trainer_id=1)))
+
+
+def test_search_substring(benchmark, database):
+    benchmark(actions.search, database, "Pet 12", scope="pokemons")
+
+
+def test_search_fuzzy(benchmark, database):
+    benchmark(actions.search, database, "Traner 42", scope="trainers", mode="fuzzy")
+
+
+def test_export_pokemons(benchmark, database):
+    def export():
+        for _ in actions.export_rows(database, models.Pokemon):
+            pass
+
+    benchmark.pedantic(export, rounds=3)
+
+
+def test_insert_rows_chunk(benchmark, database):
+    rows = [
+        {"name": f"Bench item {i}", "description": None, "trainer_id": 1} for i in range(1000)
+    ]
+    benchmark(actions.insert_rows, database, models.Item, rows)
+
+
+def test_add_trainer_item(benchmark, database, run):
+    item = schemas.ItemCreate(name="Potion")
+    benchmark(lambda: run(actions.add_trainer_item(database, item, 1)))
+
+
+def test_add_trainer_pokemon(benchmark, database, run, pokeapi_names):
+    pokemon = schemas.PokemonCreate(api_id=25)
+    benchmark(lambda: run(actions.add_trainer_pokemon(database, pokemon, 1)))
+
+
+def test_add_trainer_pokemons_team(benchmark, database, run, pokeapi_names):
+    team = [schemas.PokemonCreate(api_id=api_id) for api_id in (1, 4, 7, 25, 133, 150)]
+    benchmark(lambda: run(actions.add_trainer_pokemons(database, team, 1)))
+
+
+async def import_rows(rows):
+    for index, row in enumerate(rows):
+        yield index, row
+
+
+def test_import_trainers(benchmark, database, run):
+    rows = [{"name": f"Imported {i}", "birthdate": "2000-01-01"} for i in range(1000)]
+    benchmark(lambda: run(actions.import_trainers(database, import_rows(rows))))
+
+
+def test_import_items(benchmark, database, run):
+    trainers = trainer_count(database)
+    rows = [{"name": f"Imported {i}", "trainer_id": i % trainers + 1} for i in range(1000)]
+    benchmark(lambda: run(actions.import_items(database, import_rows(rows))))
+
+
+def test_import_pokemons(benchmark, database, run, pokeapi_names):
+    trainers = trainer_count(database)
+    rows = [{"api_id": i % 1025 + 1, "trainer_id": i % trainers + 1} for i in range(1000)]
+    benchmark(lambda: run(actions.import_pokemons(database, import_rows(rows))))
+
+
+def insert_pending_pokemons(database, count=100):
+    """
+        Insert count pokemons with a pending name, one per api_id
+    """
+    actions.insert_rows(database, models.Pokemon, [
+        {"api_id": api_id, "name": None, "trainer_id": 1} for api_id in range(1, count + 1)
+    ])
+
+
+def test_set_pokemon_names(benchmark, database):
+    names = {api_id: f"pokemon-{api_id}" for api_id in range(1, 101)}
+    benchmark.pedantic(
+        actions.set_pokemon_names, args=(database, names),
+        setup=lambda: insert_pending_pokemons(database), rounds=20)
+
+
+def test_fill_pending_names(benchmark, database, run, pokeapi_names, monkeypatch):
+    # The worker opens its own session, here the one of the seeded database
+    monkeypatch.setattr(actions.sqlite, "ASYNC_SESSION_LOCAL", lambda: nullcontext(database))
+    benchmark.pedantic(
+        lambda: run(actions.fill_pending_names()),
+        setup=lambda: insert_pending_pokemons(database), rounds=20)
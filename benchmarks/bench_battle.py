@@ -0,0 +1,36 @@
+"""
+    Time the battle engine, without any database
+"""
+import numpy as np
+import pytest
+
+from app.utils.battle import StatMatrix, round_robin
+from app.utils.pokeapi import battle_compare_stats
+from benchmarks.pokeapi_stub import pokemon_data
+
+SPECIES = 1025
+
+
+@pytest.fixture(scope="module")
+def stat_matrix():
+    return StatMatrix.from_stats(
+        {api_id: pokemon_data(api_id)["stats"] for api_id in range(1, SPECIES + 1)})
+
+
+def test_battle_compare_stats(benchmark):
+    first, second = pokemon_data(25)["stats"], pokemon_data(150)["stats"]
+    benchmark(battle_compare_stats, first, second)
+
+
+@pytest.mark.parametrize("fights", [10**3, 10**5])
+def test_stat_matrix_compare(benchmark, stat_matrix, fights):
+    generator = np.random.default_rng(0)
+    firsts = generator.integers(1, SPECIES + 1, fights).tolist()
+    seconds = generator.integers(1, SPECIES + 1, fights).tolist()
+    benchmark(stat_matrix.compare, firsts, seconds)
+
+
+@pytest.mark.parametrize("pokemons", [10**2, 10**4])
+def test_round_robin(benchmark, stat_matrix, pokemons):
+    api_ids = np.random.default_rng(0).integers(1, SPECIES + 1, pokemons).tolist()
+    benchmark(round_robin, stat_matrix, api_ids)
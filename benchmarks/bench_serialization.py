@@ -0,0 +1,36 @@
+"""
+    Time the serialization of trainers with large nested lists, without any database
+"""
+from datetime import date
+
+import pytest
+
+from app import models, schemas
+
+
+def build_trainer(trainer_id, size):
+    return models.Trainer(
+        id=trainer_id, name=f"Trainer {trainer_id}", birthdate=date(2000, 1, 1),
+        inventory=[
+            models.Item(id=i, name=f"Item {i}", description="Heals 20 HP", trainer_id=trainer_id)
+            for i in range(size)
+        ],
+        pokemons=[
+            models.Pokemon(id=i, api_id=25, name="pikachu", custom_name=f"Pet {i}",
+                           trainer_id=trainer_id)
+            for i in range(size)
+        ],
+    )
+
+
+@pytest.mark.parametrize("size", [10**2, 10**3, 10**4])
+def test_trainer_model_dump_json(benchmark, size):
+    trainer = build_trainer(1, size)
+    benchmark(lambda: schemas.Trainer.model_validate(trainer).model_dump_json())
+
+
+@pytest.mark.parametrize("trainers", [10**2, 10**3])
+def test_trainer_list_dump_json(benchmark, trainers):
+    page = [build_trainer(trainer_id, 10) for trainer_id in range(trainers)]
+    benchmark(lambda: schemas.TRAINER_LIST.dump_json(
+        schemas.TRAINER_LIST.validate_python(page, from_attributes=True)))
@@ -0,0 +1,100 @@
+"""
+    Fixtures of the micro-benchmarks, see the bench_*.py modules
+
+    The benchmark files are named bench_*.py so that the regular test run skips them:
+
+        python -m pytest benchmarks -o python_files="bench_*.py" --benchmark-autosave
+        pytest-benchmark compare 0001 0002
+
+    Each run is saved as JSON under .benchmarks/, tagged with the commit, so runs can be
+    compared between commits (--benchmark-json=<file> writes a single file instead).
+    BENCH_ROWS sets the sizes of the seeded databases, e.g. BENCH_ROWS=1000,100000,1000000
+"""
+import asyncio
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import actions, models
+from benchmarks.pokeapi_stub import pokemon_data
+
+BENCH_ROWS = [int(rows) for rows in os.getenv("BENCH_ROWS", "1000,10000").split(",")]
+SPECIES = 1025
+POKEMONS_PER_TRAINER = 6
+SEED_CHUNK_SIZE = 10000
+
+
+def insert_chunked(database, model, rows):
+    """
+        Insert rows SEED_CHUNK_SIZE at a time, return the new ids
+    """
+    ids = []
+    for start in range(0, len(rows), SEED_CHUNK_SIZE):
+        ids.extend(actions.insert_rows(database, model, rows[start:start + SEED_CHUNK_SIZE]))
+    return ids
+
+
+def seed(database, rows):
+    """
+        Fill the database with rows pokemons and rows items,
+        owned by rows / POKEMONS_PER_TRAINER trainers, and with every species
+    """
+    database.add_all(
+        models.Species.from_pokeapi(pokemon_data(api_id)) for api_id in range(1, SPECIES + 1))
+    database.commit()
+    trainer_ids = insert_chunked(database, models.Trainer, [
+        {"name": f"Trainer {i}", "birthdate": date(2000, 1, 1)}
+        for i in range(max(rows // POKEMONS_PER_TRAINER, 1))
+    ])
+    insert_chunked(database, models.Pokemon, [
+        {"api_id": i % SPECIES + 1, "name": f"pokemon-{i % SPECIES + 1}",
+         "custom_name": f"Pet {i}", "trainer_id": trainer_ids[i % len(trainer_ids)]}
+        for i in range(rows)
+    ])
+    insert_chunked(database, models.Item, [
+        {"name": f"Item {i}", "description": f"Heals {i % 100} HP",
+         "trainer_id": trainer_ids[i % len(trainer_ids)]}
+        for i in range(rows)
+    ])
+
+
+@pytest.fixture(scope="module", params=BENCH_ROWS, ids=lambda rows: f"{rows}rows")
+def database(request):
+    """
+        Session on a seeded in-memory database, shared by the benchmarks of a module
+        Same StaticPool setup as the test database of the root conftest.py
+    """
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    seed(session, request.param)
+    session.info["rows"] = request.param
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def pokeapi_names(monkeypatch):
+    """
+        Answer the PokeAPI name lookups with the names of the stub, without network
+    """
+    async def get_pokemon_name(api_id):
+        return pokemon_data(api_id)["name"]
+
+    monkeypatch.setattr(actions, "get_pokemon_name_async", get_pokemon_name)
+
+
+@pytest.fixture(scope="session")
+def run():
+    """
+        Run a coroutine to completion on an event loop shared by the benchmarks
+    """
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
@@ -0,0 +1,107 @@
+"""
+    Measure the effect of the index migration on writes and reads
+
+    Usage: python -m benchmarks.indexes [--trainers 2000] [--pokemons 6] [--items 10]
+                                        [--repeat 200]
+
+    Two throwaway SQLite databases are built, one stopped at v0001 (the indexes of the
+    create_all era) and one fully migrated. The same rows are inserted in both, then the
+    queries filtering on trainer_id and on pending names are timed.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import actions, models
+from app.migrations import migrate
+
+
+def timed(func, repeat=1):
+    """
+        Return the mean duration of func() in milliseconds
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def seed(database, trainers, pokemons, items):
+    """
+        Insert the rows, return the trainer ids and the insert durations in ms
+    """
+    trainer_ids = actions.insert_rows(database, models.Trainer, [
+        {"name": f"Trainer_{i}", "birthdate": date(2000, 1, 1)} for i in range(trainers)])
+    pokemon_rows = [
+        {"api_id": random.randint(1, 1000), "custom_name": f"Pet_{trainer_id}_{i}",
+         # One pokemon out of ten waits for its name
+         "name": None if i == 0 and trainer_id % 10 == 0 else "pikachu",
+         "trainer_id": trainer_id}
+        for trainer_id in trainer_ids for i in range(pokemons)
+    ]
+    item_rows = [
+        {"name": f"Item_{i}", "description": f"Description {trainer_id} {i}",
+         "trainer_id": trainer_id}
+        for trainer_id in trainer_ids for i in range(items)
+    ]
+    durations = {
+        "insert pokemons": timed(lambda: actions.insert_rows(
+            database, models.Pokemon, pokemon_rows)),
+        "insert items": timed(lambda: actions.insert_rows(database, models.Item, item_rows)),
+    }
+    return trainer_ids, durations
+
+
+def run(path, target, trainers, pokemons, items, repeat):
+    """
+        Build a database migrated up to target and time the writes and the reads
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    migrate(engine, target)
+    database = sessionmaker(bind=engine)()
+    random.seed(0)
+    trainer_ids, durations = seed(database, trainers, pokemons, items)
+    picked = random.sample(trainer_ids, 100)
+
+    def load_trainers():
+        for trainer_id in picked[:10]:
+            actions.get_trainer(database, trainer_id)
+        # Start from an empty identity map at each round
+        database.expunge_all()
+
+    durations["get_trainer x10 (selectin)"] = timed(load_trainers, repeat)
+    durations["tournament of a trainer"] = timed(
+        lambda: actions.get_tournament_pokemons(database, trainer_id=picked[0]), repeat)
+    durations["fast trainers page"] = timed(
+        lambda: actions.get_trainer_rows(database, limit=100, after_id=picked[0]), repeat)
+    durations["pending names"] = timed(lambda: actions.get_pending_api_ids(database), repeat)
+    database.close()
+    return durations
+
+
+def main(trainers, pokemons, items, repeat):
+    """
+        Compare the database before and after the index migration
+    """
+    directory = tempfile.mkdtemp()
+    before = run(os.path.join(directory, "before.db"), 1, trainers, pokemons, items, repeat)
+    after = run(os.path.join(directory, "after.db"), None, trainers, pokemons, items, repeat)
+    print(f"{'operation':<30}{'v0001 (ms)':>12}{'v0002 (ms)':>12}")
+    for name, duration in before.items():
+        print(f"{name:<30}{duration:>12.2f}{after[name]:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the index migration")
+    parser.add_argument("--trainers", type=int, default=2000)
+    parser.add_argument("--pokemons", type=int, default=6)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    main(args.trainers, args.pokemons, args.items, args.repeat)
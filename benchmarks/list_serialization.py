@@ -0,0 +1,79 @@
+"""
+    Compare the regular and the fast path of the list endpoints
+
+    Usage: python -m benchmarks.list_serialization [--trainers 100] [--items 10] [--pokemons 6]
+                                                   [--repeat 50]
+
+    A throwaway SQLite database is seeded with trainers owning items and pokemons, then each
+    list endpoint is called with FAST_LIST_RESPONSES off and on. The mean latency of a page of
+    100 rows is printed for both paths.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+
+def seed(database, actions, models, trainers, items, pokemons):
+    """
+        Fill the database with trainers, each owning items and pokemons
+    """
+    trainer_ids = actions.insert_rows(database, models.Trainer, [
+        {"name": f"Trainer_{i}", "birthdate": date(2000, 1, 1)} for i in range(trainers)])
+    actions.insert_rows(database, models.Item, [
+        {"name": f"Item_{i}", "description": "Heals 20 HP", "trainer_id": trainer_id}
+        for trainer_id in trainer_ids for i in range(items)])
+    actions.insert_rows(database, models.Pokemon, [
+        {"api_id": 25, "name": "pikachu", "custom_name": f"Pika_{i}", "trainer_id": trainer_id}
+        for trainer_id in trainer_ids for i in range(pokemons)])
+
+
+def mean_latency(client, url, repeat):
+    """
+        Return the mean latency of url in milliseconds, after a warm up call
+    """
+    client.get(url)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        client.get(url)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(trainers, items, pokemons, repeat):
+    """
+        Seed a throwaway database and time each list endpoint on both paths
+    """
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'benchmark.db')}"
+    # pylint: disable=import-outside-toplevel
+    from fastapi.testclient import TestClient
+
+    from app import actions, models, sqlite
+    from app.migrations import migrate
+    from app.utils import serialization
+    from main import app
+
+    migrate(sqlite.engine)
+    database = sqlite.SESSION_LOCAL()
+    seed(database, actions, models, trainers, items, pokemons)
+    database.close()
+
+    client = TestClient(app)
+    print(f"{'endpoint':<28}{'regular (ms)':>14}{'fast (ms)':>12}{'speedup':>10}")
+    for url in ("/trainers?limit=100", "/pokemons/?limit=100", "/items/?limit=100"):
+        serialization.FAST_LIST_RESPONSES = False
+        regular = mean_latency(client, url, repeat)
+        serialization.FAST_LIST_RESPONSES = True
+        fast = mean_latency(client, url, repeat)
+        print(f"{url:<28}{regular:>14.2f}{fast:>12.2f}{regular / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the fast path of the list endpoints")
+    parser.add_argument("--trainers", type=int, default=100)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--pokemons", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.trainers, args.items, args.pokemons, args.repeat)
@@ -0,0 +1,72 @@
+"""
+    Local stand-in for the PokeAPI, so that load tests measure this app and not pokeapi.co
+
+    Usage: POKEAPI_STUB_LATENCY_MS=50 uvicorn benchmarks.pokeapi_stub:app --port 8001
+    then start the app with POKEAPI_BASE_URL=http://127.0.0.1:8001/api/v2
+
+    Every pokemon from 1 to POKEAPI_STUB_SPECIES has a name and deterministic base stats.
+    Each response waits POKEAPI_STUB_LATENCY_MS milliseconds, plus a random jitter of up to
+    POKEAPI_STUB_JITTER_MS, to mimic the round trip to the real API.
+"""
+import asyncio
+import os
+import random
+
+from fastapi import FastAPI, HTTPException
+
+from app.models import STAT_COLUMNS
+
+LATENCY_MS = float(os.getenv("POKEAPI_STUB_LATENCY_MS", "50"))
+JITTER_MS = float(os.getenv("POKEAPI_STUB_JITTER_MS", "20"))
+SPECIES = int(os.getenv("POKEAPI_STUB_SPECIES", "1025"))
+
+app = FastAPI()
+
+
+async def wait():
+    """
+        Simulate the upstream latency
+    """
+    await asyncio.sleep((LATENCY_MS + random.uniform(0, JITTER_MS)) / 1000)
+
+
+def pokemon_data(api_id):
+    """
+        Return the trimmed pokeapi payload of a pokemon, the stats only depend on api_id
+    """
+    return {
+        "id": api_id,
+        "name": f"pokemon-{api_id}",
+        "stats": [
+            {"stat": {"name": stat_name}, "base_stat": 20 + (api_id * (rank + 7)) % 180}
+            for rank, stat_name in enumerate(STAT_COLUMNS)
+        ],
+        "types": [{"slot": 1, "type": {"name": "normal"}}],
+    }
+
+
+@app.get("/api/v2/pokemon")
+async def list_pokemons(limit: int = 20, offset: int = 0):
+    """
+        List the species like the pokeapi does
+    """
+    await wait()
+    api_ids = range(offset + 1, min(offset + limit, SPECIES) + 1)
+    return {
+        "count": SPECIES,
+        "results": [
+            {"name": f"pokemon-{api_id}", "url": f"/api/v2/pokemon/{api_id}/"}
+            for api_id in api_ids
+        ],
+    }
+
+
+@app.get("/api/v2/pokemon/{api_id}")
+async def get_pokemon(api_id: int):
+    """
+        Return a pokemon like the pokeapi does, 404 outside of the stub species
+    """
+    await wait()
+    if not 1 <= api_id <= SPECIES:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return pokemon_data(api_id)
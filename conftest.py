@@ -1,19 +1,41 @@
+from contextlib import contextmanager
+
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from main import app
+from app.actions import trainer_cache
 from app.models import Base
-from app.utils.utils import get_db
+from app.sqlite import ASYNC_SESSION_LOCAL, SESSION_LOCAL
+from app.utils.metrics import instrument_engine
+from app.utils.pokeapi import pokemon_cache
+from app.utils.utils import get_async_db, get_db
+
+# Named in-memory database shared by the sync and the async engines
+TEST_DATABASE = "file:test_db?mode=memory&cache=shared&uri=true"
 
 engine = create_engine(
-    "sqlite:///:memory:",
+    f"sqlite:///{TEST_DATABASE}",
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{TEST_DATABASE}",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False)
 Base.metadata.create_all(bind=engine)
+# Sessions opened outside of get_db (caches, background jobs) must hit the test DB too
+SESSION_LOCAL.configure(bind=engine)
+ASYNC_SESSION_LOCAL.configure(bind=async_engine)
+instrument_engine(engine)
+instrument_engine(async_engine)
 
 
 def override_get_db():
@@ -24,10 +46,51 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 
 
 @pytest.fixture(autouse=True)
 def reset_db():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    pokemon_cache.clear()
+    trainer_cache.clear()
+
+
+@contextmanager
+def count_queries(max_queries):
+    """
+        Record the SQL statements run on the test engines and fail if there are more than max_queries
+    """
+    statements = []
+
+    def record(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    for bind in (engine, async_engine.sync_engine):
+        event.listen(bind, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for bind in (engine, async_engine.sync_engine):
+            event.remove(bind, "before_cursor_execute", record)
+    assert len(statements) <= max_queries, (
+        f"{len(statements)} queries ran, expected at most {max_queries}:\n"
+        + "\n".join(statements)
+    )
+
+
+@pytest.fixture
+def assert_max_queries():
+    return count_queries
+
+
+@pytest.fixture
+def async_session_factory():
+    return TestingAsyncSessionLocal
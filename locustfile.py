@@ -0,0 +1,207 @@
+"""
+    Load test of every router with a realistic mix of users
+
+    Run the PokeAPI stub first, see benchmarks/pokeapi_stub.py, then the app with
+    POKEAPI_BASE_URL pointing to it, then `locust` (profile in .locust.conf).
+
+    When the run ends, the latency percentiles and the throughput are checked against
+    PERFORMANCE_BUDGETS: any regression is logged and locust exits with code 1.
+"""
+import logging
+import os
+import random
+from datetime import date
+
+from locust import HttpUser, between, events, task
+
+logger = logging.getLogger(__name__)
+
+# Request name -> maximum p50, p95 and p99 latencies in ms, "Aggregated" is every request
+PERFORMANCE_BUDGETS = {
+    "Aggregated": {"p50": 50, "p95": 250, "p99": 500},
+    "GET /trainers/[id]": {"p50": 20, "p95": 100, "p99": 200},
+    "GET /trainers (page)": {"p50": 50, "p95": 200, "p99": 400},
+    "GET /pokemons/ (page)": {"p50": 30, "p95": 150, "p99": 300},
+    "GET /items/ (page)": {"p50": 30, "p95": 150, "p99": 300},
+    "GET /pokemons/fight": {"p50": 30, "p95": 150, "p99": 300},
+    "GET /pokemons/random/": {"p50": 40, "p95": 200, "p99": 400},
+    "POST /trainers/[id]/pokemon/": {"p50": 80, "p95": 300, "p99": 600},
+    # Whole tables, which grow with the trainers and pokemons created during the run
+    "GET /export/[table]": {"p50": 500, "p95": 2000, "p99": 4000},
+}
+# Minimum requests per second of the whole run, and maximum share of failed requests
+MIN_RPS = float(os.getenv("LOCUST_MIN_RPS", "100"))
+MAX_FAIL_RATIO = float(os.getenv("LOCUST_MAX_FAIL_RATIO", "0.01"))
+# Species served by the PokeAPI stub
+SPECIES = int(os.getenv("POKEAPI_STUB_SPECIES", "1025"))
+
+
+def random_api_id():
+    """
+        Pick a species, the popular ones come up more often
+    """
+    return min(int(random.paretovariate(1.2)), SPECIES)
+
+
+def check_budgets(stats, budgets, min_rps, max_fail_ratio):
+    """
+        Return a message for each budget the run exceeded
+        stats is the RequestStats of the locust environment
+    """
+    violations = []
+    entries = {f"{method} {name}": entry for (name, method), entry in stats.entries.items()}
+    entries["Aggregated"] = stats.total
+    for name, budget in budgets.items():
+        entry = entries.get(name)
+        if entry is None or not entry.num_requests:
+            continue
+        for percentile, limit in budget.items():
+            value = entry.get_response_time_percentile(int(percentile[1:]) / 100)
+            if value > limit:
+                violations.append(f"{name} {percentile} is {value} ms, budget {limit} ms")
+    if stats.total.total_rps < min_rps:
+        violations.append(f"throughput is {stats.total.total_rps:.1f} rps, budget {min_rps} rps")
+    if stats.total.fail_ratio > max_fail_ratio:
+        violations.append(
+            f"{stats.total.fail_ratio:.2%} of requests failed, budget {max_fail_ratio:.2%}")
+    return violations
+
+
+@events.quitting.add_listener
+def enforce_budgets(environment, **_kwargs):
+    """
+        Fail the run when a budget is exceeded
+    """
+    violations = check_budgets(environment.stats, PERFORMANCE_BUDGETS, MIN_RPS, MAX_FAIL_RATIO)
+    for violation in violations:
+        logger.error("Performance budget exceeded: %s", violation)
+    if violations:
+        environment.process_exit_code = 1
+
+
+class TrainerUser(HttpUser):
+    """
+        A player registering, filling the inventory and building a team
+    """
+    weight = 1
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        birthdate = date(random.randint(1970, 2015), random.randint(1, 12), random.randint(1, 28))
+        response = self.client.post("/trainers/", json={
+            "name": f"Trainer {random.randint(0, 10**9)}", "birthdate": birthdate.isoformat()})
+        self.trainer_id = response.json()["id"]
+        self.etag = None
+
+    @task(5)
+    def view_trainer(self):
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        with self.client.get(f"/trainers/{self.trainer_id}", headers=headers,
+                             name="/trainers/[id]", catch_response=True) as response:
+            if response.status_code in (200, 304):
+                self.etag = response.headers.get("ETag", self.etag)
+                response.success()
+            else:
+                response.failure(f"status {response.status_code}")
+
+    @task(3)
+    def add_item(self):
+        self.client.post(f"/trainers/{self.trainer_id}/item/", name="/trainers/[id]/item/",
+                         json={"name": random.choice(["Potion", "Super Potion", "Repel"])})
+
+    @task(2)
+    def add_pokemon(self):
+        self.client.post(f"/trainers/{self.trainer_id}/pokemon/",
+                         name="/trainers/[id]/pokemon/", json={"api_id": random_api_id()})
+
+    @task(1)
+    def add_team(self):
+        team = [{"api_id": random_api_id()} for _ in range(6)]
+        self.client.post(f"/trainers/{self.trainer_id}/pokemons/",
+                         name="/trainers/[id]/pokemons/", json=team)
+
+
+class BrowserUser(HttpUser):
+    """
+        A visitor paging through the lists and searching
+    """
+    weight = 3
+    wait_time = between(0.5, 2)
+
+    def browse(self, url, name, pages=3):
+        cursor = None
+        for _ in range(pages):
+            params = {"limit": 100}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get(url, params=params, name=name)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+    @task(3)
+    def browse_trainers(self):
+        self.browse("/trainers", "/trainers (page)")
+
+    @task(3)
+    def browse_pokemons(self):
+        self.browse("/pokemons/", "/pokemons/ (page)")
+
+    @task(2)
+    def browse_items(self):
+        self.browse("/items/", "/items/ (page)")
+
+    @task(2)
+    def search(self):
+        self.client.get("/search/", name="/search/",
+                        params={"q": random.choice(["Trainer", "Potion", "pokemon-2"])})
+
+    @task(1)
+    def export(self):
+        table = random.choice(["trainers", "pokemons", "items"])
+        self.client.get(f"/export/{table}", name="/export/[table]", params={
+            "format": random.choice(["ndjson", "csv"]), "gzip": random.choice([True, False])})
+
+
+class BattleUser(HttpUser):
+    """
+        A player fighting pokemons and drawing random ones
+    """
+    weight = 2
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        response = self.client.get("/pokemons/", params={"limit": 1000}, name="/pokemons/ (page)")
+        self.pokemon_ids = [pokemon["id"] for pokemon in response.json()]
+        if len(self.pokemon_ids) < 2:
+            trainer_id = self.client.post(
+                "/trainers/", json={"name": "Arena", "birthdate": "2000-01-01"}).json()["id"]
+            team = self.client.post(f"/trainers/{trainer_id}/pokemons/",
+                                    name="/trainers/[id]/pokemons/",
+                                    json=[{"api_id": random_api_id()} for _ in range(6)])
+            self.pokemon_ids = [pokemon["id"] for pokemon in team.json()]
+
+    @task(4)
+    def fight(self):
+        first, second = random.sample(self.pokemon_ids, 2)
+        self.client.get("/pokemons/fight", name="/pokemons/fight",
+                        params={"first_pokemon_id": first, "second_pokemon_id": second})
+
+    @task(3)
+    def random_pokemons(self):
+        self.client.get("/pokemons/random/", name="/pokemons/random/")
+
+    @task(1)
+    def fights(self):
+        fights = [
+            dict(zip(("first_pokemon_id", "second_pokemon_id"),
+                     random.sample(self.pokemon_ids, 2)))
+            for _ in range(50)
+        ]
+        self.client.post("/pokemons/fights", name="/pokemons/fights", json=fights)
+
+    @task(1)
+    def tournament(self):
+        self.client.get("/pokemons/tournament", name="/pokemons/tournament",
+                        params={"pokemon_ids": random.sample(
+                            self.pokemon_ids, min(20, len(self.pokemon_ids)))})
@@ -1,8 +1,36 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.routers import trainers, pokemons, items
+from app.migrations import migrate
+from app.routers import admin, export, metrics, search, trainers, pokemons, items
+from app.sqlite import engine
+from app.utils.metrics import TimingMiddleware
+from app.utils.pokeapi import close_async_client
+from app.utils.profiler import ProfilerMiddleware, profiler
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    """
+        Bring the schema up to date on startup,
+        release the pooled PokeAPI connections on shutdown
+    """
+    migrate(engine)
+    yield
+    await close_async_client()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# The last middleware added runs first, ProfilerMiddleware reads the route TimingMiddleware holds
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(TimingMiddleware)
+# Signal handlers can only be registered from the main thread, which imports the app
+profiler.install()
 
 app.include_router(trainers.router, prefix="/trainers")
 app.include_router(items.router, prefix="/items")
 app.include_router(pokemons.router, prefix="/pokemons")
+app.include_router(export.router, prefix="/export")
+app.include_router(search.router, prefix="/search")
+app.include_router(metrics.router, prefix="/metrics")
+app.include_router(admin.router, prefix="/admin")
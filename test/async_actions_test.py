@@ -0,0 +1,73 @@
+import asyncio
+from datetime import date
+
+from app import async_actions, schemas
+
+
+def run(async_session_factory, action, *args, **kwargs):
+    async def go():
+        async with async_session_factory() as database:
+            return await action(database, *args, **kwargs)
+
+    return asyncio.run(go())
+
+
+def test_create_and_get_trainer(async_session_factory):
+    # Arrange
+    trainer = schemas.TrainerCreate(name="Ash", birthdate=date(1997, 4, 1))
+    trainer_id = run(async_session_factory, async_actions.create_trainer, trainer).id
+
+    # Act
+    result = run(async_session_factory, async_actions.get_trainer, trainer_id)
+
+    # Assert
+    assert result.name == "Ash"
+    assert result.inventory == []
+    assert result.pokemons == []
+
+
+def test_get_trainer_loads_relationships(async_session_factory):
+    # Arrange
+    trainer = schemas.TrainerCreate(name="Misty", birthdate=date(1997, 11, 15))
+    trainer_id = run(async_session_factory, async_actions.create_trainer, trainer).id
+    run(async_session_factory, async_actions.add_trainer_item,
+        schemas.ItemCreate(name="Potion"), trainer_id)
+
+    # Act
+    result = run(async_session_factory, async_actions.get_trainers)
+
+    # Assert
+    assert [item.name for item in result[0].inventory] == ["Potion"]
+
+
+def test_add_trainer_pokemon_with_async_session(async_session_factory, mocker):
+    # Arrange
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="pikachu")
+    trainer = schemas.TrainerCreate(name="Brock", birthdate=date(1995, 9, 3))
+    trainer_id = run(async_session_factory, async_actions.create_trainer, trainer).id
+
+    # Act
+    pokemon = run(async_session_factory, async_actions.add_trainer_pokemon,
+                  schemas.PokemonCreate(api_id=25), trainer_id)
+    pokemons = run(async_session_factory, async_actions.get_pokemons)
+
+    # Assert
+    assert pokemon.name == "pikachu"
+    assert [p.id for p in pokemons] == [pokemon.id]
+
+
+def test_get_items_keyset_pagination(async_session_factory):
+    # Arrange
+    trainer = schemas.TrainerCreate(name="Gary", birthdate=date(1997, 4, 1))
+    trainer_id = run(async_session_factory, async_actions.create_trainer, trainer).id
+    for name in ["Potion", "Super Potion", "Hyper Potion"]:
+        run(async_session_factory, async_actions.add_trainer_item,
+            schemas.ItemCreate(name=name), trainer_id)
+
+    # Act
+    first_page = run(async_session_factory, async_actions.get_items, limit=2)
+    second_page = run(async_session_factory, async_actions.get_items,
+                      limit=2, after_id=first_page[-1].id)
+
+    # Assert
+    assert [item.name for item in second_page] == ["Hyper Potion"]
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.utils.battle import stats_row
+from benchmarks.pokeapi_stub import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def no_latency(mocker):
+    mocker.patch("benchmarks.pokeapi_stub.LATENCY_MS", 0)
+    mocker.patch("benchmarks.pokeapi_stub.JITTER_MS", 0)
+
+
+def test_stub_pokemon_has_every_stat():
+    # Act
+    response = client.get("/api/v2/pokemon/25")
+
+    # Assert
+    assert response.json()["name"] == "pokemon-25"
+    assert not np.isnan(stats_row(response.json()["stats"])).any()
+
+
+def test_stub_pokemon_unknown_species():
+    # Act
+    response = client.get("/api/v2/pokemon/0")
+
+    # Assert
+    assert response.status_code == 404
+
+
+def test_stub_lists_species_urls():
+    # Act
+    response = client.get("/api/v2/pokemon?limit=3&offset=1")
+
+    # Assert
+    urls = [result["url"] for result in response.json()["results"]]
+    assert urls == ["/api/v2/pokemon/2/", "/api/v2/pokemon/3/", "/api/v2/pokemon/4/"]
@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+
+from app.migrations import migrate, v0001_initial_schema
+from app.models import Base
+
+
+def schema_of(engine):
+    inspector = inspect(engine)
+    return {
+        table: (
+            sorted(column["name"] for column in inspector.get_columns(table)),
+            sorted(index["name"] for index in inspector.get_indexes(table)),
+        )
+        for table in inspector.get_table_names()
+        if table != "schema_migrations" and "_fts" not in table
+    }
+
+
+def test_migrate_applies_each_migration_once(tmp_path):
+    # Arrange
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+
+    # Act
+    first = migrate(engine)
+    second = migrate(engine)
+
+    # Assert
+    assert first == ["v0001_initial_schema", "v0002_foreign_key_indexes"]
+    assert second == []
+
+
+def test_migrations_match_the_models(tmp_path):
+    # Arrange
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    created = create_engine(f"sqlite:///{tmp_path / 'created.db'}")
+
+    # Act
+    migrate(migrated)
+    Base.metadata.create_all(bind=created)
+
+    # Assert
+    assert schema_of(migrated) == schema_of(created)
+
+
+def test_migrate_keeps_the_rows_of_an_existing_database(tmp_path):
+    # Arrange
+    engine = create_engine(f"sqlite:///{tmp_path / 'existing.db'}")
+    migrate(engine, target=1)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO trainers (name) VALUES ('Ash')"))
+
+    # Act
+    applied = migrate(engine)
+
+    # Assert
+    assert applied == ["v0002_foreign_key_indexes"]
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT name FROM trainers")).scalar() == "Ash"
+        hits = connection.execute(
+            text("SELECT rowid FROM trainers_fts WHERE trainers_fts MATCH 'ash'"))
+        assert hits.all() == [(1,)]
+    assert "ix_items_name" not in [index["name"] for index in inspect(engine).get_indexes("items")]
+
+
+def test_migrate_drops_the_indexes_of_a_legacy_database(tmp_path):
+    # Arrange
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    migrate(engine, target=1)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX ix_items_name ON items (name)"))
+        connection.execute(text("CREATE INDEX ix_pokemons_api_id ON pokemons (api_id)"))
+
+    # Act
+    migrate(engine)
+
+    # Assert
+    inspector = inspect(engine)
+    assert "ix_items_name" not in [index["name"] for index in inspector.get_indexes("items")]
+    assert "ix_pokemons_api_id" not in [
+        index["name"] for index in inspector.get_indexes("pokemons")]
+
+
+@pytest.mark.parametrize("dialect, autoincrement", [
+    (postgresql.dialect(), "id SERIAL NOT NULL"),
+    (sqlite.dialect(), "id INTEGER NOT NULL"),
+])
+def test_initial_schema_ids_are_generated_by_the_database(dialect, autoincrement):
+    # Act
+    ddl = {
+        table.name: str(CreateTable(table).compile(dialect=dialect))
+        for table in v0001_initial_schema.TABLES
+    }
+
+    # Assert
+    for table in ("trainers", "pokemons", "items"):
+        assert autoincrement in ddl[table]
+        assert "PRIMARY KEY (id)" in ddl[table]
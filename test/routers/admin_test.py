@@ -0,0 +1,110 @@
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.utils.profiler import profiler
+
+client = TestClient(app)
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch, mocker):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    mocker.patch("app.utils.profiler.signal.setitimer")
+    mocker.patch.object(profiler, "installed", True)
+    yield
+    # Drop the samples and switch the profiler off
+    profiler.start()
+
+
+# ---------------------------------------------------------------------------
+# Admin token
+# ---------------------------------------------------------------------------
+
+def test_admin_disabled_without_token_setting(monkeypatch):
+    # Arrange
+    monkeypatch.delenv("ADMIN_TOKEN")
+
+    # Act
+    response = client.get("/admin/profiler", headers=ADMIN)
+
+    # Assert
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}])
+def test_admin_rejects_invalid_token(headers):
+    # Act
+    response = client.post("/admin/profiler?requests=1", headers=headers)
+
+    # Assert
+    assert response.status_code == 403
+    assert not profiler.running
+
+
+# ---------------------------------------------------------------------------
+# /admin/profiler
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("query", ["", "?requests=2&every=3"])
+def test_start_profiler_needs_one_mode(query):
+    # Act
+    response = client.post(f"/admin/profiler{query}", headers=ADMIN)
+
+    # Assert
+    assert response.status_code == 400
+
+
+def test_start_profiler_unavailable(mocker):
+    # Arrange
+    mocker.patch.object(profiler, "installed", False)
+
+    # Act
+    response = client.post("/admin/profiler?every=10", headers=ADMIN)
+
+    # Assert
+    assert response.status_code == 503
+
+
+def test_profile_next_requests_per_route():
+    # Arrange
+    client.post("/admin/profiler?requests=2", headers=ADMIN)
+
+    # Act
+    client.get("/trainers")
+    client.get("/items/")
+    client.get("/pokemons/")
+    response = client.get("/admin/profiler", headers=ADMIN)
+
+    # Assert
+    assert response.json() == {
+        "running": False, "remaining_requests": 0, "every": 0, "profiled_requests": 2,
+        "samples": {"GET /trainers": 0, "GET /items/": 0},
+    }
+
+
+def test_stop_profiler():
+    # Arrange
+    client.post("/admin/profiler?every=5", headers=ADMIN)
+
+    # Act
+    response = client.delete("/admin/profiler", headers=ADMIN)
+
+    # Assert
+    assert response.json()["running"] is False
+    assert not profiler.running
+
+
+def test_profiler_stacks_as_text(mocker):
+    # Arrange
+    mocker.patch.object(profiler, "stacks", {"GET /trainers": Counter({"main:run": 4})})
+
+    # Act
+    response = client.get("/admin/profiler/stacks?route=GET /trainers", headers=ADMIN)
+
+    # Assert
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text == "GET /trainers;main:run 4\n"
@@ -0,0 +1,84 @@
+import gzip
+import json
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+
+def create_trainers(count):
+    return [
+        client.post(
+            "/trainers/", json={"name": f"Trainer_{i}", "birthdate": "2000-01-01"}
+        ).json()["id"]
+        for i in range(count)
+    ]
+
+
+def test_export_trainers_ndjson():
+    # Arrange
+    trainer_ids = create_trainers(5)
+
+    # Act
+    response = client.get("/export/trainers?batch_size=2")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == trainer_ids
+    assert rows[0] == {"id": trainer_ids[0], "name": "Trainer_0", "birthdate": "2000-01-01"}
+
+
+def test_export_items_csv():
+    # Arrange
+    trainer_id = create_trainers(1)[0]
+    client.post(f"/trainers/{trainer_id}/item/", json={"name": "Potion"})
+
+    # Act
+    response = client.get("/export/items?format=csv")
+
+    # Assert
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "id,name,description,trainer_id", f"1,Potion,,{trainer_id}"]
+
+
+def test_export_empty_table_csv_has_header():
+    # Act
+    response = client.get("/export/pokemons?format=csv")
+
+    # Assert
+    assert response.text == "id,api_id,name,custom_name,trainer_id\n"
+
+
+def test_export_gzip():
+    # Arrange
+    create_trainers(3)
+
+    # Act
+    with client.stream("GET", "/export/trainers?gzip=true") as response:
+        body = b"".join(response.iter_raw())
+
+    # Assert
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(gzip.decompress(body).decode().splitlines()) == 3
+
+
+def test_export_unknown_table():
+    # Act
+    response = client.get("/export/species")
+
+    # Assert
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Table not found"
+
+
+def test_export_rejects_unknown_format():
+    # Act
+    response = client.get("/export/trainers?format=xml")
+
+    # Assert
+    assert response.status_code == 422
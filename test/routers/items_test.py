@@ -122,3 +122,39 @@ def test_item_in_global_list_parametrized(item_name, description):
     assert response.status_code == 200
     all_names = [i["name"] for i in response.json()]
     assert item_name in all_names
+
+
+def test_get_items_cursor_pagination():
+    # Arrange
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Red", "birthdate": "1996-01-01"}
+    ).json()["id"]
+    for name in ["Potion", "Super Potion", "Hyper Potion"]:
+        client.post(f"/trainers/{trainer_id}/item/", json={"name": name})
+
+    # Act
+    first_page = client.get("/items/?limit=2")
+    second_page = client.get(f"/items/?limit=2&cursor={first_page.headers['X-Next-Cursor']}")
+
+    # Assert
+    assert [i["name"] for i in first_page.json()] == ["Potion", "Super Potion"]
+    assert [i["name"] for i in second_page.json()] == ["Hyper Potion"]
+
+
+def test_import_items_rejects_unknown_trainer():
+    # Arrange
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Ash", "birthdate": "1997-04-01"}
+    ).json()["id"]
+    payload = [
+        {"name": "Potion", "trainer_id": trainer_id},
+        {"name": "Antidote", "trainer_id": trainer_id + 1},
+    ]
+
+    # Act
+    response = client.post("/items/import", json=payload)
+
+    # Assert
+    assert response.json()["inserted"] == 1
+    assert response.json()["errors"] == [{"index": 1, "detail": "Trainer not found"}]
+    assert [item["name"] for item in client.get("/items/").json()] == ["Potion"]
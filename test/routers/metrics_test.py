@@ -0,0 +1,64 @@
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+from main import app
+
+client = TestClient(app)
+
+
+def scrape():
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def test_metrics_exposition_after_a_request():
+    # Arrange
+    route = ("route", "/trainers/{trainer_id}")
+    before = scrape()
+
+    # Act
+    client.get("/trainers/42")
+    after = scrape()
+
+    # Assert
+    duration = ("http_request_duration_seconds_count",
+                (("method", "GET"), route, ("status", "404")))
+    queries = ("http_request_db_queries_count", (route,))
+    db_phase = ("http_request_phase_seconds_count", (("phase", "db"), route))
+    for key in (duration, queries, db_phase):
+        assert after[key] == before.get(key, 0) + 1
+    assert after[("http_request_db_queries_sum", (route,))] >= 1
+
+
+def test_requests_are_observed_with_their_route(mocker):
+    # Arrange
+    observe = mocker.patch("app.utils.metrics.observe")
+
+    # Act
+    client.get("/trainers/42")
+
+    # Assert
+    method, status, timings = observe.call_args.args
+    assert (method, status, timings.route) == ("GET", 404, "/trainers/{trainer_id}")
+
+
+def test_metrics_expose_the_cache_counters(mocker):
+    # Arrange
+    mocker.patch("app.utils.pokeapi.pokemon_cache.counters", {"memory_hits": 3, "misses": 1})
+    mocker.patch("app.utils.pokeapi.pokemon_cache.flights.deduplicated", 2)
+    mocker.patch("app.actions.trainer_cache.counters", {"hits": 5})
+
+    # Act
+    samples = scrape()
+
+    # Assert
+    assert samples[("pokeapi_cache_lookups_total", (("result", "memory_hits"),))] == 3
+    assert samples[("pokeapi_cache_lookups_total", (("result", "misses"),))] == 1
+    assert samples[("pokeapi_cache_lookups_total", (("result", "deduplicated"),))] == 2
+    assert samples[("trainer_cache_lookups_total", (("result", "hits"),))] == 5
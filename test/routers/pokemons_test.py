@@ -1,7 +1,11 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 
 from main import app
+from app import actions, models
+from app.sqlite import SESSION_LOCAL
 
 client = TestClient(app)
 
@@ -20,7 +24,7 @@ def test_get_pokemons_after_assignment(mocker):
     trainer_id = client.post(
         "/trainers/", json={"name": "Ash", "birthdate": "1997-04-01"}
     ).json()["id"]
-    mocker.patch("app.actions.get_pokemon_name", return_value="pikachu")
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="pikachu")
     client.post(f"/trainers/{trainer_id}/pokemon/", json={"api_id": 25})
 
     # Act
@@ -40,9 +44,9 @@ def test_get_pokemons_all_trainers(mocker):
     misty_id = client.post(
         "/trainers/", json={"name": "Misty", "birthdate": "1997-11-15"}
     ).json()["id"]
-    mocker.patch("app.actions.get_pokemon_name", return_value="pikachu")
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="pikachu")
     client.post(f"/trainers/{ash_id}/pokemon/", json={"api_id": 25})
-    mocker.patch("app.actions.get_pokemon_name", return_value="starmie")
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="starmie")
     client.post(f"/trainers/{misty_id}/pokemon/", json={"api_id": 121})
 
     # Act
@@ -62,7 +66,7 @@ def test_get_pokemons_limit(mocker):
     ).json()["id"]
 
     for api_id, name in [(1, "bulbasaur"), (4, "charmander"), (7, "squirtle")]:
-        mocker.patch("app.actions.get_pokemon_name", return_value=name)
+        mocker.patch("app.actions.get_pokemon_name_async", return_value=name)
         client.post(f"/trainers/{trainer_id}/pokemon/", json={"api_id": api_id})
 
     # Act
@@ -79,7 +83,7 @@ pokemon_data = [(25, "pikachu"), (1, "bulbasaur"), (150, "mewtwo")]
 @pytest.mark.parametrize("api_id, name", pokemon_data)
 def test_pokemon_in_global_list_parametrized(mocker, api_id, name):
     # Arrange
-    mocker.patch("app.actions.get_pokemon_name", return_value=name)
+    mocker.patch("app.actions.get_pokemon_name_async", return_value=name)
     trainer_id = client.post(
         "/trainers/", json={"name": f"Trainer_{api_id}", "birthdate": "2000-01-01"}
     ).json()["id"]
@@ -92,3 +96,357 @@ def test_pokemon_in_global_list_parametrized(mocker, api_id, name):
     assert response.status_code == 200
     all_names = [p["name"] for p in response.json()]
     assert name in all_names
+
+
+# ---------------------------------------------------------------------------
+# GET /pokemons/fight and /pokemons/random/
+# ---------------------------------------------------------------------------
+
+def stats_of(value):
+    return [{"stat": {"name": "hp"}, "base_stat": value}]
+
+
+def create_pokemons(mocker, count):
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Ash", "birthdate": "1997-04-01"}
+    ).json()["id"]
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="pikachu")
+    return [
+        client.post(
+            f"/trainers/{trainer_id}/pokemon/",
+            json={"api_id": index + 1, "custom_name": f"Pika{index}"},
+        ).json()["id"]
+        for index in range(count)
+    ]
+
+
+def test_fight_pokemons_first_wins(mocker):
+    # Arrange
+    first_id, second_id = create_pokemons(mocker, 2)
+    mock_stats = mocker.patch(
+        "app.actions.get_many_pokemon_stats_async",
+        return_value=[stats_of(100), stats_of(10)],
+    )
+
+    # Act
+    response = client.get(
+        f"/pokemons/fight?first_pokemon_id={first_id}&second_pokemon_id={second_id}"
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json() == {"winner": "Pika0", "draw": False}
+    mock_stats.assert_awaited_once_with([1, 2])
+
+
+def test_fight_pokemons_draw(mocker):
+    # Arrange
+    first_id, second_id = create_pokemons(mocker, 2)
+    mocker.patch(
+        "app.actions.get_many_pokemon_stats_async",
+        return_value=[stats_of(50), stats_of(50)],
+    )
+
+    # Act
+    response = client.get(
+        f"/pokemons/fight?first_pokemon_id={first_id}&second_pokemon_id={second_id}"
+    )
+
+    # Assert
+    assert response.json() == {"winner": None, "draw": True}
+
+
+def test_get_random_pokemons_fetches_stats_by_api_id(mocker):
+    # Arrange
+    create_pokemons(mocker, 3)
+    mock_stats = mocker.patch(
+        "app.actions.get_many_pokemon_stats_async",
+        return_value=[stats_of(1), stats_of(2), stats_of(3)],
+    )
+
+    # Act
+    response = client.get("/pokemons/random/")
+
+    # Assert
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert sorted(mock_stats.call_args.args[0]) == [1, 2, 3]
+
+
+def test_fight_pokemons_reads_seeded_species(mocker):
+    # Arrange
+    first_id, second_id = create_pokemons(mocker, 2)
+    database = SESSION_LOCAL()
+    database.add_all([
+        models.Species(api_id=1, name="bulbasaur", hp=45, attack=49, speed=45),
+        models.Species(api_id=2, name="ivysaur", hp=60, attack=62, speed=60),
+    ])
+    database.commit()
+    database.close()
+    mock_stats = mocker.patch("app.actions.get_many_pokemon_stats_async", return_value=[])
+
+    # Act
+    response = client.get(
+        f"/pokemons/fight?first_pokemon_id={first_id}&second_pokemon_id={second_id}"
+    )
+
+    # Assert
+    assert response.json() == {"winner": "Pika1", "draw": False}
+    mock_stats.assert_awaited_once_with([])
+
+
+# ---------------------------------------------------------------------------
+# POST /pokemons/fights
+# ---------------------------------------------------------------------------
+
+def test_fight_many_pokemons_streams_results_in_order(mocker):
+    # Arrange
+    first_id, second_id, third_id = create_pokemons(mocker, 3)
+    mock_stats = mocker.patch(
+        "app.actions.get_many_pokemon_stats_async",
+        return_value=[stats_of(10), stats_of(50), stats_of(50)],
+    )
+    fights = [
+        {"first_pokemon_id": first_id, "second_pokemon_id": second_id},
+        {"first_pokemon_id": second_id, "second_pokemon_id": third_id},
+        {"first_pokemon_id": third_id, "second_pokemon_id": first_id},
+    ]
+
+    # Act
+    response = client.post("/pokemons/fights", json=fights)
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"winner": "Pika1", "draw": False},
+        {"winner": None, "draw": True},
+        {"winner": "Pika2", "draw": False},
+    ]
+    mock_stats.assert_awaited_once_with([1, 2, 3])
+
+
+def test_fight_many_pokemons_fetches_each_species_once(mocker):
+    # Arrange
+    first_id, second_id = create_pokemons(mocker, 2)
+    mock_stats = mocker.patch(
+        "app.actions.get_many_pokemon_stats_async",
+        return_value=[stats_of(10), stats_of(50)],
+    )
+    fights = [{"first_pokemon_id": first_id, "second_pokemon_id": second_id}] * 1000
+
+    # Act
+    response = client.post("/pokemons/fights", json=fights)
+
+    # Assert
+    assert len(response.text.splitlines()) == 1000
+    mock_stats.assert_awaited_once()
+
+
+def test_fight_many_pokemons_unknown_pokemon():
+    # Act
+    response = client.post(
+        "/pokemons/fights", json=[{"first_pokemon_id": 1, "second_pokemon_id": 2}]
+    )
+
+    # Assert
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Pokemons not found: [1, 2]"
+
+
+# ---------------------------------------------------------------------------
+# GET /pokemons/tournament
+# ---------------------------------------------------------------------------
+
+def test_tournament_ranks_pokemons(mocker):
+    # Arrange
+    first_id, second_id, third_id = create_pokemons(mocker, 3)
+    mocker.patch(
+        "app.actions.get_many_pokemon_stats_async",
+        return_value=[stats_of(10), stats_of(90), stats_of(50)],
+    )
+
+    # Act
+    response = client.get("/pokemons/tournament")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["fights"] == 3
+    standings = response.json()["standings"]
+    assert [s["pokemon_id"] for s in standings] == [second_id, third_id, first_id]
+    assert [(s["wins"], s["draws"], s["losses"]) for s in standings] == [
+        (2, 0, 0), (1, 0, 1), (0, 0, 2)
+    ]
+    assert [s["rank"] for s in standings] == [1, 2, 3]
+
+
+def test_tournament_reads_seeded_species_and_fetches_the_others(mocker):
+    # Arrange
+    first_id, second_id = create_pokemons(mocker, 2)
+    database = SESSION_LOCAL()
+    database.add(models.Species(api_id=1, name="bulbasaur", hp=45, attack=49, speed=45))
+    database.commit()
+    database.close()
+    mock_stats = mocker.patch(
+        "app.actions.get_many_pokemon_stats_async", return_value=[stats_of(90)])
+
+    # Act
+    response = client.get("/pokemons/tournament")
+
+    # Assert
+    mock_stats.assert_awaited_once_with([2])
+    assert [s["pokemon_id"] for s in response.json()["standings"]] == [second_id, first_id]
+
+
+def test_tournament_runs_round_robin_off_the_event_loop(mocker):
+    # Arrange
+    create_pokemons(mocker, 2)
+    mocker.patch(
+        "app.actions.get_many_pokemon_stats_async",
+        return_value=[stats_of(10), stats_of(90)],
+    )
+    to_thread = mocker.spy(actions.asyncio, "to_thread")
+
+    # Act
+    client.get("/pokemons/tournament")
+
+    # Assert
+    assert to_thread.call_args.args[0] is actions.round_robin
+
+
+def test_tournament_scoped_to_pokemon_ids(mocker):
+    # Arrange
+    first_id, second_id, _ = create_pokemons(mocker, 3)
+    mock_stats = mocker.patch(
+        "app.actions.get_many_pokemon_stats_async",
+        return_value=[stats_of(10), stats_of(10)],
+    )
+
+    # Act
+    response = client.get(
+        f"/pokemons/tournament?pokemon_ids={first_id}&pokemon_ids={second_id}"
+    )
+
+    # Assert
+    assert response.json()["fights"] == 1
+    assert [s["draws"] for s in response.json()["standings"]] == [1, 1]
+    mock_stats.assert_awaited_once_with([1, 2])
+
+
+def test_tournament_unknown_trainer_is_empty():
+    # Act
+    response = client.get("/pokemons/tournament?trainer_id=99999")
+
+    # Assert
+    assert response.json() == {"fights": 0, "standings": []}
+
+
+def test_get_pokemons_cursor_pagination(mocker):
+    # Arrange
+    pokemon_ids = create_pokemons(mocker, 3)
+
+    # Act
+    first_page = client.get("/pokemons/?limit=2")
+    second_page = client.get(f"/pokemons/?limit=2&cursor={first_page.headers['X-Next-Cursor']}")
+
+    # Assert
+    ids = [p["id"] for page in (first_page, second_page) for p in page.json()]
+    assert ids == pokemon_ids
+
+
+def test_get_random_pokemons_empty_table():
+    # Act
+    response = client.get("/pokemons/random/")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_get_random_pokemons_fewer_rows_than_sample(mocker):
+    # Arrange
+    create_pokemons(mocker, 2)
+    mocker.patch(
+        "app.actions.get_many_pokemon_stats_async", return_value=[stats_of(1), stats_of(2)]
+    )
+
+    # Act
+    response = client.get("/pokemons/random/")
+
+    # Assert
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_get_random_pokemons_sample_size_and_limit(mocker, assert_max_queries):
+    # Arrange
+    pokemon_ids = create_pokemons(mocker, 5)
+    mocker.patch("app.actions.get_many_pokemon_stats_async", return_value=[stats_of(1)] * 2)
+
+    # Act
+    with assert_max_queries(3):
+        response = client.get("/pokemons/random/?limit=2&sample_size=2")
+
+    # Assert
+    assert sorted(p["id"] for p in response.json()) == pokemon_ids[:2]
+
+
+def test_fight_pokemons_unknown_pokemon():
+    # Act
+    response = client.get("/pokemons/fight?first_pokemon_id=1&second_pokemon_id=2")
+
+    # Assert
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Pokemon not found"
+
+
+def test_import_pokemons_fetches_each_name_once(mocker):
+    # Arrange
+    mock_name = mocker.patch("app.actions.get_pokemon_name_async", return_value="pikachu")
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Ash", "birthdate": "1997-04-01"}
+    ).json()["id"]
+    payload = [{"api_id": 25, "trainer_id": trainer_id}] * 3
+
+    # Act
+    response = client.post("/pokemons/import", json=payload)
+
+    # Assert
+    assert response.json()["inserted"] == 3
+    mock_name.assert_called_once_with(25)
+    assert {pokemon["name"] for pokemon in client.get("/pokemons/").json()} == {"pikachu"}
+
+
+def test_import_pokemons_leaves_unknown_name_pending(mocker):
+    # Arrange
+    mock_name = mocker.patch(
+        "app.actions.get_pokemon_name_async", side_effect=[KeyError("name"), "mewtwo"])
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Ash", "birthdate": "1997-04-01"}
+    ).json()["id"]
+
+    # Act
+    response = client.post("/pokemons/import", json=[{"api_id": 150, "trainer_id": trainer_id}])
+
+    # Assert
+    assert (response.json()["inserted"], response.json()["pending"]) == (1, 1)
+    assert response.json()["errors"] == []
+    assert mock_name.call_count == 2
+    assert [pokemon["name"] for pokemon in client.get("/pokemons/").json()] == ["mewtwo"]
+
+
+def test_import_pokemons_deferred_names(mocker):
+    # Arrange
+    mock_name = mocker.patch("app.actions.get_pokemon_name_async", return_value="eevee")
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Ash", "birthdate": "1997-04-01"}
+    ).json()["id"]
+    payload = [{"api_id": 133, "trainer_id": trainer_id}] * 2
+
+    # Act
+    response = client.post("/pokemons/import?deferred=true", json=payload)
+
+    # Assert
+    assert (response.json()["inserted"], response.json()["pending"]) == (2, 2)
+    mock_name.assert_called_once_with(133)
+    assert [pokemon["name"] for pokemon in client.get("/pokemons/").json()] == ["eevee"] * 2
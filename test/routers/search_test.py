@@ -0,0 +1,146 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from main import app
+from app import models
+from app.sqlite import SESSION_LOCAL
+
+client = TestClient(app)
+
+
+def create_trainer(name):
+    return client.post("/trainers/", json={"name": name, "birthdate": "2000-01-01"}).json()["id"]
+
+
+def test_search_trainer_substring():
+    # Arrange
+    ash_id = create_trainer("Ash Ketchum")
+    create_trainer("Misty")
+
+    # Act
+    response = client.get("/search/?q=ketch")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json() == [
+        {"kind": "trainer", "id": ash_id, "text": "Ash Ketchum", "trainer_id": None}]
+
+
+def test_search_prefix():
+    # Arrange
+    create_trainer("Brock")
+    create_trainer("Pebrock")
+
+    # Act
+    response = client.get("/search/?q=bro&mode=prefix&scope=trainers")
+
+    # Assert
+    assert [hit["text"] for hit in response.json()] == ["Brock"]
+
+
+def test_search_fuzzy_ranks_closest_first():
+    # Arrange
+    create_trainer("Gary Oak")
+    create_trainer("Garyson")
+    create_trainer("Professor Oak")
+
+    # Act
+    response = client.get("/search/?q=gary%20oac&mode=fuzzy&scope=trainers")
+
+    # Assert
+    assert response.json()[0]["text"] == "Gary Oak"
+
+
+def test_search_exact():
+    # Arrange
+    create_trainer("Red")
+    red_id = create_trainer("red")
+
+    # Act
+    response = client.get("/search/?q=red&mode=exact&scope=trainers")
+
+    # Assert
+    assert [hit["id"] for hit in response.json()] == [red_id]
+
+
+def test_search_items_description_and_pokemon_custom_name(mocker):
+    # Arrange
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="pikachu")
+    trainer_id = create_trainer("Ash")
+    client.post(
+        f"/trainers/{trainer_id}/item/", json={"name": "Potion", "description": "Heals 20 HP"})
+    client.post(
+        f"/trainers/{trainer_id}/pokemon/", json={"api_id": 25, "custom_name": "Sparky"})
+
+    # Act
+    items = client.get("/search/?q=heals&scope=items").json()
+    pokemons = client.get("/search/?q=spark&scope=pokemons").json()
+
+    # Assert
+    assert items[0]["text"] == "Potion"
+    assert items[0]["trainer_id"] == trainer_id
+    assert pokemons[0]["text"] == "Sparky"
+
+
+def test_search_index_follows_updates_and_deletes():
+    # Arrange
+    trainer_id = create_trainer("Erika")
+    items = client.post("/items/import", json=[
+        {"name": "Leaf Stone", "trainer_id": trainer_id}]).json()["ids"]
+
+    # Act
+    database = SESSION_LOCAL()
+    database.query(models.Item).filter(models.Item.id == items[0]).update({"name": "Moon Stone"})
+    database.commit()
+    database.close()
+
+    # Assert
+    assert client.get("/search/?q=leaf&scope=items").json() == []
+    assert client.get("/search/?q=moon&scope=items").json()[0]["id"] == items[0]
+
+
+def test_search_short_query_and_wildcards():
+    # Arrange
+    create_trainer("Al_x")
+    create_trainer("Alex")
+
+    # Act
+    response = client.get("/search/?q=l_&scope=trainers")
+
+    # Assert
+    assert [hit["text"] for hit in response.json()] == ["Al_x"]
+
+
+def drop_search_indexes():
+    database = SESSION_LOCAL()
+    for table in ("trainers", "pokemons", "items"):
+        database.execute(text(f"DROP TABLE {table}_fts"))
+    database.commit()
+    database.close()
+
+
+def test_search_without_index_falls_back_to_like():
+    # Arrange
+    ash_id = create_trainer("Ash Ketchum")
+    drop_search_indexes()
+
+    # Act
+    response = client.get("/search/?q=ash")
+
+    # Assert
+    assert response.status_code == 200
+    assert [hit["id"] for hit in response.json()] == [ash_id]
+
+
+def test_search_falls_back_to_like_once_index_is_dropped():
+    # Arrange
+    ash_id = create_trainer("Ash Ketchum")
+    client.get("/search/?q=ash&scope=trainers")
+    drop_search_indexes()
+
+    # Act
+    response = client.get("/search/?q=ketch&scope=trainers")
+
+    # Assert
+    assert response.status_code == 200
+    assert [hit["id"] for hit in response.json()] == [ash_id]
@@ -1,7 +1,13 @@
+import os
+import subprocess
+import sys
+
 import pytest
 from fastapi.testclient import TestClient
 
 from main import app
+from app import models
+from app.sqlite import SESSION_LOCAL
 
 client = TestClient(app)
 
@@ -204,7 +210,7 @@ def test_add_multiple_items_parametrized(item_name):
 
 def test_add_pokemon_to_trainer(mocker):
     # Arrange
-    mocker.patch("app.actions.get_pokemon_name", return_value="bulbasaur")
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="bulbasaur")
     trainer_id = client.post(
         "/trainers/", json={"name": "Erika", "birthdate": "1990-03-10"}
     ).json()["id"]
@@ -220,7 +226,7 @@ def test_add_pokemon_to_trainer(mocker):
 
 def test_add_pokemon_with_custom_name(mocker):
     # Arrange
-    mocker.patch("app.actions.get_pokemon_name", return_value="charmander")
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="charmander")
     trainer_id = client.post(
         "/trainers/", json={"name": "Blaine", "birthdate": "1955-06-06"}
     ).json()["id"]
@@ -238,7 +244,7 @@ def test_add_pokemon_with_custom_name(mocker):
 
 def test_pokemon_appears_in_trainer_pokemons(mocker):
     # Arrange
-    mocker.patch("app.actions.get_pokemon_name", return_value="mewtwo")
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="mewtwo")
     trainer_id = client.post(
         "/trainers/", json={"name": "Giovanni", "birthdate": "1960-10-18"}
     ).json()["id"]
@@ -258,7 +264,7 @@ pokemon_ids = [(25, "pikachu"), (1, "bulbasaur"), (4, "charmander")]
 @pytest.mark.parametrize("api_id, expected_name", pokemon_ids)
 def test_add_pokemon_parametrized(mocker, api_id, expected_name):
     # Arrange
-    mocker.patch("app.actions.get_pokemon_name", return_value=expected_name)
+    mocker.patch("app.actions.get_pokemon_name_async", return_value=expected_name)
     trainer_id = client.post(
         "/trainers/", json={"name": f"Trainer_{api_id}", "birthdate": "2000-01-01"}
     ).json()["id"]
@@ -270,3 +276,397 @@ def test_add_pokemon_parametrized(mocker, api_id, expected_name):
     assert response.status_code == 200
     assert response.json()["name"] == expected_name
     assert response.json()["api_id"] == api_id
+
+
+def test_add_pokemon_uses_seeded_species_name(mocker):
+    # Arrange
+    database = SESSION_LOCAL()
+    database.add(models.Species(api_id=133, name="eevee"))
+    database.commit()
+    database.close()
+    mock_name = mocker.patch("app.actions.get_pokemon_name_async")
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Gary", "birthdate": "1997-04-01"}
+    ).json()["id"]
+
+    # Act
+    response = client.post(f"/trainers/{trainer_id}/pokemon/", json={"api_id": 133})
+
+    # Assert
+    assert response.json()["name"] == "eevee"
+    mock_name.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Cursor pagination
+# ---------------------------------------------------------------------------
+
+
+def test_get_trainers_cursor_pagination():
+    # Arrange
+    for i in range(5):
+        client.post("/trainers/", json={"name": f"Player{i}", "birthdate": "2000-01-01"})
+
+    # Act
+    first_page = client.get("/trainers?limit=2")
+    second_page = client.get(f"/trainers?limit=2&cursor={first_page.headers['X-Next-Cursor']}")
+    third_page = client.get(f"/trainers?limit=2&cursor={second_page.headers['X-Next-Cursor']}")
+
+    # Assert
+    names = [t["name"] for page in (first_page, second_page, third_page) for t in page.json()]
+    assert names == [f"Player{i}" for i in range(5)]
+    assert "X-Next-Cursor" not in third_page.headers
+
+
+def test_get_trainers_skip_returns_next_cursor():
+    # Arrange
+    for i in range(4):
+        client.post("/trainers/", json={"name": f"Player{i}", "birthdate": "2000-01-01"})
+
+    # Act
+    first_page = client.get("/trainers?skip=1&limit=2")
+    next_page = client.get(f"/trainers?limit=2&cursor={first_page.headers['X-Next-Cursor']}")
+
+    # Assert
+    assert [t["name"] for t in next_page.json()] == ["Player3"]
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "eyJpZCI6IHRydWV9"])
+def test_get_trainers_invalid_cursor(cursor):
+    # Act
+    response = client.get(f"/trainers?cursor={cursor}")
+
+    # Assert
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+# ---------------------------------------------------------------------------
+# Query count
+# ---------------------------------------------------------------------------
+
+
+def create_full_trainers(mocker, count):
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="pikachu")
+    trainer_ids = []
+    for i in range(count):
+        trainer_id = client.post(
+            "/trainers/", json={"name": f"Player{i}", "birthdate": "2000-01-01"}
+        ).json()["id"]
+        client.post(f"/trainers/{trainer_id}/item/", json={"name": "Potion"})
+        client.post(f"/trainers/{trainer_id}/pokemon/", json={"api_id": 25})
+        trainer_ids.append(trainer_id)
+    return trainer_ids
+
+
+loading_strategies = [("selectin", 3), ("joined", 1), ("subquery", 3)]
+
+
+@pytest.mark.parametrize("strategy, max_queries", loading_strategies)
+def test_get_trainers_query_count(mocker, assert_max_queries, strategy, max_queries):
+    # Arrange
+    create_full_trainers(mocker, 5)
+    mocker.patch("app.actions.TRAINER_LOADING_STRATEGY", strategy)
+
+    # Act
+    with assert_max_queries(max_queries):
+        response = client.get("/trainers")
+
+    # Assert
+    assert len(response.json()) == 5
+    assert all(len(t["inventory"]) == 1 and len(t["pokemons"]) == 1 for t in response.json())
+
+
+def test_unknown_loading_strategy_fails_at_import():
+    # Arrange
+    env = {**os.environ, "TRAINER_LOADING_STRATEGY": "eager"}
+
+    # Act
+    result = subprocess.run([sys.executable, "-c", "import app.actions"],
+                            env=env, capture_output=True, text=True, check=False)
+
+    # Assert
+    assert result.returncode != 0
+    assert "Unknown TRAINER_LOADING_STRATEGY 'eager'" in result.stderr
+
+
+def test_get_trainer_query_count(mocker, assert_max_queries):
+    # Arrange
+    trainer_id = create_full_trainers(mocker, 1)[0]
+
+    # Act
+    with assert_max_queries(3):
+        response = client.get(f"/trainers/{trainer_id}")
+
+    # Assert
+    assert response.json()["inventory"][0]["name"] == "Potion"
+    assert response.json()["pokemons"][0]["name"] == "pikachu"
+
+
+# ---------------------------------------------------------------------------
+# POST /trainers/import
+# ---------------------------------------------------------------------------
+
+
+def test_import_trainers_json_array():
+    # Arrange
+    payload = [
+        {"name": "Ash", "birthdate": "1997-04-01"},
+        {"name": "Misty"},
+        {"name": "Brock", "birthdate": "1995-09-03"},
+    ]
+
+    # Act
+    response = client.post("/trainers/import", json=payload)
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 2
+    assert [error["index"] for error in response.json()["errors"]] == [1]
+    assert "birthdate" in response.json()["errors"][0]["detail"]
+    names = [trainer["name"] for trainer in client.get("/trainers").json()]
+    assert names == ["Ash", "Brock"]
+
+
+def test_import_trainers_ndjson():
+    # Arrange
+    body = '{"name": "Ash", "birthdate": "1997-04-01"}\nnot json\n\n{"name": "Gary", "birthdate": "1997-04-01"}'
+
+    # Act
+    response = client.post(
+        "/trainers/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    # Assert
+    assert response.json()["inserted"] == 2
+    assert response.json()["errors"][0]["index"] == 1
+    assert response.json()["errors"][0]["detail"].startswith("Invalid JSON")
+
+
+def test_import_trainers_inserts_by_chunk(mocker, assert_max_queries):
+    # Arrange
+    mocker.patch("app.actions.IMPORT_CHUNK_SIZE", 2)
+    payload = [{"name": f"Trainer_{i}", "birthdate": "2000-01-01"} for i in range(5)]
+
+    # Act
+    with assert_max_queries(3):
+        response = client.post("/trainers/import", json=payload)
+
+    # Assert
+    ids = response.json()["ids"]
+    assert len(ids) == 5
+    assert ids == sorted(ids)
+
+
+def test_import_trainers_rejects_non_array_body():
+    # Act
+    response = client.post("/trainers/import", json={"name": "Ash"})
+
+    # Assert
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Expected a JSON array"
+
+
+# ---------------------------------------------------------------------------
+# Batch and deferred name resolution
+# ---------------------------------------------------------------------------
+
+
+def test_add_team_resolves_each_species_once(mocker):
+    # Arrange
+    mock_name = mocker.patch("app.actions.get_pokemon_name_async", return_value="pikachu")
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Ash", "birthdate": "1997-04-01"}
+    ).json()["id"]
+    team = [{"api_id": 25}] * 5 + [{"api_id": 25, "custom_name": "Sparky"}]
+
+    # Act
+    response = client.post(f"/trainers/{trainer_id}/pokemons/", json=team)
+
+    # Assert
+    assert response.status_code == 200
+    assert [pokemon["name"] for pokemon in response.json()] == ["pikachu"] * 6
+    mock_name.assert_called_once_with(25)
+
+
+def test_add_pokemon_deferred_name_is_filled_in_background(mocker):
+    # Arrange
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="snorlax")
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Red", "birthdate": "1996-02-27"}
+    ).json()["id"]
+
+    # Act
+    response = client.post(
+        f"/trainers/{trainer_id}/pokemon/?deferred=true", json={"api_id": 143})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["name"] is None
+    assert client.get(f"/trainers/{trainer_id}").json()["pokemons"][0]["name"] == "snorlax"
+
+
+def test_add_pokemon_unresolved_name_stays_pending(mocker):
+    # Arrange
+    mocker.patch("app.actions.get_pokemon_name_async", side_effect=ConnectionError)
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Blue", "birthdate": "1996-02-27"}
+    ).json()["id"]
+
+    # Act
+    response = client.post(f"/trainers/{trainer_id}/pokemon/", json={"api_id": 1})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["name"] is None
+
+
+# ---------------------------------------------------------------------------
+# Fast list responses
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("url", ["/trainers?limit=3", "/pokemons/?limit=4", "/items/?limit=2"])
+def test_fast_list_responses_match_regular_ones(mocker, url):
+    # Arrange
+    create_full_trainers(mocker, 5)
+    regular = client.get(url)
+    mocker.patch("app.utils.serialization.FAST_LIST_RESPONSES", True)
+
+    # Act
+    fast = client.get(url)
+
+    # Assert
+    assert fast.json() == regular.json()
+    assert fast.headers["X-Next-Cursor"] == regular.headers["X-Next-Cursor"]
+
+
+def test_fast_trainers_query_count(mocker, assert_max_queries):
+    # Arrange
+    create_full_trainers(mocker, 5)
+    mocker.patch("app.utils.serialization.FAST_LIST_RESPONSES", True)
+
+    # Act
+    with assert_max_queries(3):
+        response = client.get("/trainers")
+
+    # Assert
+    assert len(response.json()) == 5
+
+
+# ---------------------------------------------------------------------------
+# Trainer cache and ETags
+# ---------------------------------------------------------------------------
+
+
+def test_get_trainer_not_modified_without_query(assert_max_queries):
+    # Arrange
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Ash", "birthdate": "1997-04-01"}
+    ).json()["id"]
+    etag = client.get(f"/trainers/{trainer_id}").headers["ETag"]
+
+    # Act
+    with assert_max_queries(0):
+        response = client.get(f"/trainers/{trainer_id}", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_get_trainer_served_from_cache(assert_max_queries):
+    # Arrange
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Misty", "birthdate": "1997-11-15"}
+    ).json()["id"]
+    first = client.get(f"/trainers/{trainer_id}")
+
+    # Act
+    with assert_max_queries(0):
+        second = client.get(f"/trainers/{trainer_id}")
+
+    # Assert
+    assert second.json() == first.json()
+
+
+def test_get_trainer_invalidated_by_new_item():
+    # Arrange
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Brock", "birthdate": "1995-09-03"}
+    ).json()["id"]
+    etag = client.get(f"/trainers/{trainer_id}").headers["ETag"]
+    client.post(f"/trainers/{trainer_id}/item/", json={"name": "Potion"})
+
+    # Act
+    response = client.get(f"/trainers/{trainer_id}", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [item["name"] for item in response.json()["inventory"]] == ["Potion"]
+
+
+def test_get_trainer_invalidated_by_new_pokemon(mocker):
+    # Arrange
+    mocker.patch("app.actions.get_pokemon_name_async", return_value="onix")
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Brock", "birthdate": "1995-09-03"}
+    ).json()["id"]
+    client.get(f"/trainers/{trainer_id}")
+
+    # Act
+    client.post(f"/trainers/{trainer_id}/pokemon/", json={"api_id": 95})
+    response = client.get(f"/trainers/{trainer_id}")
+
+    # Assert
+    assert [pokemon["name"] for pokemon in response.json()["pokemons"]] == ["onix"]
+
+
+def test_get_trainer_invalidated_by_item_import():
+    # Arrange
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Erika", "birthdate": "1996-02-27"}
+    ).json()["id"]
+    client.get(f"/trainers/{trainer_id}")
+
+    # Act
+    client.post("/items/import", json=[{"name": "Repel", "trainer_id": trainer_id}])
+    response = client.get(f"/trainers/{trainer_id}")
+
+    # Assert
+    assert [item["name"] for item in response.json()["inventory"]] == ["Repel"]
+
+
+# ---------------------------------------------------------------------------
+# Server-Timing
+# ---------------------------------------------------------------------------
+
+def test_get_trainer_server_timing_counts_queries(assert_max_queries):
+    # Arrange
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Gary", "birthdate": "1997-04-01"}
+    ).json()["id"]
+
+    # Act
+    with assert_max_queries(3) as statements:
+        response = client.get(f"/trainers/{trainer_id}")
+
+    # Assert
+    server_timing = response.headers["Server-Timing"]
+    assert f'desc="{len(statements)} queries"' in server_timing
+    assert 'pokeapi;dur=0.00;desc="0 calls"' in server_timing
+    assert "serialize;dur=" in server_timing
+
+
+def test_get_trainer_cached_server_timing_has_no_query():
+    # Arrange
+    trainer_id = client.post(
+        "/trainers/", json={"name": "Sabrina", "birthdate": "1990-05-12"}
+    ).json()["id"]
+    client.get(f"/trainers/{trainer_id}")
+
+    # Act
+    response = client.get(f"/trainers/{trainer_id}")
+
+    # Assert
+    assert 'db;dur=0.00;desc="0 queries"' in response.headers["Server-Timing"]
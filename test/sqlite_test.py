@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from app.sqlite import (
+    async_url,
+    create_async_database_engine,
+    create_sqlite_engine,
+    sqlite_pragmas,
+)
+
+
+def read_pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_sqlite_engine_applies_profile(tmp_path):
+    # Arrange
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+
+    # Act
+    journal_mode = read_pragma(engine, "journal_mode")
+    synchronous = read_pragma(engine, "synchronous")
+    busy_timeout = read_pragma(engine, "busy_timeout")
+
+    # Assert
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == 5000
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 20
+
+
+def test_sqlite_pragmas_env_override(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT", "100")
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "FULL")
+
+    # Act
+    pragmas = sqlite_pragmas()
+
+    # Assert
+    assert pragmas["busy_timeout"] == "100"
+    assert pragmas["synchronous"] == "FULL"
+    assert pragmas["journal_mode"] == "WAL"
+
+
+def test_sqlite_pool_size_env_override(monkeypatch, tmp_path):
+    # Arrange
+    monkeypatch.setenv("SQLITE_POOL_SIZE", "3")
+
+    # Act
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+
+    # Assert
+    assert engine.pool.size() == 3
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"poolclass": StaticPool}])
+def test_sqlite_memory_engine_keeps_its_pool(kwargs):
+    # Act
+    engine = create_sqlite_engine("sqlite:///:memory:", **kwargs)
+
+    # Assert
+    assert read_pragma(engine, "cache_size") == -65536
+
+
+async_urls = [
+    ("sqlite:///./sqlite.db", "sqlite+aiosqlite:///./sqlite.db"),
+    ("postgresql://user:secret@db/poke", "postgresql+asyncpg://user:secret@db/poke"),
+    ("postgresql+asyncpg://user@db/poke", "postgresql+asyncpg://user@db/poke"),
+]
+
+
+@pytest.mark.parametrize("url, expected", async_urls)
+def test_async_url(url, expected):
+    # Act
+    result = async_url(url)
+
+    # Assert
+    assert result.render_as_string(hide_password=False) == expected
+
+
+@pytest.mark.parametrize("url", ["mysql://user@db/poke", "mysql+aiomysql://user@db/poke"])
+def test_unsupported_database_is_rejected(url):
+    # Act / Assert
+    with pytest.raises(ValueError, match="Unsupported database 'mysql'"):
+        create_async_database_engine(url)
+
+
+def test_async_sqlite_engine_applies_profile(tmp_path):
+    # Arrange
+    engine = create_async_database_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+
+    async def read_journal_mode():
+        async with engine.connect() as connection:
+            return (await connection.execute(text("PRAGMA journal_mode"))).scalar()
+
+    # Act
+    journal_mode = asyncio.run(read_journal_mode())
+
+    # Assert
+    assert journal_mode == "wal"
@@ -0,0 +1,188 @@
+import random
+
+import numpy as np
+import pytest
+
+from app import models
+from app.utils.battle import (
+    STAT_NAMES,
+    StatMatrix,
+    compare_rows,
+    outcome_matrix,
+    round_robin,
+    stats_row,
+)
+
+
+def reference_compare(first_pokemon_stats, second_pokemon_stats):
+    """Per-stat loop of the original battle_compare_stats"""
+    first_stats = {stat["stat"]["name"]: stat["base_stat"] for stat in first_pokemon_stats}
+    second_stats = {stat["stat"]["name"]: stat["base_stat"] for stat in second_pokemon_stats}
+    score = 0
+    for stat_name, first_value in first_stats.items():
+        second_value = second_stats.get(stat_name)
+        if second_value is None:
+            continue
+        if first_value > second_value:
+            score += 1
+        elif first_value < second_value:
+            score -= 1
+    return (score > 0) - (score < 0)
+
+
+def random_stats(rng):
+    return [
+        {"stat": {"name": name}, "base_stat": rng.randint(1, 10)}
+        for name in STAT_NAMES
+        if rng.random() > 0.1
+    ]
+
+
+# ---------------------------------------------------------------------------
+# stats_row / compare_rows
+# ---------------------------------------------------------------------------
+
+def test_stats_row_uses_nan_for_missing_stats():
+    # Act
+    row = stats_row([{"stat": {"name": "attack"}, "base_stat": 49}])
+
+    # Assert
+    assert row[STAT_NAMES.index("attack")] == 49
+    assert np.isnan(row[STAT_NAMES.index("hp")])
+
+
+def test_compare_rows_ignores_stats_missing_on_one_side():
+    # Arrange
+    first = stats_row([{"stat": {"name": "hp"}, "base_stat": 10},
+                       {"stat": {"name": "speed"}, "base_stat": 99}])
+    second = stats_row([{"stat": {"name": "hp"}, "base_stat": 20}])
+
+    # Act
+    result = compare_rows(first, second)
+
+    # Assert
+    assert result == -1
+
+
+def test_compare_rows_matches_reference_semantics():
+    # Arrange
+    rng = random.Random(42)
+    pairs = [(random_stats(rng), random_stats(rng)) for _ in range(500)]
+    first = np.array([stats_row(pair[0]) for pair in pairs])
+    second = np.array([stats_row(pair[1]) for pair in pairs])
+
+    # Act
+    result = compare_rows(first, second)
+
+    # Assert
+    assert result.tolist() == [reference_compare(*pair) for pair in pairs]
+
+
+# ---------------------------------------------------------------------------
+# StatMatrix
+# ---------------------------------------------------------------------------
+
+def test_stat_matrix_resolves_a_batch_of_fights():
+    # Arrange
+    matrix = StatMatrix.from_stats({
+        1: [{"stat": {"name": "hp"}, "base_stat": 45}],
+        25: [{"stat": {"name": "hp"}, "base_stat": 35}],
+        150: [{"stat": {"name": "hp"}, "base_stat": 106}],
+    })
+
+    # Act
+    result = matrix.compare([1, 25, 150, 1], [25, 150, 1, 1])
+
+    # Assert
+    assert result.tolist() == [1, -1, 1, 0]
+
+
+def test_stat_matrix_from_species():
+    # Arrange
+    species = [
+        models.Species(api_id=1, name="bulbasaur", hp=45, attack=49, defense=49,
+                       special_attack=65, special_defense=65, speed=45),
+        models.Species(api_id=4, name="charmander", hp=39, attack=52, defense=43,
+                       special_attack=60, special_defense=50, speed=65),
+    ]
+
+    # Act
+    matrix = StatMatrix.from_species(species)
+
+    # Assert
+    assert matrix.matrix.shape == (2, len(STAT_NAMES))
+    assert matrix.compare([1], [4]).tolist() == [1]
+
+
+def test_stat_matrix_stack_keeps_each_api_id_row():
+    # Arrange
+    seeded = StatMatrix.from_species([
+        models.Species(api_id=4, name="charmander", hp=39, attack=52, defense=43,
+                       special_attack=60, special_defense=50, speed=65),
+    ])
+    fetched = StatMatrix.from_stats({1: [{"stat": {"name": "attack"}, "base_stat": 80}]})
+
+    # Act
+    matrix = StatMatrix.stack(seeded, fetched)
+
+    # Assert
+    assert matrix.matrix.shape == (2, len(STAT_NAMES))
+    assert matrix.compare([1, 4], [4, 1]).tolist() == [1, -1]
+
+
+fight_cases = [([1], [1], [0]), ([7], [1], [1]), ([1, 7], [7, 1], [-1, 1])]
+
+
+@pytest.mark.parametrize("first_ids, second_ids, expected", fight_cases)
+def test_stat_matrix_compare_parametrized(first_ids, second_ids, expected):
+    # Arrange
+    matrix = StatMatrix.from_stats({
+        1: [{"stat": {"name": "attack"}, "base_stat": 80}],
+        7: [{"stat": {"name": "attack"}, "base_stat": 90}],
+    })
+
+    # Act
+    result = matrix.compare(first_ids, second_ids)
+
+    # Assert
+    assert result.tolist() == expected
+
+
+# ---------------------------------------------------------------------------
+# outcome_matrix / round_robin
+# ---------------------------------------------------------------------------
+
+def test_outcome_matrix_is_antisymmetric():
+    # Arrange
+    rng = random.Random(7)
+    matrix = StatMatrix.from_stats({api_id: random_stats(rng) for api_id in range(50)})
+
+    # Act
+    outcomes = outcome_matrix(matrix.matrix, block_size=16)
+
+    # Assert
+    assert outcomes.shape == (50, 50)
+    assert (outcomes == -outcomes.T).all()
+    assert (np.diag(outcomes) == 0).all()
+
+
+def test_round_robin_matches_naive_loop():
+    # Arrange
+    rng = random.Random(11)
+    stats = {api_id: random_stats(rng) for api_id in range(10)}
+    matrix = StatMatrix.from_stats(stats)
+    api_ids = [rng.randrange(10) for _ in range(60)]
+
+    # Act
+    wins, draws, losses = round_robin(matrix, api_ids)
+
+    # Assert
+    for index, api_id in enumerate(api_ids):
+        results = [
+            reference_compare(stats[api_id], stats[other])
+            for other_index, other in enumerate(api_ids)
+            if other_index != index
+        ]
+        assert wins[index] == results.count(1)
+        assert draws[index] == results.count(0)
+        assert losses[index] == results.count(-1)
@@ -0,0 +1,336 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.utils.cache import LRUCache, PokeapiCache, TrainerCache
+
+
+class ImmediateThread:
+    """Run the target as soon as the thread is started"""
+
+    def __init__(self, target, args, daemon):
+        self.target = target
+        self.args = args
+        self.daemon = daemon
+
+    def start(self):
+        self.target(*self.args)
+
+
+# ---------------------------------------------------------------------------
+# LRUCache
+# ---------------------------------------------------------------------------
+
+def test_lru_cache_evicts_least_recently_used():
+    # Arrange
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    # Act
+    cache.set("c", 3)
+
+    # Assert
+    assert "a" in cache
+    assert "b" not in cache
+    assert len(cache) == 2
+
+
+def test_lru_cache_returns_default_when_missing():
+    # Arrange
+    cache = LRUCache(maxsize=2)
+
+    # Act
+    result = cache.get("missing", "default")
+
+    # Assert
+    assert result == "default"
+
+
+# ---------------------------------------------------------------------------
+# PokeapiCache
+# ---------------------------------------------------------------------------
+
+def test_pokeapi_cache_fetches_once(mocker):
+    # Arrange
+    cache = PokeapiCache()
+    fetch = mocker.MagicMock(return_value={"id": 25, "name": "pikachu"})
+
+    # Act
+    first = cache.get(25, fetch)
+    second = cache.get(25, fetch)
+
+    # Assert
+    fetch.assert_called_once_with(25)
+    assert first == second == {"id": 25, "name": "pikachu"}
+    assert cache.counters["misses"] == 1
+    assert cache.counters["memory_hits"] == 1
+
+
+def test_pokeapi_cache_trims_payload(mocker):
+    # Arrange
+    cache = PokeapiCache()
+    fetch = mocker.MagicMock(return_value={"id": 1, "name": "bulbasaur", "moves": ["..."]})
+
+    # Act
+    result = cache.get(1, fetch)
+
+    # Assert
+    assert result == {"id": 1, "name": "bulbasaur"}
+
+
+def test_pokeapi_cache_reads_disk_tier(mocker):
+    # Arrange
+    cache = PokeapiCache()
+    cache.get(4, mocker.MagicMock(return_value={"id": 4, "name": "charmander"}))
+    cache.memory.clear()
+    fetch = mocker.MagicMock()
+
+    # Act
+    result = cache.get(4, fetch)
+
+    # Assert
+    fetch.assert_not_called()
+    assert result["name"] == "charmander"
+    assert cache.counters["disk_hits"] == 1
+
+
+def test_pokeapi_cache_serves_stale_and_refreshes(mocker):
+    # Arrange
+    cache = PokeapiCache(ttl=10, stale_ttl=100)
+    mock_time = mocker.patch("app.utils.cache.time.time", return_value=1000)
+    cache.get(7, mocker.MagicMock(return_value={"id": 7, "name": "squirtle"}))
+    mock_time.return_value = 1050
+    mocker.patch("app.utils.cache.threading.Thread", ImmediateThread)
+    fetch = mocker.MagicMock(return_value={"id": 7, "name": "wartortle"})
+
+    # Act
+    stale = cache.get(7, fetch)
+    fresh = cache.get(7, fetch)
+
+    # Assert
+    assert stale["name"] == "squirtle"
+    assert fresh["name"] == "wartortle"
+    assert cache.counters["stale_hits"] == 1
+    assert cache.counters["refreshes"] == 1
+
+
+def test_pokeapi_cache_refetches_expired_entry(mocker):
+    # Arrange
+    cache = PokeapiCache(ttl=10, stale_ttl=10)
+    mock_time = mocker.patch("app.utils.cache.time.time", return_value=1000)
+    cache.get(150, mocker.MagicMock(return_value={"id": 150, "name": "mewtwo"}))
+    mock_time.return_value = 2000
+    fetch = mocker.MagicMock(return_value={"id": 150, "name": "mew"})
+
+    # Act
+    result = cache.get(150, fetch)
+
+    # Assert
+    fetch.assert_called_once_with(150)
+    assert result["name"] == "mew"
+    assert cache.counters["misses"] == 2
+
+
+def test_pokeapi_cache_serves_expired_entry_when_upstream_fails(mocker):
+    # Arrange
+    cache = PokeapiCache(ttl=10, stale_ttl=10)
+    mock_time = mocker.patch("app.utils.cache.time.time", return_value=1000)
+    cache.get(133, mocker.MagicMock(return_value={"id": 133, "name": "eevee"}))
+    mock_time.return_value = 2000
+
+    # Act
+    result = cache.get(133, mocker.MagicMock(side_effect=ConnectionError))
+
+    # Assert
+    assert result["name"] == "eevee"
+
+
+def test_pokeapi_cache_raises_when_nothing_cached(mocker):
+    # Arrange
+    cache = PokeapiCache()
+
+    # Act / Assert
+    with pytest.raises(ConnectionError):
+        cache.get(999, mocker.MagicMock(side_effect=ConnectionError))
+
+
+def test_pokeapi_cache_coalesces_concurrent_misses(mocker):
+    # Arrange
+    cache = PokeapiCache()
+
+    async def slow_fetch(api_id):
+        await asyncio.sleep(0.01)
+        return {"id": api_id, "name": "pikachu"}
+
+    fetch = mocker.AsyncMock(side_effect=slow_fetch)
+
+    async def run():
+        return await asyncio.gather(*(cache.get_async(25, fetch, None) for _ in range(4)))
+
+    # Act
+    results = asyncio.run(run())
+
+    # Assert
+    fetch.assert_awaited_once_with(25)
+    assert results == [{"id": 25, "name": "pikachu"}] * 4
+    assert cache.flights.deduplicated == 3
+
+
+def test_pokeapi_cache_async_disk_tier_runs_off_the_event_loop(mocker):
+    # Arrange
+    cache = PokeapiCache()
+    threads = []
+    mocker.patch.object(
+        PokeapiCache, "_load", side_effect=lambda api_id: threads.append(threading.get_ident()))
+    mocker.patch.object(
+        PokeapiCache, "_save", side_effect=lambda *args: threads.append(threading.get_ident()))
+    fetch = mocker.AsyncMock(return_value={"id": 25, "name": "pikachu"})
+
+    async def run():
+        result = await cache.get_async(25, fetch, None)
+        return result, threading.get_ident()
+
+    # Act
+    result, loop_thread = asyncio.run(run())
+
+    # Assert
+    assert result == {"id": 25, "name": "pikachu"}
+    assert len(threads) == 2
+    assert loop_thread not in threads
+
+
+def test_pokeapi_cache_async_reads_disk_tier(mocker):
+    # Arrange
+    cache = PokeapiCache()
+    cache.store(4, {"id": 4, "name": "charmander"})
+    cache.memory.clear()
+    fetch = mocker.AsyncMock()
+
+    # Act
+    result = asyncio.run(cache.get_async(4, fetch, None))
+
+    # Assert
+    fetch.assert_not_awaited()
+    assert result["name"] == "charmander"
+    assert cache.counters["disk_hits"] == 1
+
+
+# ---------------------------------------------------------------------------
+# TrainerCache
+# ---------------------------------------------------------------------------
+
+class DictBackend:
+    """Shared backend keeping its entries and versions in dicts, like RedisBackend"""
+
+    def __init__(self):
+        self.entries = {}
+        self.versions = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def version(self, key):
+        return self.versions.get(key, 0)
+
+    def set_if_version(self, key, value, version):
+        if self.version(key) != version:
+            return False
+        self.entries[key] = value
+        return True
+
+    def invalidate(self, key):
+        self.versions[key] = self.version(key) + 1
+        self.entries.pop(key, None)
+
+
+def test_trainer_cache_skips_payload_read_before_invalidation():
+    # Arrange
+    cache = TrainerCache()
+    version = cache.version(1)
+    cache.invalidate(1)
+
+    # Act
+    cache.store(1, b'{"id": 1}', version)
+
+    # Assert
+    assert cache.get(1) is None
+
+
+@pytest.mark.parametrize("backend", [None, DictBackend()])
+def test_trainer_cache_store_and_invalidate(backend):
+    # Arrange
+    cache = TrainerCache(backend=backend)
+    etag, _ = cache.store(1, b'{"id": 1}', cache.version(1))
+
+    # Act
+    cached = cache.get(1)
+    cache.invalidate(1)
+
+    # Assert
+    assert cached == (etag, b'{"id": 1}')
+    assert cache.get(1) is None
+    assert cache.counters == {"hits": 1, "misses": 1, "invalidations": 1}
+
+
+def test_trainer_cache_async_calls_backend_off_the_event_loop():
+    # Arrange
+    threads = []
+
+    class RecordingBackend(DictBackend):
+        def set_if_version(self, key, value, version):
+            threads.append(threading.current_thread())
+            return super().set_if_version(key, value, version)
+
+        def invalidate(self, key):
+            threads.append(threading.current_thread())
+            super().invalidate(key)
+
+    cache = TrainerCache(backend=RecordingBackend())
+
+    async def run():
+        version = await cache.version_async(1)
+        etag, _ = await cache.store_async(1, b'{"id": 1}', version)
+        cached = await cache.get_async(1)
+        await cache.invalidate_async(1)
+        return etag, cached, await cache.get_async(1)
+
+    # Act
+    etag, cached, after = asyncio.run(run())
+
+    # Assert
+    assert cached == (etag, b'{"id": 1}')
+    assert after is None
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def test_trainer_cache_invalidation_by_another_worker_stops_a_stale_store():
+    # Arrange
+    backend = DictBackend()
+    reader, writer = TrainerCache(backend=backend), TrainerCache(backend=backend)
+    version = reader.version(1)
+
+    # Act
+    writer.invalidate(1)
+    reader.store(1, b'{"id": 1, "stale": true}', version)
+
+    # Assert
+    assert reader.get(1) is None
+    assert writer.get(1) is None
+
+
+def test_trainer_cache_bounds_versions_and_skips_evicted_ones():
+    # Arrange
+    cache = TrainerCache(maxsize=2)
+    version = cache.version(1)
+    cache.invalidate(2, 3)
+
+    # Act
+    cache.store(1, b'{"id": 1}', version)
+
+    # Assert
+    assert len(cache._versions) == 2
+    assert cache.get(1) is None
@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.utils import metrics
+from app.utils.metrics import (
+    RequestTimings,
+    current_timings,
+    instrument_engine,
+    request_timings,
+    route_template,
+    timed,
+    timed_endpoint,
+)
+
+
+# ---------------------------------------------------------------------------
+# timed
+# ---------------------------------------------------------------------------
+
+def test_timed_outside_of_a_request():
+    # Act
+    with timed("db"):
+        pass
+
+    # Assert
+    assert current_timings() is None
+
+
+def test_timed_adds_to_the_phase():
+    # Act
+    with request_timings() as timings:
+        with timed("pokeapi"):
+            pass
+        with timed("pokeapi"):
+            pass
+
+    # Assert
+    assert timings.counts["pokeapi"] == 2
+    assert timings.durations["pokeapi"] > 0
+    assert current_timings() is None
+
+
+def test_timed_is_shared_with_concurrent_tasks():
+    # Arrange
+    async def call():
+        with timed("pokeapi"):
+            await asyncio.sleep(0)
+
+    async def run():
+        with request_timings() as timings:
+            await asyncio.gather(call(), call(), call())
+        return timings
+
+    # Act
+    timings = asyncio.run(run())
+
+    # Assert
+    assert timings.counts["pokeapi"] == 3
+
+
+def test_server_timing_header():
+    # Arrange
+    timings = RequestTimings()
+    timings.add("db", 0.0015)
+    timings.add("db", 0.0005)
+
+    # Act
+    header = timings.server_timing()
+
+    # Assert
+    assert header.startswith('db;dur=2.00;desc="2 queries", pokeapi;dur=0.00;desc="0 calls", '
+                             'serialize;dur=0.00, app;dur=')
+
+
+# ---------------------------------------------------------------------------
+# instrument_engine
+# ---------------------------------------------------------------------------
+
+def test_instrument_engine_counts_queries():
+    # Arrange
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    instrument_engine(engine)
+
+    # Act
+    with request_timings() as timings, engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("SELECT 2"))
+
+    # Assert
+    assert timings.counts["db"] == 2
+
+
+# ---------------------------------------------------------------------------
+# observe
+# ---------------------------------------------------------------------------
+
+def test_observe_records_every_histogram(mocker):
+    # Arrange
+    histograms = {name: mocker.MagicMock() for name in ("duration", "phase", "db", "pokeapi")}
+    mocker.patch.object(metrics, "HISTOGRAMS", histograms)
+    timings = RequestTimings()
+    timings.route = "/trainers/{trainer_id}"
+    timings.add("db", 0.01)
+
+    # Act
+    metrics.observe("GET", 200, timings)
+
+    # Assert
+    histograms["duration"].labels.assert_called_once_with("GET", "/trainers/{trainer_id}", 200)
+    assert histograms["phase"].labels.call_count == 3
+    histograms["db"].labels.return_value.observe.assert_called_once_with(1)
+    histograms["pokeapi"].labels.return_value.observe.assert_called_once_with(0)
+
+
+# ---------------------------------------------------------------------------
+# timed_endpoint
+# ---------------------------------------------------------------------------
+
+def test_timed_endpoint_keeps_coroutine_endpoints():
+    # Arrange
+    async def endpoint():
+        return 1
+
+    # Act
+    wrapped = timed_endpoint(endpoint)
+
+    # Assert
+    assert asyncio.iscoroutinefunction(wrapped)
+    assert timed_endpoint(wrapped) is wrapped
+
+
+def test_timed_endpoint_records_end():
+    # Arrange
+    wrapped = timed_endpoint(lambda: 1)
+
+    # Act
+    with request_timings() as timings:
+        result = wrapped()
+
+    # Assert
+    assert result == 1
+    assert timings.endpoint_end is not None
+
+
+# ---------------------------------------------------------------------------
+# route_template
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("path, path_format, expected", [
+    ("/trainers/42", "/{trainer_id}", "/trainers/{trainer_id}"),
+    ("/trainers/42", "/trainers/{trainer_id}", "/trainers/{trainer_id}"),
+    ("/trainers", "", "/trainers"),
+    ("/pokemons/", "/", "/pokemons/"),
+    ("/trainers/1/item/", "/{trainer_id}/item/", "/trainers/{trainer_id}/item/"),
+])
+def test_route_template(path, path_format, expected):
+    # Act / Assert
+    assert route_template(path, path_format) == expected
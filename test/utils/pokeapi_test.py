@@ -1,11 +1,19 @@
+import asyncio
+
 import pytest
 
+from app.utils.metrics import request_timings
 from app.utils.pokeapi import (
     get_pokemon_data,
     get_pokemon_name,
     get_pokemon_stats,
     battle_pokemon,
     battle_compare_stats,
+    close_async_client,
+    fetch_pokemon_data_async,
+    get_async_client,
+    get_many_pokemon_stats_async,
+    get_pokemon_data_async,
 )
 
 
@@ -17,7 +25,7 @@ def test_get_pokemon_data_calls_correct_url(mocker):
     # Arrange
     mock_response = mocker.MagicMock()
     mock_response.json.return_value = {"name": "pikachu", "id": 25}
-    mock_get = mocker.patch("app.utils.pokeapi.requests.get", return_value=mock_response)
+    mock_get = mocker.patch("app.utils.pokeapi.http_session.get", return_value=mock_response)
 
     # Act
     result = get_pokemon_data(25)
@@ -34,7 +42,7 @@ def test_get_pokemon_data_returns_parsed_json(mocker):
     expected = {"name": "mewtwo", "id": 150}
     mock_response = mocker.MagicMock()
     mock_response.json.return_value = expected
-    mocker.patch("app.utils.pokeapi.requests.get", return_value=mock_response)
+    mocker.patch("app.utils.pokeapi.http_session.get", return_value=mock_response)
 
     # Act
     result = get_pokemon_data(150)
@@ -51,7 +59,7 @@ def test_get_pokemon_data_parametrized(mocker, api_id):
     # Arrange
     mock_response = mocker.MagicMock()
     mock_response.json.return_value = {"name": f"pokemon_{api_id}", "id": api_id}
-    mock_get = mocker.patch("app.utils.pokeapi.requests.get", return_value=mock_response)
+    mock_get = mocker.patch("app.utils.pokeapi.http_session.get", return_value=mock_response)
 
     # Act
     result = get_pokemon_data(api_id)
@@ -265,3 +273,85 @@ def test_battle_compare_stats_parametrized(first_stats, second_stats, expected):
 
     # Assert
     assert result == expected
+
+
+# ---------------------------------------------------------------------------
+# async client
+# ---------------------------------------------------------------------------
+
+def test_fetch_pokemon_data_async_uses_pooled_client(mocker):
+    # Arrange
+    mock_response = mocker.MagicMock()
+    mock_response.json.return_value = {"name": "pikachu", "id": 25}
+    mock_client = mocker.MagicMock()
+    mock_client.get = mocker.AsyncMock(return_value=mock_response)
+    mocker.patch("app.utils.pokeapi.get_async_client", return_value=mock_client)
+
+    # Act
+    result = asyncio.run(fetch_pokemon_data_async(25))
+
+    # Assert
+    mock_client.get.assert_awaited_once_with("https://pokeapi.co/api/v2/pokemon/25")
+    assert result == {"name": "pikachu", "id": 25}
+
+
+def test_get_pokemon_data_async_uses_cache(mocker):
+    # Arrange
+    mock_fetch = mocker.patch(
+        "app.utils.pokeapi.fetch_pokemon_data_async",
+        return_value={"name": "mew", "id": 151},
+    )
+
+    # Act
+    asyncio.run(get_pokemon_data_async(151))
+    result = asyncio.run(get_pokemon_data_async(151))
+
+    # Assert
+    mock_fetch.assert_awaited_once_with(151)
+    assert result == {"name": "mew", "id": 151}
+
+
+def test_get_many_pokemon_stats_async_keeps_order(mocker):
+    # Arrange
+    async def fake_data(api_id):
+        await asyncio.sleep(0.01 if api_id == 1 else 0)
+        return {"stats": [{"stat": {"name": "hp"}, "base_stat": api_id}]}
+
+    mocker.patch("app.utils.pokeapi.get_pokemon_data_async", side_effect=fake_data)
+
+    # Act
+    result = asyncio.run(get_many_pokemon_stats_async([1, 4, 7]))
+
+    # Assert
+    assert [stats[0]["base_stat"] for stats in result] == [1, 4, 7]
+
+
+def test_get_async_client_is_reused_within_a_loop():
+    # Arrange
+    async def get_twice():
+        first = get_async_client()
+        second = get_async_client()
+        await close_async_client()
+        return first, second
+
+    # Act
+    first, second = asyncio.run(get_twice())
+
+    # Assert
+    assert first is second
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+def test_fetch_pokemon_data_is_timed(mocker):
+    # Arrange
+    mocker.patch("app.utils.pokeapi.http_session.get")
+
+    # Act
+    with request_timings() as timings:
+        get_pokemon_data(1)
+
+    # Assert
+    assert timings.counts["pokeapi"] == 1
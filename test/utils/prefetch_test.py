@@ -0,0 +1,87 @@
+import asyncio
+
+from app import models
+from app.sqlite import SESSION_LOCAL
+from app.utils.prefetch import prefetch_species
+
+
+def pokemon_data(api_id):
+    return {
+        "id": api_id,
+        "name": f"pokemon_{api_id}",
+        "stats": [
+            {"stat": {"name": "hp"}, "base_stat": api_id},
+            {"stat": {"name": "special-attack"}, "base_stat": api_id * 2},
+        ],
+    }
+
+
+def stored_species():
+    database = SESSION_LOCAL()
+    try:
+        return {row.api_id: row for row in database.query(models.Species)}
+    finally:
+        database.close()
+
+
+def test_prefetch_species_stores_every_species(mocker):
+    # Arrange
+    mocker.patch(
+        "app.utils.prefetch.fetch_species_list_async",
+        return_value=[(1, "bulbasaur"), (4, "charmander"), (7, "squirtle")],
+    )
+    mocker.patch("app.utils.prefetch.fetch_pokemon_data_async", side_effect=pokemon_data)
+
+    # Act
+    stored, failures = asyncio.run(prefetch_species(concurrency=2, batch_size=2))
+
+    # Assert
+    species = stored_species()
+    assert (stored, failures) == (3, 0)
+    assert sorted(species) == [1, 4, 7]
+    assert species[4].special_attack == 8
+
+
+def test_prefetch_species_resumes_after_interruption(mocker):
+    # Arrange
+    mocker.patch(
+        "app.utils.prefetch.fetch_species_list_async",
+        return_value=[(1, "bulbasaur"), (4, "charmander")],
+    )
+    mocker.patch("app.utils.prefetch.fetch_pokemon_data_async", side_effect=pokemon_data)
+    asyncio.run(prefetch_species(batch_size=1))
+    mocker.patch(
+        "app.utils.prefetch.fetch_species_list_async",
+        return_value=[(1, "bulbasaur"), (4, "charmander"), (7, "squirtle")],
+    )
+    mock_fetch = mocker.patch(
+        "app.utils.prefetch.fetch_pokemon_data_async", side_effect=pokemon_data
+    )
+
+    # Act
+    stored, _ = asyncio.run(prefetch_species())
+
+    # Assert
+    assert stored == 1
+    mock_fetch.assert_awaited_once_with(7)
+
+
+def test_prefetch_species_skips_failures(mocker):
+    # Arrange
+    def flaky(api_id):
+        if api_id == 4:
+            raise ConnectionError
+        return pokemon_data(api_id)
+
+    mocker.patch(
+        "app.utils.prefetch.fetch_species_list_async",
+        return_value=[(1, "bulbasaur"), (4, "charmander")],
+    )
+    mocker.patch("app.utils.prefetch.fetch_pokemon_data_async", side_effect=flaky)
+
+    # Act
+    stored, failures = asyncio.run(prefetch_species())
+
+    # Assert
+    assert (stored, failures) == (1, 1)
+    assert sorted(stored_species()) == [1]
@@ -0,0 +1,147 @@
+import inspect
+import signal
+from collections import Counter
+
+import pytest
+
+from app.utils.profiler import SamplingProfiler, collapse
+
+
+@pytest.fixture
+def setitimer(mocker):
+    return mocker.patch("app.utils.profiler.signal.setitimer")
+
+
+def installed_profiler():
+    profiler = SamplingProfiler()
+    profiler.installed = True
+    return profiler
+
+
+# ---------------------------------------------------------------------------
+# select
+# ---------------------------------------------------------------------------
+
+def test_select_next_requests():
+    # Arrange
+    profiler = SamplingProfiler()
+    profiler.start(requests=2)
+
+    # Act
+    selected = [profiler.select() for _ in range(4)]
+
+    # Assert
+    assert selected == [True, True, False, False]
+    assert not profiler.running
+
+
+def test_select_one_request_in_every():
+    # Arrange
+    profiler = SamplingProfiler()
+    profiler.start(every=3)
+
+    # Act
+    selected = [profiler.select() for _ in range(7)]
+
+    # Assert
+    assert selected == [True, False, False, True, False, False, True]
+
+
+def test_stop_keeps_samples(setitimer):
+    # Arrange
+    profiler = installed_profiler()
+    profiler.start(every=1)
+    samples, token = profiler.begin()
+    samples["main:run"] += 1
+    profiler.end(samples, token, "GET /trainers")
+
+    # Act
+    profiler.stop()
+
+    # Assert
+    assert profiler.status() == {
+        "running": False, "remaining_requests": 0, "every": 0, "profiled_requests": 1,
+        "samples": {"GET /trainers": 1},
+    }
+
+
+# ---------------------------------------------------------------------------
+# Sampling
+# ---------------------------------------------------------------------------
+
+def test_collapse_is_root_first():
+    # Arrange
+    def leaf():
+        return collapse(inspect.currentframe())
+
+    # Act
+    stack = leaf()
+
+    # Assert
+    frames = stack.split(";")
+    assert frames[-1] == f"{__name__}:test_collapse_is_root_first.<locals>.leaf"
+    assert frames[-2] == f"{__name__}:test_collapse_is_root_first"
+
+
+def test_signal_only_samples_profiled_requests(setitimer):
+    # Arrange
+    profiler = installed_profiler()
+    frame = inspect.currentframe()
+
+    # Act
+    profiler.on_signal(signal.SIGPROF, frame)
+    samples, token = profiler.begin()
+    profiler.on_signal(signal.SIGPROF, frame)
+    profiler.on_signal(signal.SIGPROF, frame)
+    profiler.end(samples, token, "GET /pokemons/fight")
+    profiler.on_signal(signal.SIGPROF, frame)
+
+    # Assert
+    assert profiler.stacks["GET /pokemons/fight"] == {collapse(frame): 2}
+
+
+def test_timer_runs_while_profiled_requests_run(setitimer):
+    # Arrange
+    profiler = installed_profiler()
+
+    # Act
+    first = profiler.begin()
+    second = profiler.begin()
+    profiler.end(*second, "GET /trainers")
+    running_calls = setitimer.call_count
+    profiler.end(*first, "GET /trainers")
+
+    # Assert
+    assert running_calls == 1
+    setitimer.assert_called_with(signal.ITIMER_PROF, 0)
+
+
+def test_timer_never_starts_without_handler(setitimer):
+    # Arrange
+    profiler = SamplingProfiler()
+
+    # Act
+    profiler.end(*profiler.begin(), "GET /trainers")
+
+    # Assert
+    setitimer.assert_not_called()
+
+
+def test_collapsed_prefixes_and_filters_routes():
+    # Arrange
+    profiler = SamplingProfiler()
+    profiler.stacks = {
+        "GET /trainers": Counter({"main:run;app.actions:get_trainers": 3}),
+        "GET /pokemons/fight": Counter({"main:run;app.actions:fight_pokemons": 5}),
+    }
+
+    # Act
+    every_route = profiler.collapsed()
+    fight = profiler.collapsed("GET /pokemons/fight")
+
+    # Assert
+    assert every_route == (
+        "GET /pokemons/fight;main:run;app.actions:fight_pokemons 5\n"
+        "GET /trainers;main:run;app.actions:get_trainers 3\n"
+    )
+    assert fight == "GET /pokemons/fight;main:run;app.actions:fight_pokemons 5\n"
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+# ---------------------------------------------------------------------------
+# threads
+# ---------------------------------------------------------------------------
+
+def test_single_flight_threads_share_one_call():
+    # Arrange
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch(api_id):
+        calls.append(api_id)
+        release.wait()
+        return {"id": api_id}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do(25, fetch, 25)))
+        for _ in range(5)
+    ]
+
+    # Act
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: flights.deduplicated == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    assert calls == [25]
+    assert results == [{"id": 25}] * 5
+    assert flights.deduplicated == 4
+    assert flights.in_flight() == 0
+
+
+def test_single_flight_propagates_errors_and_forgets_the_key():
+    # Arrange
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError("upstream down")
+
+    # Act
+    with pytest.raises(ValueError):
+        flights.do(1, fail)
+    result = flights.do(1, lambda: "ok")
+
+    # Assert
+    assert result == "ok"
+
+
+# ---------------------------------------------------------------------------
+# tasks
+# ---------------------------------------------------------------------------
+
+def test_single_flight_tasks_share_one_call():
+    # Arrange
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch(api_id):
+        calls.append(api_id)
+        await asyncio.sleep(0.01)
+        return {"id": api_id}
+
+    async def run():
+        return await asyncio.gather(*(flights.do_async(150, fetch, 150) for _ in range(3)))
+
+    # Act
+    results = asyncio.run(run())
+
+    # Assert
+    assert calls == [150]
+    assert results == [{"id": 150}] * 3
+    assert flights.deduplicated == 2
+
+
+def test_single_flight_tasks_propagate_errors():
+    # Arrange
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def run():
+        return await asyncio.gather(
+            flights.do_async(1, fail), flights.do_async(1, fail), return_exceptions=True
+        )
+
+    # Act
+    results = asyncio.run(run())
+
+    # Assert
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.in_flight() == 0
+
+
+def test_single_flight_follower_takes_over_a_cancelled_call():
+    # Arrange
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch(api_id):
+        calls.append(api_id)
+        await asyncio.sleep(0.01)
+        return {"id": api_id}
+
+    async def run():
+        leader = asyncio.create_task(flights.do_async(7, fetch, 7))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flights.do_async(7, fetch, 7)) for _ in range(2)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        return leader, await asyncio.gather(*followers)
+
+    # Act
+    leader, results = asyncio.run(run())
+
+    # Assert
+    assert leader.cancelled()
+    assert results == [{"id": 7}] * 2
+    assert calls == [7, 7]
+    assert flights.deduplicated == 1
+    assert flights.in_flight() == 0
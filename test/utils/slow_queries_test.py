@@ -0,0 +1,142 @@
+import asyncio
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import actions, models
+from app.utils.slow_queries import SlowQueryLog, is_parameter_sets
+
+
+@pytest.fixture
+def slow_log(tmp_path):
+    log = SlowQueryLog(tmp_path / "slow.jsonl", threshold_ms=0)
+    yield log
+    log.close()
+
+
+@pytest.fixture
+def session(slow_log):
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    slow_log.install(engine)
+    database = sessionmaker(bind=engine)()
+    yield database
+    database.close()
+    engine.dispose()
+
+
+def read_entries(log):
+    log.handler.flush()
+    with open(log.handler.baseFilename, encoding="utf-8") as log_file:
+        return [json.loads(line) for line in log_file]
+
+
+# ---------------------------------------------------------------------------
+# SlowQueryLog
+# ---------------------------------------------------------------------------
+
+def test_slow_query_log_records_plan_and_callers(slow_log, session):
+    # Act
+    actions.get_pokemons(session, skip=10, limit=5)
+
+    # Assert
+    entry = read_entries(slow_log)[-1]
+    assert entry["statement"].startswith("SELECT pokemons.id")
+    assert entry["parameters"] == [5, 10]
+    assert [caller.split(":")[0] for caller in entry["callers"]] == ["paginate", "get_pokemons"]
+    assert entry["plan"] == ["SCAN pokemons"]
+
+
+def test_slow_query_log_reports_index_lookups(slow_log, session):
+    # Act
+    actions.get_rows_by_trainer(session, models.Item, actions.ITEM_COLUMNS, [1])
+
+    # Assert
+    entry = read_entries(slow_log)[-1]
+    assert entry["plan"][0] == "SEARCH items USING INDEX ix_items_trainer_id (trainer_id=?)"
+
+
+def test_slow_query_log_skips_fast_queries(tmp_path):
+    # Arrange
+    log = SlowQueryLog(tmp_path / "slow.jsonl", threshold_ms=60_000)
+    engine = create_engine("sqlite://")
+    log.install(engine)
+
+    # Act
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    # Assert
+    log.close()
+    assert not (tmp_path / "slow.jsonl").exists()
+
+
+def test_slow_query_log_keeps_statements_it_cannot_explain(slow_log, session):
+    # Act
+    session.execute(text("PRAGMA user_version"))
+
+    # Assert
+    entry = read_entries(slow_log)[-1]
+    assert entry["statement"] == "PRAGMA user_version"
+    assert entry["plan"] is None
+
+
+def test_slow_query_log_finds_callers_of_async_sessions(slow_log, tmp_path):
+    # Arrange
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+    slow_log.install(async_engine)
+
+    async def run():
+        async with async_engine.begin() as connection:
+            await connection.run_sync(models.Base.metadata.create_all)
+        async with async_sessionmaker(async_engine)() as database:
+            await database.run_sync(actions.get_trainer, 1)
+        await async_engine.dispose()
+
+    # Act
+    asyncio.run(run())
+
+    # Assert
+    entry = read_entries(slow_log)[-1]
+    assert entry["callers"][-1].startswith("get_trainer:")
+    assert entry["plan"] == ["SEARCH trainers USING INTEGER PRIMARY KEY (rowid=?)"]
+
+
+def test_slow_query_log_rotates(tmp_path):
+    # Arrange
+    log = SlowQueryLog(tmp_path / "slow.jsonl", threshold_ms=0, max_bytes=200, backups=2)
+    engine = create_engine("sqlite://")
+    log.install(engine)
+
+    # Act
+    with engine.connect() as connection:
+        for value in range(5):
+            connection.execute(text("SELECT :value"), {"value": value})
+    log.close()
+
+    # Assert
+    assert (tmp_path / "slow.jsonl.1").exists()
+    assert not (tmp_path / "slow.jsonl.3").exists()
+
+
+def test_slow_query_log_from_env_is_off_by_default(monkeypatch):
+    # Arrange
+    monkeypatch.delenv("SLOW_QUERY_LOG", raising=False)
+
+    # Act / Assert
+    assert SlowQueryLog.from_env() is None
+
+
+@pytest.mark.parametrize("parameters, expected", [
+    ((1, 2), False),
+    ([("a", date(2000, 1, 1)), ("b", date(2000, 1, 2))], True),
+    ([{"name": "a"}], True),
+    ((), False),
+])
+def test_is_parameter_sets(parameters, expected):
+    # Act / Assert
+    assert is_parameter_sets(parameters) is expected
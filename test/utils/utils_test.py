@@ -1,6 +1,16 @@
+import asyncio
 from datetime import date
 
-from app.utils.utils import age_from_birthdate, get_db
+import pytest
+
+from app.utils.utils import (
+    age_from_birthdate,
+    decode_cursor,
+    encode_cursor,
+    etag_matches,
+    get_async_db,
+    get_db,
+)
 
 
 def test_birthday_is_today():
@@ -99,3 +109,72 @@ def test_get_db_closes_session_after_use(mocker):
 
     # Assert
     mock_session.close.assert_called_once()
+
+
+def test_get_async_db_yields_and_closes_a_session(mocker):
+    """get_async_db should yield a session from ASYNC_SESSION_LOCAL and close it"""
+    # Arrange
+    mock_session = mocker.AsyncMock()
+    mock_session.__aenter__.return_value = mock_session
+    mocker.patch("app.utils.utils.ASYNC_SESSION_LOCAL", return_value=mock_session)
+
+    async def use():
+        gen = get_async_db()
+        session = await gen.__anext__()
+        await gen.aclose()
+        return session
+
+    # Act
+    session = asyncio.run(use())
+
+    # Assert
+    assert session is mock_session
+    mock_session.__aexit__.assert_awaited_once()
+
+
+# ---------------------------------------------------------------------------
+# encode_cursor / decode_cursor
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("last_id", [0, 1, 42, 10**9])
+def test_cursor_round_trip(last_id):
+    """decode_cursor should return the id given to encode_cursor"""
+    # Act
+    res = decode_cursor(encode_cursor(last_id))
+
+    # Assert
+    assert res == last_id
+
+
+invalid_cursors = ["not a cursor", "e30=", "eyJpZCI6ICIxIn0=", "eyJpZCI6IHRydWV9"]
+
+
+@pytest.mark.parametrize("cursor", invalid_cursors)
+def test_decode_cursor_rejects_invalid_cursors(cursor):
+    """decode_cursor should raise ValueError for cursors it did not build"""
+    # Act / Assert
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+# ---------------------------------------------------------------------------
+# etag_matches
+# ---------------------------------------------------------------------------
+
+etag_headers = [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"old", "abc"', True),
+    ("*", True),
+    ('"old"', False),
+]
+
+
+@pytest.mark.parametrize("if_none_match, expected", etag_headers)
+def test_etag_matches(if_none_match, expected):
+    # Act
+    result = etag_matches(if_none_match, '"abc"')
+
+    # Assert
+    assert result is expected